@@ -0,0 +1,202 @@
+"""
+Пакетная обработка транскриптов без графического интерфейса.
+
+Примеры:
+    python batch.py audio_records --doctor "Иванова Мария" --patient "Иванов Иван Иванович"
+    python batch.py "audio_records/transcript_2024*.txt" --doctor "Иванова Мария" --metadata meta.json --workers 8
+
+Файл метаданных - JSON вида {"transcript_20240101_120000.txt": {"patient": "...", "doctor": "..."}}.
+"""
+import os
+import re
+import sys
+import glob
+import json
+import time
+import asyncio
+import logging
+import argparse
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from chatgpt import ChatGPTAPI, AsyncChatGPTAPI
+from process_utils import process_consultation, process_consultation_async
+from services.storage_service import create_storage_service
+
+logger = logging.getLogger(__name__)
+
+TIMESTAMP_PATTERN = re.compile(r"transcript_(\d{8}_\d{6})")
+
+
+def collect_transcripts(inputs):
+    """Собирает список файлов транскриптов из каталогов и glob-шаблонов"""
+    files = []
+    for item in inputs:
+        if os.path.isdir(item):
+            files.extend(glob.glob(os.path.join(item, "transcript_*.txt")))
+        else:
+            files.extend(glob.glob(item))
+    return sorted(set(files))
+
+
+def transcript_timestamp(file_path):
+    """Метка времени приема из имени файла, иначе - из времени изменения файла"""
+    match = TIMESTAMP_PATTERN.search(os.path.basename(file_path))
+    if match:
+        return match.group(1)
+    return datetime.fromtimestamp(os.path.getmtime(file_path)).strftime("%Y%m%d_%H%M%S")
+
+
+def resolve_job(file_path, metadata, args, doctors):
+    """
+    Определяет пациента, врача и метку времени приема.
+    Возвращает None, если прием уже обработан и задан --skip-existing.
+    """
+    if os.path.getsize(file_path) == 0:
+        raise ValueError("Файл транскрипта пуст")
+
+    meta = metadata.get(os.path.basename(file_path), {})
+    patient_name = meta.get("patient") or args.patient or "Не указано"
+    doctor_name = meta.get("doctor") or args.doctor
+    if not doctor_name:
+        raise ValueError("Не указан врач")
+    doctor_type = meta.get("specialization") or args.specialization or doctors.get(doctor_name)
+    if not doctor_type:
+        raise ValueError(f"Неизвестна специализация врача {doctor_name}")
+
+    timestamp = transcript_timestamp(file_path)
+    if args.skip_existing and os.path.exists(f"Results/result_{timestamp}.json"):
+        return None
+    return patient_name, doctor_name, doctor_type, timestamp
+
+
+def process_one(file_path, metadata, args, doctors, chatgpt_api, storage_service):
+    """Обрабатывает один транскрипт и возвращает путь к отчету"""
+    job = resolve_job(file_path, metadata, args, doctors)
+    if job is None:
+        return None
+    patient_name, doctor_name, doctor_type, timestamp = job
+
+    _, _, report_file = process_consultation(
+        file_path, patient_name, doctor_name, doctor_type,
+        chatgpt_api, storage_service, timestamp
+    )
+    if not report_file:
+        raise RuntimeError("Не удалось создать отчет")
+    return report_file
+
+
+async def process_one_async(file_path, metadata, args, doctors, chatgpt_api, storage_service, semaphore):
+    """Асинхронная обработка одного транскрипта"""
+    async with semaphore:
+        job = resolve_job(file_path, metadata, args, doctors)
+        if job is None:
+            return None
+        patient_name, doctor_name, doctor_type, timestamp = job
+
+        _, _, report_file = await process_consultation_async(
+            file_path, patient_name, doctor_name, doctor_type,
+            chatgpt_api, storage_service, timestamp
+        )
+        if not report_file:
+            raise RuntimeError("Не удалось создать отчет")
+        return report_file
+
+
+def run_threaded(files, metadata, args, doctors, storage_service, report):
+    """Обработка в пуле потоков с синхронным ChatGPTAPI"""
+    chatgpt_api = ChatGPTAPI(api_key=os.getenv('OPENAI_API_KEY'))
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        futures = {
+            executor.submit(process_one, path, metadata, args, doctors, chatgpt_api, storage_service): path
+            for path in files
+        }
+        for future in as_completed(futures):
+            try:
+                report(futures[future], future.result(), None)
+            except Exception as e:
+                report(futures[future], None, e)
+
+
+async def run_async(files, metadata, args, doctors, storage_service, report):
+    """Обработка в одном цикле событий с AsyncChatGPTAPI и ограничением запросов/токенов в минуту"""
+    semaphore = asyncio.Semaphore(args.workers)
+
+    async def run(path):
+        try:
+            report(path, await process_one_async(path, metadata, args, doctors,
+                                                 chatgpt_api, storage_service, semaphore), None)
+        except Exception as e:
+            report(path, None, e)
+
+    async with AsyncChatGPTAPI(api_key=os.getenv('OPENAI_API_KEY'), max_connections=args.workers) as chatgpt_api:
+        await asyncio.gather(*(run(path) for path in files))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Пакетная генерация заключений по транскриптам")
+    parser.add_argument("inputs", nargs="+", help="Каталоги или glob-шаблоны файлов transcript_*.txt")
+    parser.add_argument("--doctor", help="ФИО врача (из doctors.json)")
+    parser.add_argument("--specialization", help="Код специализации, например pediatrician")
+    parser.add_argument("--patient", help="ФИО пациента для всех файлов")
+    parser.add_argument("--metadata", help="JSON с данными пациента и врача по имени файла")
+    parser.add_argument("--workers", type=int, default=4, help="Число параллельных обработчиков (запросов в режиме --async)")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="Асинхронные запросы к OpenAI с учетом лимитов OPENAI_RPM/OPENAI_TPM")
+    parser.add_argument("--skip-existing", action="store_true", help="Пропускать уже обработанные приемы")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    logger.setLevel(logging.INFO)
+
+    if not os.getenv('OPENAI_API_KEY'):
+        logger.error("Не установлена переменная окружения OPENAI_API_KEY")
+        return 2
+
+    files = collect_transcripts(args.inputs)
+    if not files:
+        logger.error("Не найдено ни одного транскрипта")
+        return 2
+
+    metadata = {}
+    if args.metadata:
+        with open(args.metadata, "r", encoding="utf-8") as f:
+            metadata = json.load(f)
+
+    storage_service = create_storage_service()
+    doctors = storage_service.load_doctors()
+
+    total = len(files)
+    failures = []
+    skipped = []
+    completed = []
+    started = time.monotonic()
+    logger.info(f"Найдено транскриптов: {total}, обработчиков: {args.workers}")
+
+    def report(path, report_file, error):
+        completed.append(path)
+        done = len(completed)
+        if error is not None:
+            failures.append((path, str(error)))
+            logger.error(f"[{done}/{total}] {path}: ошибка - {str(error)}")
+        elif report_file is None:
+            skipped.append(path)
+            logger.info(f"[{done}/{total}] {path}: пропущен")
+        else:
+            logger.info(f"[{done}/{total}] {path} -> {report_file}")
+
+    if args.use_async:
+        asyncio.run(run_async(files, metadata, args, doctors, storage_service, report))
+    else:
+        run_threaded(files, metadata, args, doctors, storage_service, report)
+
+    elapsed = time.monotonic() - started
+    logger.info(f"Готово за {elapsed:.1f} с: успешно {total - len(failures) - len(skipped)}, "
+                f"пропущено {len(skipped)}, ошибок {len(failures)}")
+    for path, error in failures:
+        logger.info(f"  {path}: {error}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
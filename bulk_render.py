@@ -0,0 +1,166 @@
+"""
+Повторное создание DOCX-заключений по архиву Results/result_*.json в пуле процессов.
+
+Примеры:
+    python bulk_render.py
+    python bulk_render.py --results Results --output Reports --workers 8 --force
+    python bulk_render.py --writer docx
+
+Уже созданные заключения пропускаются, если JSON и оформление (шаблоны, модули отчета)
+не менялись с прошлого прогона; состояние хранится в <output>/.render_manifest.json.
+"""
+import os
+import re
+import sys
+import glob
+import json
+import time
+import hashlib
+import logging
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from report_generator import report_path, parse_timestamp, ReportBuilder, format_report_text
+from services.file_utils import atomic_write_text, atomic_write_bytes
+
+logger = logging.getLogger(__name__)
+
+RESULT_PATTERN = re.compile(r"result_(\d{8}_\d{6})")
+MANIFEST_NAME = ".render_manifest.json"
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# При изменении этих файлов меняется оформление, и все заключения создаются заново
+LAYOUT_FILES = ("report_generator.py", "report_ooxml.py", os.path.join("templates", "specializations.json"))
+
+
+def layout_version(writer):
+    """Хэш файлов, определяющих вид заключения, вместе с выбранным способом записи"""
+    digest = hashlib.sha256(writer.encode("utf-8"))
+    for name in LAYOUT_FILES:
+        with open(os.path.join(BASE_DIR, name), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def file_digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def render_one(result_file, output_dir, writer):
+    """
+    Создает заключение по одному JSON (выполняется в процессе пула).
+    Возвращает запись манифеста для этого файла.
+    """
+    with open(result_file, "rb") as f:
+        data = f.read()
+    result = json.loads(data)
+    match = RESULT_PATTERN.search(os.path.basename(result_file))
+    timestamp = match.group(1)
+    patient_name = (result.get('patient') or {}).get('name') or "Не указано"
+    output_file = report_path(patient_name, timestamp, directory=output_dir)
+
+    if writer == "ooxml":
+        import report_ooxml
+        content = report_ooxml.build_report(patient_name, result, parse_timestamp(timestamp))
+    else:
+        builder = ReportBuilder(patient_name, date=parse_timestamp(timestamp))
+        builder.add_text(format_report_text(result))
+        content = builder.to_bytes()
+    atomic_write_bytes(output_file, content)
+
+    stat = os.stat(result_file)
+    return {
+        "mtime": stat.st_mtime,
+        "size": stat.st_size,
+        "sha256": file_digest(data),
+        "output": output_file,
+    }
+
+
+def is_up_to_date(result_file, entry, version):
+    """
+    Заключение актуально, если оформление не менялось, DOCX на месте, а JSON не изменился:
+    сначала сверяются время изменения и размер, и только при расхождении - хэш содержимого
+    """
+    if not entry or entry.get("version") != version or not os.path.exists(entry.get("output", "")):
+        return False
+    stat = os.stat(result_file)
+    if stat.st_mtime == entry["mtime"] and stat.st_size == entry["size"]:
+        return True
+    with open(result_file, "rb") as f:
+        if file_digest(f.read()) != entry["sha256"]:
+            return False
+    # Файл только «потрогали» - запоминаем новое время, чтобы не читать его в следующий раз
+    entry["mtime"], entry["size"] = stat.st_mtime, stat.st_size
+    return True
+
+
+def load_manifest(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except ValueError:
+        logger.warning(f"Манифест {path} поврежден, все заключения будут созданы заново")
+        return {}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Повторное создание DOCX-заключений по Results/result_*.json")
+    parser.add_argument("--results", default="Results", help="Каталог с result_*.json")
+    parser.add_argument("--output", default="Reports", help="Каталог для DOCX")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Число процессов (по умолчанию - число ядер)")
+    parser.add_argument("--writer", choices=("ooxml", "docx"), default="ooxml",
+                        help="ooxml - быстрая запись по заготовке, docx - через python-docx")
+    parser.add_argument("--force", action="store_true", help="Создать заново все заключения")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    logger.setLevel(logging.INFO)
+
+    files = sorted(path for path in glob.glob(os.path.join(args.results, "result_*.json"))
+                   if RESULT_PATTERN.search(os.path.basename(path)))
+    if not files:
+        logger.error(f"В {args.results} нет файлов result_*.json")
+        return 2
+
+    manifest_path = os.path.join(args.output, MANIFEST_NAME)
+    manifest = {} if args.force else load_manifest(manifest_path)
+    version = layout_version(args.writer)
+    key = lambda path: os.path.basename(path)
+    pending = [path for path in files if not is_up_to_date(path, manifest.get(key(path)), version)]
+
+    total = len(pending)
+    failures = []
+    started = time.monotonic()
+    logger.info(f"Найдено результатов: {len(files)}, требуют обновления: {total}, процессов: {args.workers}")
+
+    if pending:
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            futures = {executor.submit(render_one, path, args.output, args.writer): path for path in pending}
+            for done, future in enumerate(as_completed(futures), 1):
+                path = futures[future]
+                try:
+                    entry = future.result()
+                except Exception as e:
+                    failures.append((path, str(e)))
+                    manifest.pop(key(path), None)
+                    logger.error(f"[{done}/{total}] {path}: ошибка - {str(e)}")
+                    continue
+                entry["version"] = version
+                manifest[key(path)] = entry
+                if done % 100 == 0 or done == total:
+                    logger.info(f"[{done}/{total}] {path} -> {entry['output']}")
+
+    atomic_write_text(manifest_path, json.dumps(manifest, ensure_ascii=False, indent=2))
+
+    elapsed = time.monotonic() - started
+    logger.info(f"Готово за {elapsed:.1f} с: создано {total - len(failures)}, "
+                f"актуальных {len(files) - total}, ошибок {len(failures)}")
+    for path, error in failures:
+        logger.info(f"  {path}: {error}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
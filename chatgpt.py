@@ -1,60 +1,200 @@
 import requests
-from openai import OpenAI
 import os
+import json
+import asyncio
 import logging
 
+from json_stream import IncrementalJSONParser
+from services.http_transport import (
+    get_shared_transport, compute_backoff, parse_retry_after, DEFAULT_BASE_URL, RETRY_STATUS_CODES
+)
+from services.rate_limiter import AsyncRateLimiter
+from services.response_cache import get_shared_cache, make_cache_key
+# Оценка токенов нужна и шаблонам при запуске, поэтому живет в модуле без зависимостей
+from templates.tokens import estimate_tokens
 
-class ChatGPTAPI:
-    def __init__(self, api_key):
+DEFAULT_MODEL = "gpt-4o-2024-08-06"  # Используем актуальную модель
+# Типичный размер ответа с разделами отчета; лишнее резервирование возвращается по usage
+DEFAULT_COMPLETION_ESTIMATE = 1500
+
+
+def _is_cacheable(response):
+    """В кэш попадают только завершенные ответы с корректным JSON"""
+    try:
+        choice = response['choices'][0]
+        json.loads(choice['message']['content'])
+        return choice.get('finish_reason') in (None, 'stop')
+    except (KeyError, IndexError, TypeError, ValueError):
+        return False
+
+
+class ChatGPTBase:
+    """
+    Общая часть синхронного и асинхронного клиентов: сообщения, тело запроса,
+    ключ кэша и оценка токенов. Отправкой запросов занимаются наследники.
+    """
+    def __init__(self, api_key, model=DEFAULT_MODEL, temperature=0.01, max_tokens=8000,
+                 cache=None, use_cache=True, completion_estimate=None):
         self.api_key = api_key
-        self.client = OpenAI(api_key=api_key)
+        self.cache = cache if cache is not None else (get_shared_cache() if use_cache else None)
+        self.model = model
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        if completion_estimate is None:
+            completion_estimate = int(os.getenv("OPENAI_COMPLETION_ESTIMATE", str(DEFAULT_COMPLETION_ESTIMATE)))
+        self.completion_estimate = min(completion_estimate, max_tokens)
+
+    def build_messages(self, ai_instructions, content=None, file_path=None):
+        """Формирует список сообщений: системные инструкции и текст пользователя"""
+        messages = []
+        messages.append({'role': 'system', 'content': ai_instructions})
+
+        if content:
+            messages.append({'role': 'user', 'content': content})
+
+        if file_path:
+            file_extension = os.path.splitext(file_path)[1].lower()
+            if file_extension == ".txt":
+                with open(file_path, 'r', encoding='utf-8') as file:
+                    content = file.read()
+            messages.append({'role': 'user', 'content': content})
+        return messages
+
+    def build_payload(self, messages):
+        return {
+            "model": self.model,
+            "messages": messages,
+            "temperature": self.temperature,
+            "response_format": {"type": "json_object"},
+            "max_tokens": self.max_tokens,
+        }
+
+    def cache_key(self, messages):
+        """Ключ кэша для сообщений или None, если кэш отключен"""
+        if self.cache is None:
+            return None
+        user_content = "\n".join(m['content'] for m in messages[1:] if m['content'])
+        return make_cache_key(self.model, self.temperature, messages[0]['content'], user_content)
+
+    def estimate_request_tokens(self, messages):
+        """
+        Оценка токенов запроса: промпт и ожидаемый размер ответа.
+        Резервировать полный max_tokens нельзя - при OPENAI_TPM=30000 в работе было бы всего 3 запроса.
+        """
+        return sum(estimate_tokens(m['content']) + 4 for m in messages) + self.completion_estimate
+
+
+class ChatGPTAPI(ChatGPTBase):
+    def __init__(self, api_key, transport=None, model=DEFAULT_MODEL, temperature=0.01, max_tokens=8000,
+                 cache=None, use_cache=True):
+        super().__init__(api_key, model, temperature, max_tokens, cache, use_cache)
+        self.transport = transport or get_shared_transport(api_key)
+        self.base_url = self.transport.base_url
+        self._client = None
+
+    @property
+    def client(self):
+        """Клиент OpenAI создается только при первом обращении (и тогда же импортируется пакет openai)"""
+        if self._client is None:
+            from openai import OpenAI
+            self._client = OpenAI(api_key=self.api_key, base_url=self.base_url)
+        return self._client
 
     def get_response(self, messages):
         response = self.client.chat.completions.create(
-            model="gpt-4o-2024-08-06",  # Используем актуальную модель
+            model=self.model,
             messages=messages,
-            temperature=0.01,
+            temperature=self.temperature,
             response_format={"type": "json_object"}
         )
         return response
 
-    def process(self, ai_instructions, content=None, file_path=None):
+    def process(self, ai_instructions, content=None, file_path=None, use_cache=True):
         logging.info(f"Обработка файла: {file_path}")
         try:
-            headers = {
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {self.api_key}"
-            }
+            messages = self.build_messages(ai_instructions, content, file_path)
+            logging.info(messages)
 
-            messages = []
-            messages.append({'role': 'system', 'content': ai_instructions})
+            cache_key = self.cache_key(messages) if use_cache else None
+            if cache_key:
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    logging.info(f"Ответ взят из кэша: {cache_key[:12]}")
+                    return cached
 
-            if content:
-                messages.append({'role': 'user', 'content': content})
+            payload = self.build_payload(messages)
 
-            if file_path:
-                file_extension = os.path.splitext(file_path)[1].lower()
-                if file_extension == ".txt":
-                    with open(file_path, 'r', encoding='utf-8') as file:
-                        content = file.read()   
-                messages.append({'role': 'user', 'content': content})
+            logging.info("Отправка запроса в OpenAI API.")
+            response = self.transport.post_json("/chat/completions", payload)
+            result = response.json()
+            logging.info("Запрос успешно выполнен.")
+            logging.info(result)
+            if cache_key and _is_cacheable(result):
+                self.cache.put(cache_key, result)
+            return result
 
-            logging.info(messages)
+        except requests.RequestException as e:
+            logging.error(f"Ошибка при запросе к OpenAI API: {e}")
+            raise
+        except Exception as e:
+            logging.error(f"Неожиданная ошибка: {e}")
+            raise
 
-            payload = {
-                "model": "gpt-4o-2024-08-06",
-                "messages": messages,
-                "temperature": 0.01,
-                "response_format": {"type": "json_object"},
-                "max_tokens": 8000,
-            }
+    def process_stream(self, ai_instructions, content=None, file_path=None, on_section=None, use_cache=True):
+        """
+        Потоковый вариант process (stream=True): разделы JSON передаются в on_section(key, value)
+        по мере их закрытия. Возвращает ответ в том же формате, что и process.
+        """
+        logging.info(f"Потоковая обработка файла: {file_path}")
+        parser = IncrementalJSONParser(on_section)
+        try:
+            messages = self.build_messages(ai_instructions, content, file_path)
 
-            logging.info("Отправка запроса в OpenAI API.")
-            response = requests.post("https://api.openai.com/v1/chat/completions", headers=headers, json=payload)
-            response.raise_for_status()
-            logging.info("Запрос успешно выполнен.")
-            logging.info(response.json())
-            return response.json()
+            cache_key = self.cache_key(messages) if use_cache else None
+            if cache_key:
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    logging.info(f"Ответ взят из кэша: {cache_key[:12]}")
+                    parser.feed(cached['choices'][0]['message']['content'])
+                    return cached
+
+            payload = self.build_payload(messages)
+            payload["stream"] = True
+
+            logging.info("Отправка потокового запроса в OpenAI API.")
+            finish_reason = None
+            response = self.transport.post_json("/chat/completions", payload, stream=True)
+            with response:
+                # chunk_size=None - отдавать данные сразу по мере поступления, без буферизации
+                for line in response.iter_lines(chunk_size=None):
+                    line = line.decode("utf-8")
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        break
+                    chunk = json.loads(data)
+                    if not chunk.get('choices'):
+                        continue
+                    choice = chunk['choices'][0]
+                    delta = choice.get('delta', {}).get('content')
+                    if delta:
+                        parser.feed(delta)
+                    finish_reason = choice.get('finish_reason') or finish_reason
+
+            result = {
+                "object": "chat.completion",
+                "model": self.model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": parser.text},
+                    "finish_reason": finish_reason
+                }]
+            }
+            logging.info("Потоковый запрос успешно выполнен.")
+            if cache_key and _is_cacheable(result):
+                self.cache.put(cache_key, result)
+            return result
 
         except requests.RequestException as e:
             logging.error(f"Ошибка при запросе к OpenAI API: {e}")
@@ -62,3 +202,108 @@ class ChatGPTAPI:
         except Exception as e:
             logging.error(f"Неожиданная ошибка: {e}")
             raise
+
+
+class AsyncChatGPTAPI(ChatGPTBase):
+    """
+    Асинхронный клиент: много запросов в одном цикле событий
+    с ограничением числа запросов и токенов в минуту
+    """
+    def __init__(self, api_key, base_url=None, model=DEFAULT_MODEL, temperature=0.01, max_tokens=8000,
+                 cache=None, use_cache=True, rate_limiter=None, max_connections=20,
+                 connect_timeout=5.0, read_timeout=120.0, max_retries=4, completion_estimate=None):
+        super().__init__(api_key, model, temperature, max_tokens, cache, use_cache, completion_estimate)
+        self.base_url = (base_url or os.getenv("OPENAI_BASE_URL") or DEFAULT_BASE_URL).rstrip("/")
+        self.rate_limiter = rate_limiter or AsyncRateLimiter(
+            requests_per_minute=int(os.getenv("OPENAI_RPM", "500")),
+            tokens_per_minute=int(os.getenv("OPENAI_TPM", "30000")),
+        )
+        self.max_connections = max_connections
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self._http = None
+
+    @property
+    def http(self):
+        """httpx.AsyncClient создается внутри цикла событий при первом запросе"""
+        if self._http is None:
+            import httpx
+            self._http = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"},
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections),
+                timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+            )
+        return self._http
+
+    async def _post(self, payload, tokens):
+        """
+        Отправляет запрос с повторами. Каждая попытка занимает место в лимите запросов,
+        токены резервируются один раз. Если ответа нет, резерв возвращается целиком.
+        """
+        import httpx
+        reserved = await self.rate_limiter.acquire(tokens)
+        used = 0
+        try:
+            attempt = 0
+            while True:
+                retry_after = None
+                try:
+                    response = await self.http.post("/chat/completions", json=payload)
+                except httpx.TransportError as e:
+                    if attempt >= self.max_retries:
+                        raise
+                    reason = str(e) or type(e).__name__
+                else:
+                    if response.status_code not in RETRY_STATUS_CODES or attempt >= self.max_retries:
+                        response.raise_for_status()
+                        result = response.json()
+                        used = (result.get('usage') or {}).get('total_tokens')
+                        return result
+                    reason = f"HTTP {response.status_code}"
+                    retry_after = parse_retry_after(response.headers)
+
+                delay = compute_backoff(attempt, retry_after=retry_after)
+                if retry_after is not None:
+                    # Останавливаем и остальные запросы, а не только текущий
+                    self.rate_limiter.pause(delay)
+                attempt += 1
+                logging.warning(f"Запрос к OpenAI API не удался ({reason}), повтор {attempt}/{self.max_retries} через {delay:.2f} с")
+                await asyncio.sleep(delay)
+                await self.rate_limiter.acquire(0)
+        finally:
+            self.rate_limiter.reconcile(reserved, used)
+
+    async def process(self, ai_instructions, content=None, file_path=None, use_cache=True):
+        logging.info(f"Обработка файла: {file_path}")
+        messages = self.build_messages(ai_instructions, content, file_path)
+
+        cache_key = self.cache_key(messages) if use_cache else None
+        if cache_key:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                logging.info(f"Ответ взят из кэша: {cache_key[:12]}")
+                return cached
+
+        try:
+            result = await self._post(self.build_payload(messages), self.estimate_request_tokens(messages))
+        except Exception as e:
+            logging.error(f"Ошибка при запросе к OpenAI API: {e}")
+            raise
+
+        if cache_key and _is_cacheable(result):
+            self.cache.put(cache_key, result)
+        return result
+
+    async def aclose(self):
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
@@ -0,0 +1,69 @@
+import tkinter as tk
+from collections import deque
+
+from services.transcript_store import SPEAKER_LABELS
+
+
+class TranscriptUpdater:
+    """
+    Очередь обновлений текста расшифровки между потоком распознавания и Tk.
+
+    push_interim/push_final можно вызывать из любого потока: они только добавляют
+    событие в deque (append и popleft в CPython потокобезопасны без блокировок).
+    Виджет меняется исключительно в главном потоке через root.after раз в interval_ms:
+    все накопленные финальные фразы вставляются одним вызовом insert, а из промежуточных
+    рисуется только последняя. Поэтому стоимость обновления не зависит от частоты результатов.
+    """
+    SPEAKER_TAGS = {1: "speaker1", 2: "speaker2"}
+
+    def __init__(self, root, text_widget, interval_ms=50):
+        self.root = root
+        self.text = text_widget
+        self.interval_ms = interval_ms
+        self._events = deque()
+        self._running = False
+
+    def push_interim(self, text):
+        if text:
+            self._events.append((False, text, None))
+
+    def push_final(self, text, speaker=None):
+        if text:
+            self._events.append((True, text, speaker))
+
+    def start(self):
+        if not self._running:
+            self._running = True
+            self.root.after(self.interval_ms, self._tick)
+
+    def _tick(self):
+        self.drain()
+        self.root.after(self.interval_ms, self._tick)
+
+    def drain(self):
+        """Применяет накопленные события к виджету; вызывается только в главном потоке"""
+        events = self._events
+        finals = []
+        interim = None
+        while events:
+            is_final, text, speaker = events.popleft()
+            if is_final:
+                label = SPEAKER_LABELS.get(speaker)
+                line = f"{label}: {text}\n" if label else f"{text}\n"
+                finals.extend((line, self.SPEAKER_TAGS.get(speaker, "")))
+                # Промежуточный результат до финального уже устарел
+                interim = None
+            else:
+                interim = text
+
+        if not finals and interim is None:
+            return
+
+        # Промежуточный текст всегда занимает одну строку с тегом interim в конце виджета
+        if self.text.tag_ranges("interim"):
+            self.text.delete("interim.first", "interim.last")
+        if finals:
+            self.text.insert(tk.END, *finals)
+        if interim is not None:
+            self.text.insert(tk.END, f"Промежуточно: {interim}\n", "interim")
+        self.text.see(tk.END)
@@ -0,0 +1,117 @@
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class IncrementalJSONParser:
+    """
+    Потоковый разбор JSON-объекта верхнего уровня.
+    Как только значение очередного ключа закрывается, вызывается on_section(key, value),
+    не дожидаясь конца всего ответа.
+    """
+    def __init__(self, on_section=None):
+        self.on_section = on_section
+        self.result = {}
+        # Полученные фрагменты склеиваются только по запросу text: склейка на каждом
+        # фрагменте копировала бы весь ответ и делала разбор квадратичным
+        self._chunks = []
+        # Начало текущего ключа или значения в очередном фрагменте и его части из прошлых фрагментов
+        self._token_start = None
+        self._token_parts = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._state = "start"  # start, key, colon, value, in_value, comma, done
+        self._key = None
+
+    @property
+    def done(self):
+        return self._state == "done"
+
+    def feed(self, chunk):
+        """Добавляет очередной фрагмент текста ответа"""
+        self._chunks.append(chunk)
+        for i, ch in enumerate(chunk):
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        if self._state == "key":
+                            self._key = json.loads(self._take_token(chunk, i + 1))
+                            self._state = "colon"
+                        elif self._state == "in_value":
+                            self._emit(self._take_token(chunk, i + 1))
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                if self._depth == 1 and self._state in ("key", "value"):
+                    self._token_start = i
+                    if self._state == "value":
+                        self._state = "in_value"
+            elif ch in "{[":
+                if self._depth == 0:
+                    if ch == "{" and self._state == "start":
+                        self._state = "key"
+                    self._depth = 1
+                    continue
+                if self._depth == 1 and self._state == "value":
+                    self._token_start = i
+                    self._state = "in_value"
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 1 and self._state == "in_value":
+                    self._emit(self._take_token(chunk, i + 1))
+                elif self._depth == 0:
+                    if self._state == "in_value":
+                        self._emit(self._take_token(chunk, i))
+                    self._state = "done"
+            elif self._depth == 1:
+                if ch == ":" and self._state == "colon":
+                    self._state = "value"
+                elif ch == ",":
+                    if self._state == "in_value":
+                        self._emit(self._take_token(chunk, i))
+                    self._state = "key"
+                elif not ch.isspace() and self._state == "value":
+                    # Число, true, false или null
+                    self._token_start = i
+                    self._state = "in_value"
+
+        if self._token_start is not None:
+            # Ключ или значение продолжится в следующем фрагменте
+            self._token_parts.append(chunk[self._token_start:])
+            self._token_start = 0
+
+    def _take_token(self, chunk, end):
+        """Текст текущего ключа или значения до позиции end очередного фрагмента"""
+        self._token_parts.append(chunk[self._token_start:end])
+        raw = "".join(self._token_parts)
+        self._token_parts = []
+        self._token_start = None
+        return raw
+
+    def _emit(self, raw_value):
+        try:
+            value = json.loads(raw_value)
+        except ValueError as e:
+            logger.warning(f"Не удалось разобрать раздел {self._key}: {str(e)}")
+            self._state = "comma"
+            return
+        self._state = "comma"
+        self.result[self._key] = value
+        if self.on_section:
+            self.on_section(self._key, value)
+
+    @property
+    def text(self):
+        """Весь полученный текст"""
+        if len(self._chunks) > 1:
+            self._chunks = ["".join(self._chunks)]
+        return self._chunks[0] if self._chunks else ""
@@ -1,19 +1,26 @@
+import time
+# Отсчет времени запуска ведется до остальных импортов
+STARTED = time.perf_counter()
 import os
 import logging
+import importlib
 import tkinter as tk
 from tkinter import messagebox
 import threading
 from datetime import datetime
 from tkinter import ttk
-from report_generator import generate_report
 import subprocess
 
-from chatgpt import ChatGPTAPI
 from gui.dialogs import AddDoctorDialog
 from gui.frames import CollapsibleFrame
+from gui.transcript_view import TranscriptUpdater
 from models.doctor import Doctor
 from services.audio_service import AudioService
-from services.storage_service import StorageService
+from services.storage_service import create_storage_service
+from services.settings_service import SettingsService
+from services.patient_index import PatientIndex
+from services.transcript_store import TranscriptStore, recover_sessions
+from templates.registry import get_registry
 
 # Настройка логирования
 logging.basicConfig(
@@ -22,6 +29,15 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Сколько подсказок показывать в списке пациентов
+PATIENT_SUGGESTIONS = 20
+# Клавиши, которые не меняют текст и не должны перезапускать поиск
+NAVIGATION_KEYS = {"Up", "Down", "Left", "Right", "Return", "Escape", "Tab", "Home", "End",
+                   "Shift_L", "Shift_R", "Control_L", "Control_R", "Alt_L", "Alt_R"}
+# Тяжелые модули (openai, requests, python-docx) импортируются в фоне после появления окна;
+# методы импортируют их локально, к моменту вызова они обычно уже загружены
+DEFERRED_MODULES = ("chatgpt", "report_generator", "process_utils", "services.rolling_extractor", "services.vad")
+
 class AudioRecorderApp:
     def __init__(self, root):
         self.root = root
@@ -29,24 +45,39 @@ class AudioRecorderApp:
         self.root.geometry("500x600")
         
         # Инициализация сервисов
-        self.storage_service = StorageService()
+        self.settings = SettingsService()
+        self.storage_service = create_storage_service()
         self.audio_service = AudioService(
             on_interim_result=lambda text: self.update_transcript_text(text, is_final=False),
-            on_final_result=lambda text, speaker=None: self.update_transcript_text(text, is_final=True, speaker=speaker)
+            on_final_result=lambda text, speaker=None: self.update_transcript_text(text, is_final=True, speaker=speaker),
+            on_segment=self.save_segment
         )
         
         # Состояние приложения
         self.is_recording = False
         self.start_time = None
         self.current_transcript_file = None
+        self.current_timestamp = None
+        self.transcript_store = None
+        self.rolling_extractor = None
+        self.chatgpt_api = None
+        self._chatgpt_lock = threading.Lock()
         
         # Загрузка данных
-        self.patient_history = self.storage_service.load_patient_history()
+        started = time.perf_counter()
+        self.patient_index = PatientIndex(self.storage_service.load_patient_history())
+        logger.info(f"Индекс пациентов построен: {len(self.patient_index)} за "
+                    f"{(time.perf_counter() - started) * 1000:.0f} мс")
         self.doctors = self.storage_service.load_doctors()
         self.last_selected_doctor = self.load_last_selected_doctor()
+        recovered = recover_sessions()
+        if recovered:
+            logger.info(f"Восстановлены транскрипты прерванных приемов: {recovered}")
+        logger.info(f"Оценка токенов в шаблонах: {get_registry().token_counts()}")
         
         # Создаем интерфейс
         self.setup_ui()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
         
         # Устанавливаем последнего выбранного врача
         if self.last_selected_doctor in self.doctors:
@@ -79,19 +110,33 @@ class AudioRecorderApp:
         
         ttk.Label(patient_frame, text="ФИО пациента:").pack(side="left", padx=5)
         
-        # Комбобокс с автозаполнением
+        # Комбобокс с автозаполнением: в списке - подсказки по введенному тексту
         self.patient_var = tk.StringVar()
         self.patient_combo = ttk.Combobox(patient_frame, 
                                         textvariable=self.patient_var,
-                                        values=self.patient_history)
+                                        values=self.patient_index.search("", PATIENT_SUGGESTIONS))
         self.patient_combo.pack(side="left", fill="x", expand=True, padx=5)
         self.patient_combo.bind('<Return>', self.add_patient)
+        self.patient_combo.bind('<KeyRelease>', self.on_patient_typed)
         self.patient_combo.bind('<<ComboboxSelected>>', self.on_patient_selected)
         
         # Кнопка добавления пациента
         ttk.Button(patient_frame, text="Добавить", 
                   command=self.add_patient).pack(side="left", padx=5)
         
+        # Промежуточное извлечение во время приема
+        self.rolling_var = tk.BooleanVar(value=self.settings.get("rolling_extraction") == "1")
+        ttk.Checkbutton(self.root, text="Готовить заключение во время приема",
+                        variable=self.rolling_var,
+                        command=lambda: self.settings.set("rolling_extraction", "1" if self.rolling_var.get() else "0")
+                        ).pack(padx=10, anchor="w")
+        
+        # Постоянный захват: микрофон открыт между приемами, запись включает несколько секунд до нажатия кнопки
+        self.capture_var = tk.BooleanVar(value=self.settings.get("persistent_capture") == "1")
+        self.capture_check = ttk.Checkbutton(self.root, text="Держать микрофон открытым (запись начнется с нескольких секунд до нажатия)",
+                                             variable=self.capture_var, command=self.on_capture_toggled)
+        self.capture_check.pack(padx=10, anchor="w")
+        
         # Таймер
         self.timer_label = ttk.Label(self.root, text="00:00:00", font=("Arial", 24))
         self.timer_label.pack(pady=20)
@@ -119,6 +164,8 @@ class AudioRecorderApp:
         self.transcript_text.tag_configure("speaker1", foreground="blue")
         self.transcript_text.tag_configure("speaker2", foreground="green")
         self.transcript_text.tag_configure("interim", foreground="gray")
+        self.transcript_updater = TranscriptUpdater(self.root, self.transcript_text)
+        self.transcript_updater.start()
         
         # Полоса прокрутки для текста
         scrollbar = ttk.Scrollbar(self.transcript_frame.sub_frame, 
@@ -126,6 +173,13 @@ class AudioRecorderApp:
         scrollbar.pack(side="right", fill="y")
         self.transcript_text.config(yscrollcommand=scrollbar.set)
         
+        # Сворачиваемая панель с заключением, которое заполняется по мере ответа ChatGPT
+        self.report_frame = CollapsibleFrame(self.root, text="Заключение")
+        self.report_frame.pack(fill="x", padx=10, pady=5)
+        self.report_text = tk.Text(self.report_frame.sub_frame, height=10, wrap="word",
+                                   font=("Courier New", 10))
+        self.report_text.pack(fill="both", expand=True, padx=5, pady=5)
+        
         # Добавляем фрейм для ссылки на документ
         self.doc_link_frame = ttk.Frame(self.root)
         self.doc_link_frame.pack(pady=5, fill=tk.X, padx=10)
@@ -137,10 +191,34 @@ class AudioRecorderApp:
     def add_patient(self, event=None):
         """Добавление нового пациента в историю"""
         patient_name = self.patient_var.get().strip()
-        if patient_name and patient_name not in self.patient_history:
-            self.patient_history.append(patient_name)
-            self.patient_combo['values'] = self.patient_history
-            self.storage_service.save_patient_history(self.patient_history)
+        if patient_name and self.storage_service.add_patient(patient_name):
+            self.patient_index.add(patient_name)
+            self.patient_combo['values'] = self.patient_index.search(patient_name, PATIENT_SUGGESTIONS)
+    
+    def on_patient_typed(self, event=None):
+        """Обновление подсказок пациентов при вводе"""
+        if event is not None and event.keysym in NAVIGATION_KEYS:
+            return
+        started = time.perf_counter()
+        self.patient_combo['values'] = self.patient_index.search(self.patient_var.get(), PATIENT_SUGGESTIONS)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if elapsed_ms > 10:
+            logger.debug(f"Поиск пациента занял {elapsed_ms:.1f} мс")
+    
+    def on_capture_toggled(self):
+        """Включение/выключение постоянного захвата; устройство открывается в фоновом потоке"""
+        enabled = self.capture_var.get()
+        self.settings.set("persistent_capture", "1" if enabled else "0")
+        threading.Thread(target=self.apply_persistent_capture, args=(enabled,), daemon=True).start()
+    
+    def apply_persistent_capture(self, enabled):
+        try:
+            if enabled:
+                self.audio_service.enable_persistent_capture()
+            else:
+                self.audio_service.disable_persistent_capture()
+        except Exception as e:
+            logger.error(f"Не удалось переключить постоянный захват: {str(e)}")
     
     def add_doctor_dialog(self):
         """Открытие диалога добавления врача"""
@@ -149,7 +227,7 @@ class AudioRecorderApp:
         if dialog.result:
             name, specialization = dialog.result
             self.doctors[name] = specialization
-            self.storage_service.save_doctors(self.doctors)
+            self.storage_service.add_doctor(name, specialization)
             self.doctor_combo['values'] = list(self.doctors.keys())
             self.doctor_combo.set(name)
             self.on_doctor_selected()
@@ -166,41 +244,57 @@ class AudioRecorderApp:
             self.save_last_selected_doctor()
     
     def update_transcript_text(self, text, is_final=False, speaker=None):
-        """Обновление текста расшифровки"""
-        if not text:  # Игнорируем пустой текст
-            return
-            
+        """
+        Обновление текста расшифровки. Вызывается из потока распознавания,
+        поэтому только ставит событие в очередь, а виджет меняет TranscriptUpdater в главном потоке
+        """
         if is_final:
-            # Удаляем промежуточные результаты
-            last_line_start = self.transcript_text.get("end-2c linestart", "end-1c")
-            if last_line_start.startswith("Промежуточно:"):
-                self.transcript_text.delete("end-2c linestart", "end-1c")
-            
-            # Определяем тег для спикера
-            tag = None
-            if speaker == 1:
-                text = f"Врач: {text}\n"
-                tag = "speaker1"
-            elif speaker == 2:
-                text = f"Пациент: {text}\n"
-                tag = "speaker2"
-            else:
-                text = f"{text}\n"
-            
-            # Вставляем текст с тегом
-            self.transcript_text.insert(tk.END, text, tag)
+            self.transcript_updater.push_final(text, speaker)
         else:
-            # Показываем промежуточный текст, но не сохраняем его
-            # Удаляем предыдущий промежуточный результат
-            last_line_start = self.transcript_text.get("end-2c linestart", "end-1c")
-            if last_line_start.startswith("Промежуточно:"):
-                self.transcript_text.delete("end-2c linestart", "end-1c")
-            
-            # Добавляем новый промежуточный текст серым цветом
-            self.transcript_text.insert(tk.END, f"Промежуточно: {text}\n", "interim")
-        
-        # Прокручиваем к последней строке
-        self.transcript_text.see(tk.END)
+            self.transcript_updater.push_interim(text)
+    
+    def save_segment(self, segment):
+        """Дописывает финальную фразу в журнал текущего приема и передает ее промежуточному извлечению"""
+        if self.transcript_store:
+            self.transcript_store.append(segment)
+        if self.rolling_extractor:
+            self.rolling_extractor.add_segment(segment)
+    
+    def start_rolling_extraction(self):
+        """Запускает извлечение данных по ходу приема, если оно включено в настройках"""
+        self.stop_rolling_extraction()
+        if not self.rolling_var.get():
+            return
+        from process_utils import load_template_instructions
+        from services.rolling_extractor import RollingExtractor, get_rolling_interval
+        doctor_type = self.doctors[self.doctor_var.get()]
+        self.rolling_extractor = RollingExtractor(
+            self.get_chatgpt_api(), load_template_instructions(doctor_type),
+            interval=get_rolling_interval(),
+            on_update=lambda result: self.root.after(0, self.show_draft_report, result)
+        ).start()
+    
+    def stop_rolling_extraction(self):
+        """Останавливает извлечение по ходу приема, если его результат не понадобится"""
+        if self.rolling_extractor:
+            self.rolling_extractor.cancel()
+            self.rolling_extractor = None
+    
+    def show_draft_report(self, result):
+        """Показывает черновик заключения, собранный по уже обработанной части приема"""
+        from report_generator import format_report_text
+        self.report_text.delete("1.0", tk.END)
+        self.report_text.insert(tk.END, format_report_text(result))
+        self.status_label.config(text="Идет запись... (черновик заключения обновлен)")
+    
+    def show_report_section(self, key, value):
+        """Показывает раздел заключения, как только он получен от ChatGPT"""
+        from report_generator import format_section_text, SECTION_TITLES
+        if key not in SECTION_TITLES:
+            return
+        self.report_text.insert(tk.END, format_section_text(key, value) + "\n\n")
+        self.report_text.see(tk.END)
+        self.status_label.config(text=f"Получен раздел: {SECTION_TITLES[key]}")
     
     def update_timer(self):
         if self.is_recording and self.start_time:
@@ -214,6 +308,7 @@ class AudioRecorderApp:
     
     def process_results(self):
         """Обработка результатов"""
+        from process_utils import process_consultation
         try:
             if not os.path.exists(self.current_transcript_file):
                 raise FileNotFoundError("Файл транскрипта не найден")
@@ -221,7 +316,8 @@ class AudioRecorderApp:
             if os.path.getsize(self.current_transcript_file) == 0:
                 raise ValueError("Файл транскрипта пуст")
             
-            current_time = datetime.now().strftime("%Y%m%d_%H%M%S")
+            # Ключ приема - время начала записи, как у транскрипта (и как в пакетной обработке)
+            current_time = self.current_timestamp
             
             # Получаем ФИО пациента
             patient_name = self.patient_var.get().strip()
@@ -235,34 +331,14 @@ class AudioRecorderApp:
             
             doctor_type = self.doctors[selected_doctor]
             
-            # Импортируем соответствующий модуль
-            try:
-                module_name = f"templates.{doctor_type}"
-                process_file = __import__(module_name, fromlist=['process_file']).process_file
-            except ImportError:
-                raise ImportError(f"Шаблон для специализации {doctor_type} не найден")
-            
-            # Обрабатываем через ChatGPT
-            chatgpt_api = ChatGPTAPI(api_key=os.getenv('OPENAI_API_KEY'))
-            result = process_file(self.current_transcript_file, chatgpt_api, None)
-            
-            # Добавляем информацию о враче и пациенте в результат
-            if isinstance(result, dict):
-                if 'patient' not in result:
-                    result['patient'] = {}
-                result['patient']['name'] = patient_name
-                result['doctor'] = {
-                    'name': selected_doctor,
-                    'specialization': Doctor.SPECIALIZATIONS_REVERSE.get(doctor_type, doctor_type)
-                }
-            
-            # Сохраняем результат в JSON
-            result_file = self.storage_service.save_result(result, current_time)
-            logger.info(f"Результат сохранен в {result_file}")
-            
-            # Создаем отчет в формате DOCX
-            report_text = self.format_report_text(result)
-            report_file = generate_report(patient_name=patient_name, report_text=report_text)
+            # Обрабатываем через ChatGPT, сохраняем JSON и создаем DOCX
+            self.root.after(0, lambda: self.report_text.delete("1.0", tk.END))
+            result, result_file, report_file = process_consultation(
+                self.current_transcript_file, patient_name, selected_doctor, doctor_type,
+                self.get_chatgpt_api(), self.storage_service, current_time,
+                on_section=lambda key, value: self.root.after(0, self.show_report_section, key, value),
+                extractor=self.rolling_extractor
+            )
             
             if report_file:
                 self.current_report_path = report_file
@@ -279,39 +355,48 @@ class AudioRecorderApp:
             messagebox.showerror("Ошибка", f"Не удалось обработать результаты: {str(e)}")
             self.reset_ui()
         finally:
+            self.stop_rolling_extraction()
             # Разблокируем кнопку
             self.root.after(0, lambda: self.record_button.config(state="normal"))
             
+    def get_chatgpt_api(self):
+        """Возвращает клиент ChatGPT, общий для всех приемов"""
+        with self._chatgpt_lock:
+            if self.chatgpt_api is None:
+                from chatgpt import ChatGPTAPI
+                self.chatgpt_api = ChatGPTAPI(api_key=os.getenv('OPENAI_API_KEY'))
+            return self.chatgpt_api
+    
+    def start_prewarm(self):
+        """Фоновая подготовка к первому приему после появления окна"""
+        threading.Thread(target=self.prewarm, name="prewarm", daemon=True).start()
+    
+    def prewarm(self):
+        """
+        Импорт отложенных модулей, создание клиента Speech API с подключением,
+        инициализация микрофона и подключение к API модели. Клиенты и устройство
+        затем переиспользуются всеми приемами, поэтому первая запись начинается без задержки.
+        """
+        timings = {}
+        started = time.perf_counter()
+        for name in DEFERRED_MODULES:
+            importlib.import_module(name)
+        timings["imports_ms"] = round((time.perf_counter() - started) * 1000)
+        try:
+            timings.update(self.audio_service.prewarm())
+        except Exception as e:
+            logger.warning(f"Не удалось подготовить распознавание речи: {str(e)}")
+        if self.capture_var.get():
+            self.apply_persistent_capture(True)
+        started = time.perf_counter()
+        if self.get_chatgpt_api().transport.warm_up():
+            timings["llm_transport_ms"] = round((time.perf_counter() - started) * 1000)
+        logger.info(f"Прогрев завершен через {(time.perf_counter() - STARTED) * 1000:.0f} мс после запуска: {timings}")
+            
     def format_report_text(self, result):
         """Форматирует результат из JSON в текст для отчета"""
-        report_parts = []
-        
-        # Добавляем информацию о враче
-        if 'doctor' in result:
-            report_parts.append(f"Врач: {result['doctor']['name']}")
-            report_parts.append(f"Специализация: {result['doctor']['specialization']}\n")
-        
-        # Добавляем жалобы
-        if 'complaints' in result:
-            report_parts.append("Жалобы:")
-            for complaint in result['complaints']:
-                report_parts.append(f"- {complaint}")
-            report_parts.append("")
-        
-        # Добавляем диагноз
-        if 'provisional diagnosis' in result:
-            report_parts.append("Предварительный диагноз:")
-            for diagnosis in result['provisional diagnosis']:
-                report_parts.append(f"- {diagnosis}")
-            report_parts.append("")
-        
-        # Доб��вляем рекомендации
-        if 'recommendations' in result:
-            report_parts.append("Рекомендации:")
-            for recommendation in result['recommendations']:
-                report_parts.append(f"- {recommendation}")
-        
-        return "\n".join(report_parts)
+        from report_generator import format_report_text
+        return format_report_text(result)
     
     def reset_ui(self):
         """Сброс интерфейса в исходное состояние"""
@@ -319,6 +404,7 @@ class AudioRecorderApp:
         self.status_label.config(text="Готов к записи")
         self.record_button.config(state="normal")
         self.record_button.config(text="Начать прием")
+        self.capture_check.config(state="normal")
     
     def toggle_recording(self):
         if not self.is_recording:
@@ -342,19 +428,26 @@ class AudioRecorderApp:
             
             # Начинаем запись
             self.is_recording = True
+            self.capture_check.config(state="disabled")
             self.record_button.config(text="Завершить прием")
             self.status_label.config(text="Идет запись...")
             self.start_time = datetime.now()
             
             # Инициализируем файл транскрипта
             current_time = self.start_time.strftime("%Y%m%d_%H%M%S")
+            self.current_timestamp = current_time
             self.current_transcript_file = f"audio_records/transcript_{current_time}.txt"
+            self.transcript_store = TranscriptStore(f"audio_records/transcript_{current_time}.jsonl")
+            self.start_rolling_extraction()
             
             # Запускаем таймер
             self.update_timer()
             
             # Запускаем запись в отдельном потоке
-            self.recording_thread = threading.Thread(target=self.audio_service.start_recording)
+            self.recording_thread = threading.Thread(
+                target=self.audio_service.start_recording,
+                kwargs={"archive_path": f"audio_records/{current_time}.wav"}
+            )
             self.recording_thread.start()
         else:
             # Останавливаем запи��ь
@@ -371,19 +464,27 @@ class AudioRecorderApp:
                     if self.recording_thread and self.recording_thread.is_alive():
                         self.recording_thread.join(timeout=5)
                     
-                    # Сохраняем транскрипт
-                    transcript_content = self.transcript_text.get("1.0", tk.END).strip()
-                    if transcript_content:
-                        with open(self.current_transcript_file, "w", encoding="utf-8") as f:
-                            f.write(transcript_content)
+                    # Сохраняем транскрипт из журнала финальных фраз: файл, база приемов и поисковый индекс
+                    self.transcript_store.close()
+                    transcript = self.transcript_store.render()
+                    if transcript:
+                        self.storage_service.save_transcript(
+                            transcript, self.current_timestamp,
+                            patient_name=self.patient_var.get().strip() or None,
+                            doctor_name=self.doctor_var.get() or None
+                        )
                     
                     # Запускаем обработку результатов
                     if self.current_transcript_file and os.path.exists(self.current_transcript_file):
                         self.process_results()
+                    else:
+                        # Фраз не было - обработки не будет, фоновое извлечение останавливаем здесь
+                        self.stop_rolling_extraction()
                     
                     # Обновляем UI
                     self.root.after(0, self.reset_ui)
                 except Exception as e:
+                    self.stop_rolling_extraction()
                     logger.error(f"Ошибка при остановке записи: {str(e)}")
                     self.root.after(0, lambda: messagebox.showerror("Ошибка", 
                         f"Ошибка при остановке записи: {str(e)}"))
@@ -392,34 +493,20 @@ class AudioRecorderApp:
             # Запускаем остановку записи в отдельном потоке
             threading.Thread(target=stop_recording).start()
     
-    def save_settings(self, key, value):
-        """Сохранение настройки в файл"""
-        settings = self.load_settings()
-        settings[key] = value
-        with open("settings.txt", "w", encoding="utf-8") as f:
-            for k, v in settings.items():
-                f.write(f"{k}={v}\n")
-
-    def load_settings(self):
-        """Загрузка настроек из файла"""
-        settings = {}
-        try:
-            with open("settings.txt", "r", encoding="utf-8") as f:
-                for line in f:
-                    key, value = line.strip().split('=', 1)
-                    settings[key] = value
-        except FileNotFoundError:
-            pass
-        return settings
-
     def save_last_selected_doctor(self):
-        """Сохранение последнего выбранного врача"""
-        self.save_settings("last_selected_doctor", self.doctor_var.get())
+        """Сохранение последнего выбранного врача (файл настроек записывается в фоне)"""
+        self.settings.set("last_selected_doctor", self.doctor_var.get())
 
     def load_last_selected_doctor(self):
         """Загрузка последнего выбранного врача"""
-        settings = self.load_settings()
-        return settings.get("last_selected_doctor")
+        return self.settings.get("last_selected_doctor")
+
+    def on_closing(self):
+        """Закрытие окна: отложенные изменения настроек и списков записываются до выхода"""
+        self.settings.flush()
+        self.storage_service.flush()
+        self.audio_service.shutdown()
+        self.root.destroy()
 
     def open_report(self, event=None):
         """Открывает сгенерированный отчет"""
@@ -438,6 +525,7 @@ class AudioRecorderApp:
 
     def process_gpt_response(self, response_text, patient_name):
         """Обрабатывает ответ от GPT и создает отчет"""
+        from report_generator import generate_report
         # Создаем отчет
         report_file = generate_report(patient_name=patient_name, report_text=response_text)
         if report_file:
@@ -452,6 +540,9 @@ if __name__ == "__main__":
     try:
         root = tk.Tk()
         app = AudioRecorderApp(root)
+        # Прогрев начинается, когда окно уже отрисовано
+        root.after_idle(lambda: logger.info(f"Окно готово через {(time.perf_counter() - STARTED) * 1000:.0f} мс после запуска"))
+        root.after_idle(app.start_prewarm)
         root.mainloop()
     except Exception as e:
         logger.error(f"Критическая ошибка: {str(e)}")
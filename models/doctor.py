@@ -1,17 +1,8 @@
+from templates.registry import get_registry
+
 class Doctor:
-    # Словарь соответствия специализаций
-    SPECIALIZATIONS = {
-        "Педиатр": "pediatrician",
-        "Терапевт": "general_physician",
-        "Невролог": "neurologist",
-        "Кардиолог": "cardiologist",
-        "Офтальмолог": "ophthalmologist",
-        "Отоларинголог": "otolaryngologist",
-        "Хирург": "surgeon",
-        "Гинеколог": "gynecologist",
-        "Уролог": "urologist",
-        "Эндокринолог": "endocrinologist"
-    }
+    # Словарь соответствия специализаций (загружается из templates/specializations.json)
+    SPECIALIZATIONS = get_registry().specializations()
     
     # Обратный словарь для получения русского названия
     SPECIALIZATIONS_REVERSE = {v: k for k, v in SPECIALIZATIONS.items()}
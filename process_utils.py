@@ -1,34 +1,279 @@
 import logging
 import json
 import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 
-def process_file(file_path, chatgpt_api, chatgpt_vision_api, ai_instructions):
+from chatgpt import estimate_tokens
+from models.doctor import Doctor
+from templates.registry import get_registry
+from report_generator import generate_report, format_report_text, format_doctor_text, ReportBuilder
+
+
+def read_transcript(file_path):
+    """Читает файл транскрипта"""
+    # Проверяем существование файла
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"Файл {file_path} не найден")
+        
+    with open(file_path, 'r', encoding='utf-8') as file:
+        return file.read()
+
+
+def parse_response(response):
+    """Извлекает JSON заключения из ответа ChatGPT"""
+    # Проверяем наличие ответа
+    if not response or 'choices' not in response:
+        raise ValueError("Некорректный ответ от API")
+        
+    # Извлекаем JSON из ответа
+    try:
+        return json.loads(response['choices'][0]['message']['content'])
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Ошибка при разборе JSON: {str(e)}")
+
+
+def split_transcript(content, max_tokens):
+    """
+    Делит транскрипт на части не больше max_tokens по границам реплик (строк).
+    Реплика, которая сама длиннее лимита, остается целой.
+    """
+    chunks = []
+    current = []
+    size = 0
+    for line in content.splitlines():
+        if not line.strip():
+            continue
+        tokens = estimate_tokens(line)
+        if current and size + tokens > max_tokens:
+            chunks.append("\n".join(current))
+            current = []
+            size = 0
+        current.append(line)
+        size += tokens
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def chunk_instructions(ai_instructions, index, total=None):
+    """
+    Инструкции для одной части длинного разговора; добавка идет после общего префикса шаблона.
+    Без total - для фрагмента приема, который еще продолжается.
+    """
+    part = f"Это часть {index} из {total} длинного разговора. " if total else \
+        f"Это фрагмент {index} продолжающегося разговора. "
+    return (f"{ai_instructions}\n{part}"
+            "Извлеки данные только из этой части. Если раздел в ней не упоминается, оставь его пустым.\n")
+
+
+def _normalize_item(item):
+    text = json.dumps(item, ensure_ascii=False) if not isinstance(item, str) else item
+    return " ".join(text.casefold().replace("ё", "е").strip(" .;,").split())
+
+
+def merge_results(partials):
+    """
+    Объединяет частичные заключения: списки склеиваются без повторов в порядке появления,
+    для словарей и остальных полей берется первое непустое значение
+    """
+    merged = {}
+    seen = {}
+    for partial in partials:
+        if not isinstance(partial, dict):
+            continue
+        for key, value in partial.items():
+            if isinstance(value, list):
+                items = merged.setdefault(key, [])
+                keys = seen.setdefault(key, set())
+                for item in value:
+                    normalized = _normalize_item(item)
+                    if normalized and normalized not in keys:
+                        keys.add(normalized)
+                        items.append(item)
+            elif isinstance(value, dict):
+                target = merged.setdefault(key, {})
+                for field, field_value in value.items():
+                    if field_value and not target.get(field):
+                        target[field] = field_value
+            elif value and not merged.get(key):
+                merged[key] = value
+    return merged
+
+
+def get_chunk_settings(chunk_tokens=None, max_workers=None):
+    """Размер части (в токенах) и число параллельных запросов; по умолчанию из окружения"""
+    if chunk_tokens is None:
+        chunk_tokens = int(os.getenv("LLM_CHUNK_TOKENS", "6000"))
+    if max_workers is None:
+        max_workers = int(os.getenv("LLM_CHUNK_WORKERS", "4"))
+    return chunk_tokens, max_workers
+
+
+def process_chunks(content, chatgpt_api, ai_instructions, chunk_tokens, max_workers):
+    """
+    Map-reduce для длинных разговоров: части обрабатываются параллельно,
+    затем частичные результаты объединяются без повторного запроса к ChatGPT
+    """
+    chunks = split_transcript(content, chunk_tokens)
+    logging.info(f"Транскрипт разбит на {len(chunks)} частей")
+
+    def extract(item):
+        index, chunk = item
+        response = chatgpt_api.process(chunk_instructions(ai_instructions, index, len(chunks)), chunk)
+        return parse_response(response)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        partials = list(executor.map(extract, enumerate(chunks, 1)))
+    return merge_results(partials)
+
+
+def process_file(file_path, chatgpt_api, chatgpt_vision_api, ai_instructions, on_section=None,
+                 chunk_tokens=None, max_workers=None):
     """
-    Обрабатывает файл с транскриптом и возвращает результат в формате JSON
+    Обрабатывает файл с транскриптом и возвращает результат в формате JSON.
+    Если задан on_section, ответ читается потоком и разделы передаются в on_section(key, value)
+    по мере готовности.
+    Транскрипт длиннее chunk_tokens обрабатывается по частям (не более max_workers запросов одновременно).
     """
     try:
-        # Проверяем существование файла
-        if not os.path.exists(file_path):
-            raise FileNotFoundError(f"Файл {file_path} не найден")
-            
         # Читаем содержимое файла
-        with open(file_path, 'r', encoding='utf-8') as file:
-            content = file.read()
+        content = read_transcript(file_path)
+        chunk_tokens, max_workers = get_chunk_settings(chunk_tokens, max_workers)
             
-        # Получаем ответ от ChatGPT
-        response = chatgpt_api.process(ai_instructions, content)
-        
-        # Проверяем наличие ответа
-        if not response or 'choices' not in response:
-            raise ValueError("Некорректный ответ от API")
-            
-        # Извлекаем JSON из ответа
-        try:
-            result = json.loads(response['choices'][0]['message']['content'])
+        # Длинный разговор обрабатываем по частям
+        if estimate_tokens(content) > chunk_tokens:
+            result = process_chunks(content, chatgpt_api, ai_instructions, chunk_tokens, max_workers)
+            if on_section is not None:
+                for key, value in result.items():
+                    on_section(key, value)
             return result
-        except json.JSONDecodeError as e:
-            raise ValueError(f"Ошибка при разборе JSON: {str(e)}")
             
+        # Получаем ответ от ChatGPT
+        if on_section is not None:
+            response = chatgpt_api.process_stream(ai_instructions, content, on_section=on_section)
+        else:
+            response = chatgpt_api.process(ai_instructions, content)
+        return parse_response(response)
+            
+    except Exception as e:
+        logging.error(f"Ошибка при обработке файла: {str(e)}")
+        raise
+
+
+async def process_file_async(file_path, chatgpt_api, chatgpt_vision_api, ai_instructions,
+                             chunk_tokens=None, max_workers=None):
+    """
+    Асинхронный вариант process_file для AsyncChatGPTAPI
+    """
+    try:
+        content = read_transcript(file_path)
+        chunk_tokens, max_workers = get_chunk_settings(chunk_tokens, max_workers)
+        if estimate_tokens(content) <= chunk_tokens:
+            response = await chatgpt_api.process(ai_instructions, content)
+            return parse_response(response)
+
+        chunks = split_transcript(content, chunk_tokens)
+        semaphore = asyncio.Semaphore(max_workers)
+
+        async def extract(index, chunk):
+            async with semaphore:
+                response = await chatgpt_api.process(chunk_instructions(ai_instructions, index, len(chunks)), chunk)
+            return parse_response(response)
+
+        partials = await asyncio.gather(*(extract(i, chunk) for i, chunk in enumerate(chunks, 1)))
+        return merge_results(partials)
     except Exception as e:
         logging.error(f"Ошибка при обработке файла: {str(e)}")
         raise
+
+
+def load_template_instructions(doctor_type):
+    """
+    Возвращает инструкции для ChatGPT из реестра шаблонов специализаций
+    """
+    return get_registry().get(doctor_type).prompt
+
+
+def doctor_info(doctor_name, doctor_type):
+    """Информация о враче в том виде, в котором она сохраняется в результате"""
+    return {
+        'name': doctor_name,
+        'specialization': Doctor.SPECIALIZATIONS_REVERSE.get(doctor_type, doctor_type)
+    }
+
+
+def add_consultation_info(result, patient_name, doctor_name, doctor_type):
+    """
+    Добавляет в результат информацию о пациенте и враче
+    """
+    if isinstance(result, dict):
+        if 'patient' not in result:
+            result['patient'] = {}
+        result['patient']['name'] = patient_name
+        result['doctor'] = doctor_info(doctor_name, doctor_type)
+    return result
+
+
+def process_consultation(transcript_file, patient_name, doctor_name, doctor_type,
+                         chatgpt_api, storage_service, timestamp, on_section=None, extractor=None):
+    """
+    Полный цикл обработки приема: шаблон -> ChatGPT -> JSON -> DOCX.
+    С on_section ответ читается потоком, а DOCX собирается по мере поступления разделов.
+    С extractor (RollingExtractor, работавший во время записи) остается обработать
+    только последний фрагмент приема и объединить результаты.
+
+    Returns:
+        tuple: (результат, путь к JSON, путь к DOCX или None)
+    """
+    ai_instructions = load_template_instructions(doctor_type)
+    builder = None
+    handle_section = None
+    if on_section is not None:
+        builder = ReportBuilder(patient_name)
+        builder.add_text(format_doctor_text(doctor_info(doctor_name, doctor_type)).rstrip())
+
+        def handle_section(key, value):
+            builder.add_section(key, value)
+            on_section(key, value)
+
+    if extractor is not None:
+        result = extractor.finish()
+        if handle_section is not None:
+            for key, value in result.items():
+                handle_section(key, value)
+    else:
+        result = process_file(transcript_file, chatgpt_api, None, ai_instructions, on_section=handle_section)
+    add_consultation_info(result, patient_name, doctor_name, doctor_type)
+    return save_consultation(result, patient_name, storage_service, timestamp, builder, transcript_file)
+
+
+async def process_consultation_async(transcript_file, patient_name, doctor_name, doctor_type,
+                                     chatgpt_api, storage_service, timestamp):
+    """
+    То же, что process_consultation, но с AsyncChatGPTAPI.
+    Сохранение и создание DOCX выполняются в пуле потоков, не блокируя цикл событий.
+    """
+    ai_instructions = load_template_instructions(doctor_type)
+    result = await process_file_async(transcript_file, chatgpt_api, None, ai_instructions)
+    add_consultation_info(result, patient_name, doctor_name, doctor_type)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, save_consultation, result, patient_name, storage_service, timestamp,
+                                      None, transcript_file)
+
+
+def save_consultation(result, patient_name, storage_service, timestamp, builder=None, transcript_file=None):
+    """Сохраняет результат в JSON и создает отчет DOCX"""
+    result_file = storage_service.save_result(result, timestamp, transcript_file)
+    logging.info(f"Результат сохранен в {result_file}")
+
+    # Создаем отчет в формате DOCX
+    if builder is not None:
+        # Разделы, не распознанные при потоковом разборе, добавляем из итогового результата
+        for key, value in result.items():
+            builder.add_section(key, value)
+        report_file = generate_report(patient_name=patient_name, builder=builder, timestamp=timestamp)
+    else:
+        report_text = format_report_text(result)
+        report_file = generate_report(patient_name=patient_name, report_text=report_text, timestamp=timestamp)
+    return result, result_file, report_file
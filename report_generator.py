@@ -1,58 +1,153 @@
+import io
 import os
+import re
 from datetime import datetime
 from docx import Document
 from docx.shared import Pt
 import json
 
-def create_medical_report(patient_name, report_text):
+from services.file_utils import atomic_write_bytes
+from templates.registry import get_registry
+
+# Разделы заключения в порядке вывода (из реестра шаблонов специализаций)
+REPORT_SECTIONS = get_registry().section_titles()
+SECTION_TITLES = dict(REPORT_SECTIONS)
+
+TIMESTAMP_FORMAT = "%Y%m%d_%H%M%S"
+
+
+def parse_timestamp(timestamp):
+    """Дата приема из метки времени ГГГГММДД_ЧЧММСС (лишние символы в конце игнорируются)"""
+    return datetime.strptime(timestamp[:15], TIMESTAMP_FORMAT)
+
+
+def report_path(patient_name, timestamp=None, directory="Reports"):
+    """
+    Путь к DOCX заключения: Reports/<ФИО>_<дд_мм_ГГГГ>_<ЧЧММСС>.docx.
+    Время приема в имени не дает повторным приемам за один день перезаписывать друг друга.
+
+    Args:
+        timestamp (str): Метка времени приема в формате ГГГГММДД_ЧЧММСС (по умолчанию - текущее время)
+    """
+    moment = parse_timestamp(timestamp) if timestamp else datetime.now()
+    safe_name = re.sub(r'[\\/:*?"<>|]', '', patient_name).strip().replace(' ', '_') or "Не_указано"
+    return os.path.join(directory, f'{safe_name}_{moment.strftime("%d_%m_%Y_%H%M%S")}.docx')
+
+
+class ReportBuilder:
+    """
+    Постепенно собирает DOCX заключения: заголовок создается сразу,
+    разделы добавляются по мере их поступления от ChatGPT
+    """
+    def __init__(self, patient_name, date=None):
+        self.patient_name = patient_name
+        self.added_sections = set()
+        date = date or datetime.now()
+
+        # Создаем новый документ
+        self.doc = Document()
+
+        # Настраиваем стиль для заголовка
+        title = self.doc.add_heading('Медицинское заключение', 0)
+        title.alignment = 1  # Центрирование
+
+        # Добавляем информацию о пациенте
+        self.doc.add_paragraph(f'Пациент: {patient_name}')
+        self.doc.add_paragraph(f'Дата: {date.strftime("%d.%m.%Y")}')
+        self.doc.add_paragraph('')  # Пустая строка для разделения
+
+    def add_text(self, text):
+        """Добавляет произвольный текст отдельным абзацем"""
+        self.doc.add_paragraph(text)
+
+    def add_section(self, key, items):
+        """Добавляет раздел заключения, если он еще не был добавлен"""
+        if key not in SECTION_TITLES or key in self.added_sections:
+            return
+        self.added_sections.add(key)
+        self.add_text(format_section_text(key, items))
+
+    def to_bytes(self):
+        """Содержимое DOCX-файла"""
+        output = io.BytesIO()
+        self.doc.save(output)
+        return output.getvalue()
+
+    def save(self, timestamp=None, path=None):
+        """
+        Сохраняет документ и возвращает путь к файлу.
+        Файл записывается атомарно, поэтому при сбое не остается недописанного DOCX.
+
+        Args:
+            timestamp (str): Метка времени приема для имени файла (ГГГГММДД_ЧЧММСС)
+            path (str): Явный путь к файлу вместо Reports/<ФИО>_<дата>_<время>.docx
+        """
+        filename = path or report_path(self.patient_name, timestamp)
+        atomic_write_bytes(filename, self.to_bytes())
+        return filename
+
+def create_medical_report(patient_name, report_text, timestamp=None):
     """
     Создает медицинское заключение в формате DOCX
-    
+
     Args:
         patient_name (str): ФИО пациента
         report_text (str): Текст заключения от ChatGPT
+        timestamp (str): Метка времени приема (ГГГГММДД_ЧЧММСС)
     """
-    # Создаем новый документ
-    doc = Document()
-    
-    # Настраиваем стиль для заголовка
-    title = doc.add_heading('Медицинское заключение', 0)
-    title.alignment = 1  # Центрирование
-    
-    # Добавляем информацию о пациенте
-    doc.add_paragraph(f'Пациент: {patient_name}')
-    doc.add_paragraph(f'Дата: {datetime.now().strftime("%d.%m.%Y")}')
-    doc.add_paragraph('')  # Пустая строка для разделения
-    
+    date = parse_timestamp(timestamp) if timestamp else None
+    builder = ReportBuilder(patient_name, date=date)
+
     # Добавляем основной текст заключения
-    doc.add_paragraph(report_text)
-    
-    # Создаем папку Reports, если она не существует
-    if not os.path.exists('Reports'):
-        os.makedirs('Reports')
-    
-    # Формируем имя файла (ФИО_дата.docx)
-    safe_name = patient_name.replace(' ', '_')
-    filename = f'Reports/{safe_name}_{datetime.now().strftime("%d_%m_%Y")}.docx'
-    
-    # Сохраняем документ
-    doc.save(filename)
-    return filename
-
-def generate_report(patient_name, report_text):
+    builder.add_text(report_text)
+    return builder.save(timestamp)
+
+def format_doctor_text(doctor):
+    """Строки с информацией о враче"""
+    return f"Врач: {doctor['name']}\nСпециализация: {doctor['specialization']}\n"
+
+def format_section_text(key, items):
+    """Форматирует один раздел заключения в виде списка"""
+    lines = [f"{SECTION_TITLES[key]}:"]
+    for item in items:
+        lines.append(f"- {item}")
+    return "\n".join(lines)
+
+def format_report_text(result):
+    """Форматирует результат из JSON в текст для отчета"""
+    report_parts = []
+
+    # Добавляем информацию о враче
+    if 'doctor' in result:
+        report_parts.append(format_doctor_text(result['doctor']))
+
+    # Добавляем жалобы, диагноз и рекомендации
+    for key, _ in REPORT_SECTIONS:
+        if key in result:
+            report_parts.append(format_section_text(key, result[key]))
+            report_parts.append("")
+
+    return "\n".join(report_parts).rstrip("\n")
+
+def generate_report(patient_name, report_text=None, builder=None, timestamp=None):
     """
     Создает отчет на основе имени пациента и текста заключения
-    
+
     Args:
         patient_name (str): ФИО пациента
         report_text (str): Текст заключения
+        builder (ReportBuilder): Уже заполненный документ, если разделы добавлялись постепенно
+        timestamp (str): Метка времени приема (ГГГГММДД_ЧЧММСС) для имени файла
     """
     try:
+        if builder is not None:
+            return builder.save(timestamp)
         report_file = create_medical_report(
             patient_name=patient_name,
-            report_text=report_text
+            report_text=report_text,
+            timestamp=timestamp
         )
         return report_file
     except Exception as e:
         print(f"Ошибка при создании отчета: {str(e)}")
-        return None 
\ No newline at end of file
+        return None
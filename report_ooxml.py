@@ -0,0 +1,120 @@
+"""
+Быстрое создание DOCX заключений без построения документа через python-docx.
+
+Один раз на процесс python-docx собирает «скелет» документа (стили, нумерация, тема,
+заголовок). Все его части, кроме word/document.xml, сжимаются в ZIP один раз и кэшируются.
+Для каждого заключения копируется готовый архив, а в него дописывается только
+document.xml с разделами, сформированными строками XML. Результат открывается в Word
+и python-docx так же, как файлы report_generator.
+"""
+import io
+import re
+import zipfile
+import threading
+from datetime import datetime
+from xml.sax.saxutils import escape
+
+from docx import Document
+
+from report_generator import REPORT_SECTIONS, SECTION_TITLES
+from services.file_utils import atomic_write_bytes
+
+BODY_MARKER = "@@REPORT_BODY@@"
+DOCUMENT_PART = "word/document.xml"
+
+# Символы, недопустимые в XML 1.0 (кроме табуляции и переводов строки)
+_INVALID_XML_CHARS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+
+
+class ReportSkeleton:
+    """Заготовка DOCX: архив без document.xml и document.xml, разрезанный на начало и конец"""
+    def __init__(self):
+        doc = Document()
+        title = doc.add_heading('Медицинское заключение', 0)
+        title.alignment = 1  # Центрирование, как в ReportBuilder
+        doc.add_paragraph(BODY_MARKER)
+
+        source = io.BytesIO()
+        doc.save(source)
+        archive = io.BytesIO()
+        with zipfile.ZipFile(source) as src, zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as dst:
+            for info in src.infolist():
+                if info.filename == DOCUMENT_PART:
+                    document_xml = src.read(info).decode("utf-8")
+                else:
+                    dst.writestr(info.filename, src.read(info))
+        self.archive = archive.getvalue()
+
+        marker = document_xml.index(BODY_MARKER)
+        start = document_xml.rindex("<w:p>", 0, marker)
+        end = document_xml.index("</w:p>", marker) + len("</w:p>")
+        self.head = document_xml[:start]
+        self.tail = document_xml[end:]
+
+
+_skeleton = None
+_skeleton_lock = threading.Lock()
+
+
+def get_skeleton():
+    """Заготовка строится при первом обращении и переиспользуется всеми заключениями процесса"""
+    global _skeleton
+    with _skeleton_lock:
+        if _skeleton is None:
+            _skeleton = ReportSkeleton()
+        return _skeleton
+
+
+def _text_runs(text):
+    """Текст абзаца в виде w:r; переводы строк становятся w:br"""
+    text = _INVALID_XML_CHARS.sub("", str(text))
+    parts = [f'<w:t xml:space="preserve">{escape(line)}</w:t>' for line in text.split("\n")]
+    return f"<w:r>{'<w:br/>'.join(parts)}</w:r>"
+
+
+def paragraph(text="", style=None):
+    style_xml = f'<w:pPr><w:pStyle w:val="{style}"/></w:pPr>' if style else ""
+    return f"<w:p>{style_xml}{_text_runs(text) if text else ''}</w:p>"
+
+
+def render_body(patient_name, result, date=None):
+    """
+    XML тела заключения: данные пациента и врача, затем разделы -
+    заголовок раздела и маркированный список пунктов
+    """
+    date = date or datetime.now()
+    parts = [
+        paragraph(f'Пациент: {patient_name}'),
+        paragraph(f'Дата: {date.strftime("%d.%m.%Y")}'),
+        paragraph(),
+    ]
+    doctor = result.get('doctor')
+    if doctor:
+        parts.append(paragraph(f"Врач: {doctor.get('name', '')}"))
+        parts.append(paragraph(f"Специализация: {doctor.get('specialization', '')}"))
+    for key, _ in REPORT_SECTIONS:
+        items = result.get(key)
+        if items is None:
+            continue
+        if not isinstance(items, list):
+            items = [items]
+        parts.append(paragraph(SECTION_TITLES[key], style="Heading2"))
+        for item in items:
+            parts.append(paragraph(item, style="ListBullet"))
+    return "".join(parts)
+
+
+def build_report(patient_name, result, date=None):
+    """Возвращает содержимое DOCX-файла заключения в виде bytes"""
+    skeleton = get_skeleton()
+    document_xml = skeleton.head + render_body(patient_name, result, date) + skeleton.tail
+    output = io.BytesIO(skeleton.archive)
+    output.seek(0, io.SEEK_END)
+    with zipfile.ZipFile(output, "a", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr(DOCUMENT_PART, document_xml.encode("utf-8"))
+    return output.getvalue()
+
+
+def write_report(path, patient_name, result, date=None):
+    """Записывает заключение в path и возвращает путь"""
+    return atomic_write_bytes(path, build_report(patient_name, result, date))
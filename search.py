@@ -0,0 +1,57 @@
+"""
+Поиск прошлых приемов по транскриптам, жалобам, диагнозам и рекомендациям.
+
+Примеры:
+    python search.py "боли в груди"
+    python search.py "гипертония эналаприл" --patient "Иванов Иван Иванович" --limit 5
+    python search.py --rebuild
+
+Индекс (search_index.db, путь задает SEARCH_DB) пополняется при каждом сохранении результата;
+--rebuild заново индексирует весь архив Results/ и audio_records/.
+"""
+import os
+import sys
+import time
+import logging
+import argparse
+
+from report_generator import parse_timestamp
+from services.search_index import SearchIndex
+
+logger = logging.getLogger(__name__)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Полнотекстовый поиск по архиву приемов")
+    parser.add_argument("query", nargs="?", help="Слова для поиска (все должны встретиться в приеме)")
+    parser.add_argument("--patient", help="Только приемы этого пациента (ФИО полностью)")
+    parser.add_argument("--limit", type=int, default=20, help="Сколько приемов вывести")
+    parser.add_argument("--rebuild", action="store_true", help="Заново проиндексировать Results/ и audio_records/")
+    args = parser.parse_args(argv)
+    if not args.query and not args.rebuild:
+        parser.error("укажите запрос или --rebuild")
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    index = SearchIndex(os.getenv("SEARCH_DB", "search_index.db"))
+    if args.rebuild:
+        index.rebuild()
+    if not args.query:
+        return 0
+
+    started = time.perf_counter()
+    hits = index.search(args.query, limit=args.limit, patient=args.patient)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    for hit in hits:
+        date = parse_timestamp(hit["timestamp"]).strftime("%d.%m.%Y %H:%M")
+        print(f"{date}  {hit['patient'] or 'Не указано'}  ({hit['doctor'] or 'врач не указан'})  "
+              f"[{-hit['score']:.2f}]")
+        print(f"    {' '.join(hit['snippet'].split())}")
+        if hit["transcript_path"]:
+            print(f"    {hit['transcript_path']}")
+    print(f"Найдено приемов: {len(hits)} за {elapsed_ms:.1f} мс (всего в индексе: {len(index)})")
+    return 0 if hits else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
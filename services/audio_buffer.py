@@ -0,0 +1,145 @@
+import time
+import threading
+
+
+class RingBuffer:
+    """
+    Кольцевой буфер аудио фиксированного размера, выделяемый один раз.
+
+    Позиции считаются в байтах от начала записи и только растут, поэтому каждый
+    читатель хранит свою позицию. Если читатель отстал больше чем на емкость буфера,
+    старые данные перезаписываются, а потеря учитывается как переполнение (overrun).
+    """
+    def __init__(self, capacity, frame_bytes=2):
+        capacity -= capacity % frame_bytes
+        self.capacity = capacity
+        self.frame_bytes = frame_bytes
+        self._data = bytearray(capacity)
+        self._view = memoryview(self._data)
+        self._cond = threading.Condition()
+        self.write_position = 0
+        self.closed = False
+
+    def write(self, data):
+        """Записывает данные; вызывается из потока захвата и никогда не блокируется надолго"""
+        size = len(data)
+        if size > self.capacity:
+            data = memoryview(data)[size - self.capacity:]
+            skipped = size - self.capacity
+            size = self.capacity
+        else:
+            skipped = 0
+        with self._cond:
+            start = (self.write_position + skipped) % self.capacity
+            first = min(size, self.capacity - start)
+            self._view[start:start + first] = data[:first]
+            if first < size:
+                self._view[:size - first] = data[first:]
+            self.write_position += skipped + size
+            self._cond.notify_all()
+
+    def reader(self, start=None):
+        """Создает читателя с собственной позицией (по умолчанию - с текущего конца буфера)"""
+        with self._cond:
+            if start is None:
+                start = self.write_position
+            start = max(start, self.write_position - self.capacity, 0)
+            start -= start % self.frame_bytes
+            return RingReader(self, start)
+
+    def close(self):
+        """Сообщает читателям, что новых данных не будет"""
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+
+class RingReader:
+    """Независимый читатель кольцевого буфера со счетчиками переполнений и опустошений"""
+    def __init__(self, buffer, position):
+        self.buffer = buffer
+        self.position = position
+        self.overrun_bytes = 0
+        self.overruns = 0
+        self.underruns = 0
+        self.max_depth = 0
+
+    def available(self):
+        """Сколько байт ожидает чтения (глубина очереди)"""
+        return min(self.buffer.write_position - self.position, self.buffer.capacity)
+
+    def _catch_up(self):
+        lag = self.buffer.write_position - self.position
+        if lag > self.buffer.capacity:
+            lost = lag - self.buffer.capacity
+            self.position += lost
+            self.overrun_bytes += lost
+            self.overruns += 1
+        self.max_depth = max(self.max_depth, self.buffer.write_position - self.position)
+
+    def _wait(self, size, deadline):
+        buffer = self.buffer
+        while buffer.write_position - self.position < size and not buffer.closed:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                self.underruns += 1
+                break
+            buffer._cond.wait(remaining)
+        self._catch_up()
+
+    def peek(self, size, timeout=None):
+        """
+        Как read, но без копирования: возвращает до двух memoryview на область кольца.
+        После обработки нужно вызвать advance() с числом использованных байт.
+        """
+        buffer = self.buffer
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with buffer._cond:
+            self._wait(size, deadline)
+            size = min(size, buffer.write_position - self.position)
+            size -= size % buffer.frame_bytes
+            start = self.position % buffer.capacity
+            first = min(size, buffer.capacity - start)
+            views = [buffer._view[start:start + first]]
+            if first < size:
+                views.append(buffer._view[:size - first])
+            return views
+
+    def advance(self, size):
+        """Сдвигает позицию после peek; если писатель успел перезаписать область, учитывает потерю"""
+        with self.buffer._cond:
+            overwritten = min(size, self.buffer.write_position - self.buffer.capacity - self.position)
+            if overwritten > 0:
+                self.overrun_bytes += overwritten
+                self.overruns += 1
+            self.position += size
+            self._catch_up()
+
+    def read(self, size, timeout=None):
+        """
+        Ждет, пока накопится size байт, и возвращает их.
+        По таймауту или после закрытия буфера возвращает то, что есть (возможно, b"").
+        """
+        buffer = self.buffer
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with buffer._cond:
+            self._wait(size, deadline)
+            size = min(size, buffer.write_position - self.position)
+            size -= size % buffer.frame_bytes
+            start = self.position % buffer.capacity
+            first = min(size, buffer.capacity - start)
+            data = bytes(buffer._view[start:start + first])
+            if first < size:
+                data += bytes(buffer._view[:size - first])
+            self.position += size
+            return data
+
+    def stats(self):
+        return {
+            "position": self.position,
+            "queue_depth": self.available(),
+            "max_queue_depth": self.max_depth,
+            "overruns": self.overruns,
+            "overrun_bytes": self.overrun_bytes,
+            "underruns": self.underruns,
+        }
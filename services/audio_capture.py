@@ -0,0 +1,126 @@
+import time
+import logging
+import pyaudio
+
+from services.resampler import InputConditioner
+
+logger = logging.getLogger(__name__)
+
+
+class MicrophoneSource:
+    """
+    Захват с микрофона в режиме обратного вызова PortAudio.
+    Каждый блок сразу передается в on_audio (обычно RingBuffer.write) в потоке PortAudio,
+    поэтому сетевые задержки отправки не тормозят чтение с устройства.
+
+    Устройство открывается на своей частоте и числе каналов (по умолчанию - defaultSampleRate
+    устройства ввода): многие USB-микрофоны работают только на 44,1/48 кГц, а пересчет
+    драйвером дает заметные искажения. Приведение к rate/channels (моно 16 кГц для
+    распознавания), удаление постоянной составляющей и, по желанию, выравнивание уровня
+    выполняет InputConditioner на заранее выделенных буферах.
+
+    Экземпляр PyAudio (инициализация PortAudio и перебор устройств) создается один раз
+    и переживает остановку записи; stop() закрывает только поток, close() - все.
+    """
+    reusable = True
+
+    def __init__(self, rate=16000, channels=1, frames_per_buffer=1024, device_index=None, device_rate=None,
+                 remove_dc=True, normalize=False):
+        if channels != 1:
+            raise ValueError("Распознаванию передается только моно: каналы устройства сводятся в один")
+        self.rate = rate
+        self.channels = channels
+        self.frames_per_buffer = frames_per_buffer
+        self.sample_width = 2  # paInt16
+        self.device_index = device_index
+        self.device_rate = device_rate
+        self.device_channels = None
+        self.remove_dc = remove_dc
+        self.normalize = normalize
+        self.conditioner = None
+        self.audio_input = None
+        self.stream = None
+        self.on_audio = None
+        self.device_overflows = 0
+        self.captured_bytes = 0
+        self.processing_seconds = 0.0
+
+    def _callback(self, in_data, frame_count, time_info, status_flags):
+        if status_flags & pyaudio.paInputOverflow:
+            self.device_overflows += 1
+        if self.conditioner:
+            started = time.perf_counter()
+            in_data = self.conditioner.process(in_data)
+            self.processing_seconds += time.perf_counter() - started
+        self.captured_bytes += len(in_data)
+        self.on_audio(in_data)
+        return (None, pyaudio.paContinue)
+
+    def prewarm(self):
+        """Инициализация PortAudio и выбор формата устройства заранее, чтобы начало записи не ждало"""
+        if self.audio_input is None:
+            self.audio_input = pyaudio.PyAudio()
+        if self.device_channels is None:
+            self._configure()
+
+    def _configure(self):
+        """Родная частота и число каналов устройства ввода (не больше двух) и конвейер приведения формата"""
+        if self.device_index is None:
+            info = self.audio_input.get_default_input_device_info()
+        else:
+            info = self.audio_input.get_device_info_by_index(self.device_index)
+        self.device_index = info["index"]
+        if self.device_rate is None:
+            self.device_rate = int(info["defaultSampleRate"])
+        self.device_channels = max(1, min(int(info["maxInputChannels"]), 2))
+        # Длительность блока та же, что у frames_per_buffer на частоте распознавания
+        self.device_frames = round(self.frames_per_buffer * self.device_rate / self.rate)
+        if (self.device_rate, self.device_channels) != (self.rate, self.channels) or self.remove_dc or self.normalize:
+            self.conditioner = InputConditioner(self.device_rate, self.device_channels, self.device_frames,
+                                                out_rate=self.rate, remove_dc=self.remove_dc,
+                                                normalize=self.normalize)
+        logger.info(f"Устройство ввода «{info['name']}»: {self.device_rate} Гц, {self.device_channels} кан.")
+
+    def start(self, on_audio):
+        """Открывает устройство и начинает передавать блоки в on_audio"""
+        self.on_audio = on_audio
+        self.device_overflows = 0
+        self.captured_bytes = 0
+        self.processing_seconds = 0.0
+        self.prewarm()
+        self.stream = self.audio_input.open(
+            format=pyaudio.paInt16,
+            channels=self.device_channels,
+            rate=self.device_rate,
+            input=True,
+            input_device_index=self.device_index,
+            frames_per_buffer=self.device_frames,
+            stream_callback=self._callback
+        )
+        self.stream.start_stream()
+        logger.info("Начало записи аудио...")
+
+    def stop(self):
+        if self.stream:
+            self.stream.stop_stream()
+            self.stream.close()
+            self.stream = None
+
+    def close(self):
+        self.stop()
+        if self.audio_input:
+            self.audio_input.terminate()
+            self.audio_input = None
+
+    def stats(self):
+        stats = {
+            "captured_bytes": self.captured_bytes,
+            "device_overflows": self.device_overflows,
+            "device_rate": self.device_rate,
+            "device_channels": self.device_channels,
+        }
+        audio_seconds = self.captured_bytes / (self.rate * self.sample_width)
+        if self.conditioner and audio_seconds:
+            # Доля реального времени, которую занимает приведение формата в потоке PortAudio
+            stats["conditioning_load"] = round(self.processing_seconds / audio_seconds, 5)
+        return stats
@@ -1,117 +1,532 @@
+import os
+import time
 import logging
-from google.cloud import speech_v1p1beta1
-import pyaudio
-import wave
+import threading
 from datetime import datetime
 
+from services.audio_buffer import RingBuffer
+from services.capture_engine import CaptureEngine
+from services.wav_archiver import WavArchiver
+from services.diarization import DiarizationTracker, duration_seconds
+from services.speech_gate import SpeechGate, StreamTimeline
+
 logger = logging.getLogger(__name__)
 
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2  # LINEAR16
+BYTES_PER_SECOND = SAMPLE_RATE * SAMPLE_WIDTH
+
+# Google ограничивает потоковое распознавание ~5 минутами, поэтому сессию меняем заранее
+SESSION_SECONDS = 280
+OVERLAP_SECONDS = 2
+MAX_SESSION_FAILURES = 3
+# Сколько ждать установки gRPC-соединения при прогреве
+PREWARM_TIMEOUT = 10
+# Сколько аудио до нажатия кнопки попадает в запись в режиме постоянного захвата
+PREROLL_SECONDS = 3
+# Отсев тишины перед отправкой: тишина перед речью, которая все же отправляется, и период
+# отправки одного блока во время долгой паузы (иначе Speech API закрывает поток)
+VAD_PADDING_MS = 200
+VAD_KEEPALIVE_SECONDS = 5
+
+
+def speech_api():
+    """
+    Модуль Speech API. Импортируется при первом обращении: вместе с gRPC и protobuf
+    он загружается заметную долю секунды и не должен задерживать появление окна.
+    """
+    from google.cloud import speech_v1p1beta1
+    return speech_v1p1beta1
+
+
+class RecognitionSession:
+    """
+    Один вызов streaming_recognize поверх общего кольцевого буфера.
+
+    Сессия читает аудио с позиции start и прочитывает не больше max_bytes, после чего
+    закрывает поток запросов (half-close) и дочитывает последние ответы.
+    Если у сервиса включен детектор речи, тишина не отправляется. Время в ответах
+    отсчитывается от начала отправленного потока, timeline переводит его в абсолютное.
+    """
+    def __init__(self, service, number, streaming_config, start, max_bytes, previous=None):
+        self.service = service
+        self.number = number
+        self.streaming_config = streaming_config
+        self.reader = service.buffer.reader(start)
+        self.offset = self.reader.position / BYTES_PER_SECOND
+        self.max_bytes = max_bytes
+        self.previous = previous
+        self.next = None
+        self.read_bytes = 0
+        self.timeline = StreamTimeline(self.reader.position, BYTES_PER_SECOND)
+        self.gate = None
+        if service.vad:
+            self.gate = SpeechGate(service.vad, BYTES_PER_SECOND, VAD_PADDING_MS, VAD_KEEPALIVE_SECONDS)
+        self.pending = []
+        self.tracker = DiarizationTracker()
+        self.error = None
+        # rotate - сессия перестала читать буфер (лимит, закрытие буфера или ошибка)
+        self.rotate = threading.Event()
+        # done - все ответы сессии получены
+        self.done = threading.Event()
+        self._thread = None
+
+    @property
+    def sent_bytes(self):
+        return self.timeline.sent_bytes
+
+    @property
+    def end_position(self):
+        return self.reader.position
+
+    @property
+    def exhausted(self):
+        """Буфер закрыт и прочитан до конца - новая сессия не нужна"""
+        return self.service.buffer.closed and self.reader.available() == 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name=f"speech-session-{self.number}", daemon=True)
+        self._thread.start()
+        return self
+
+    def join(self, timeout=None):
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _requests(self):
+        request_bytes = self.service.request_bytes
+        request_type = speech_api().StreamingRecognizeRequest
+        try:
+            # Лимит длительности потока отсчитывается по прочитанному аудио (≈ реальному времени),
+            # а не по отправленному: пропущенная тишина не продлевает сессию
+            while self.read_bytes < self.max_bytes:
+                size = min(request_bytes, self.max_bytes - self.read_bytes)
+                data = self.reader.read(size, timeout=0.5)
+                if not data:
+                    if self.service.buffer.closed:
+                        break
+                    continue
+                self.read_bytes += len(data)
+                position = self.reader.position - len(data)
+                chunks = self.gate.process(position, data) if self.gate else ((position, data),)
+                for position, chunk in chunks:
+                    if not self.sent_bytes:
+                        self.service._mark_latency("first_request_ms")
+                    self.timeline.append(position, len(chunk))
+                    yield request_type(audio_content=chunk)
+        finally:
+            self.rotate.set()
+
+    def _run(self):
+        logger.info(f"Сессия распознавания {self.number} начата с {self.offset:.1f} с")
+        try:
+            responses = self.service.client.streaming_recognize(self.streaming_config, self._requests())
+            for response in responses:
+                if not response.results:
+                    continue
+                self.service._mark_latency("first_result_ms")
+                result = response.results[0]
+                if result.alternatives:
+                    self.service._handle_result(self, result)
+        except Exception as e:
+            self.error = e
+            logger.error(f"Ошибка при транскрибации (сессия {self.number}): {str(e)}")
+        finally:
+            self.rotate.set()
+            self.service._finish_session(self)
+            logger.info(f"Сессия распознавания {self.number} завершена: "
+                        f"отправлено {self.sent_bytes / BYTES_PER_SECOND:.1f} из "
+                        f"{self.read_bytes / BYTES_PER_SECOND:.1f} с аудио, {self.reader.stats()}")
+
+
 class AudioService:
-    def __init__(self, on_interim_result=None, on_final_result=None):
+    def __init__(self, on_interim_result=None, on_final_result=None, request_ms=100,
+                 buffer_seconds=30, source_factory=None, client_factory=None,
+                 session_seconds=SESSION_SECONDS, overlap_seconds=OVERLAP_SECONDS, on_segment=None,
+                 preroll_seconds=PREROLL_SECONDS, vad=None):
         self.on_interim_result = on_interim_result
         self.on_final_result = on_final_result
+        # Финальные фразы со спикером, временем начала/конца (с от начала записи) и уверенностью
+        self.on_segment = on_segment
         self.is_recording = False
         self.client = None
-        self.audio_input = None
-        self.stream = None
-    
-    def start_recording(self):
-        """Начало записи аудио"""
-        self.is_recording = True
-        self.client = speech_v1p1beta1.SpeechClient()
-        
+        # Размер одного запроса к Speech API (по умолчанию 100 мс аудио)
+        self.request_bytes = BYTES_PER_SECOND * request_ms // 1000
+        self.buffer_seconds = buffer_seconds
+        self.source_factory = source_factory or self._create_microphone_source
+        self.client_factory = client_factory or self._create_speech_client
+        # Перекрытие должно помещаться в буфер вместе с очередью на отправку
+        self.session_bytes = int(BYTES_PER_SECOND * session_seconds)
+        self.overlap_bytes = int(BYTES_PER_SECOND * min(overlap_seconds, buffer_seconds / 2))
+        self.source = None
+        self.buffer = None
+        self.archiver = None
+        self.sessions = []
+        self._emit_lock = threading.Lock()
+        self._last_final_end = 0.0
+        # Клиент Speech API и устройство создаются один раз (при прогреве или первой записи)
+        # и переиспользуются всеми приемами
+        self._resources_lock = threading.Lock()
+        self._record_started = None
+        self.latency = {}
+        # Постоянный захват (None - устройство открывается только на время записи)
+        self.preroll_seconds = preroll_seconds
+        self.capture = None
+        self._capture_deferred = False
+        self.preroll_bytes = 0
+        # Отсев тишины (SPEECH_VAD=0 - отправлять все аудио); детектор создается на каждую запись
+        self.vad_enabled = os.getenv("SPEECH_VAD", "1") != "0" if vad is None else vad
+        self.vad = None
+
+    def get_client(self):
+        """Клиент Speech API; создается при первом обращении"""
+        with self._resources_lock:
+            if self.client is None:
+                started = time.monotonic()
+                self.client = self.client_factory()
+                logger.info(f"Клиент Speech API создан за {(time.monotonic() - started) * 1000:.0f} мс")
+            return self.client
+
+    def _get_source(self):
+        """Источник аудио: переиспользуемый (микрофон) открывается один раз, остальные - на каждую запись"""
+        with self._resources_lock:
+            if self.source is None or not getattr(self.source, "reusable", False):
+                self.source = self.source_factory()
+            return self.source
+
+    def prewarm(self, timeout=PREWARM_TIMEOUT):
+        """
+        Подготовка к первой записи в фоне после запуска: импорт Speech API, создание клиента,
+        установка gRPC-соединения и инициализация аудиоустройства.
+        Возвращает время каждого шага в мс.
+        """
+        timings = {}
+        started = time.monotonic()
+        client = self.get_client()
+        timings["speech_client_ms"] = round((time.monotonic() - started) * 1000)
+
+        started = time.monotonic()
+        source = self._get_source()
+        if hasattr(source, "prewarm"):
+            source.prewarm()
+        timings["audio_device_ms"] = round((time.monotonic() - started) * 1000)
+
+        channel = getattr(getattr(client, "transport", None), "grpc_channel", None)
+        if channel is not None:
+            started = time.monotonic()
+            try:
+                import grpc
+                grpc.channel_ready_future(channel).result(timeout=timeout)
+                timings["speech_channel_ms"] = round((time.monotonic() - started) * 1000)
+            except Exception as e:
+                logger.warning(f"Не удалось заранее подключиться к Speech API: {str(e) or type(e).__name__}")
+        return timings
+
+    def enable_persistent_capture(self):
+        """
+        Включает постоянный захват: устройство остается открытым между приемами,
+        а запись начинается с последних preroll_seconds секунд до нажатия кнопки.
+        Во время записи источник уже передает аудио в ее буфер, поэтому включение
+        откладывается до stop_recording() и возвращается None.
+        """
+        source = self._get_source()
+        with self._resources_lock:
+            if self.is_recording:
+                self._capture_deferred = True
+                return None
+            self._capture_deferred = False
+            if self.capture is None:
+                if not getattr(source, "reusable", False):
+                    raise ValueError("Постоянный захват требует источника, который можно держать открытым")
+                self.capture = CaptureEngine(source, self.preroll_seconds, BYTES_PER_SECOND, SAMPLE_WIDTH).start()
+            return self.capture
+
+    def disable_persistent_capture(self):
+        """Выключает постоянный захват и закрывает поток устройства (не во время записи)"""
+        with self._resources_lock:
+            self._capture_deferred = False
+            if self.capture is not None:
+                if self.is_recording:
+                    raise RuntimeError("Нельзя выключить постоянный захват во время записи")
+                self.capture.stop()
+                self.capture = None
+
+    def shutdown(self):
+        """Освобождение устройства и соединения при выходе из приложения"""
+        with self._resources_lock:
+            if self.capture is not None:
+                self.capture.stop()
+                self.capture = None
+            if self.source is not None and hasattr(self.source, "close"):
+                self.source.close()
+            self.source = None
+            transport = getattr(self.client, "transport", None)
+            if transport is not None and hasattr(transport, "close"):
+                transport.close()
+            self.client = None
+
+    def _mark_latency(self, name):
+        """Запоминает время от начала записи до первого события name"""
+        if name not in self.latency and self._record_started is not None:
+            self.latency[name] = round((time.monotonic() - self._record_started) * 1000)
+            logger.info(f"Задержка первой записи, {name}: {self.latency[name]} мс")
+
+    @staticmethod
+    def _create_microphone_source():
+        """
+        Микрофон на родной частоте устройства с приведением к 16 кГц моно.
+        AUDIO_INPUT_DEVICE - номер устройства PortAudio, AUDIO_INPUT_RATE - частота вместо родной,
+        AUDIO_DC_REMOVAL=0 отключает удаление постоянной составляющей, AUDIO_NORMALIZE=1 включает АРУ
+        """
+        from services.audio_capture import MicrophoneSource
+        device_index = os.getenv("AUDIO_INPUT_DEVICE")
+        device_rate = os.getenv("AUDIO_INPUT_RATE")
+        return MicrophoneSource(rate=SAMPLE_RATE, channels=1,
+                                device_index=int(device_index) if device_index else None,
+                                device_rate=int(device_rate) if device_rate else None,
+                                remove_dc=os.getenv("AUDIO_DC_REMOVAL", "1") != "0",
+                                normalize=os.getenv("AUDIO_NORMALIZE") == "1")
+
+    @staticmethod
+    def _create_speech_client():
+        """
+        Клиент Speech API. Если задан SPEECH_EMULATOR_HOST (host:port),
+        подключается к локальному серверу без TLS и учетных данных.
+        """
+        speech_v1p1beta1 = speech_api()
+        host = os.getenv("SPEECH_EMULATOR_HOST")
+        if not host:
+            return speech_v1p1beta1.SpeechClient()
+
+        import grpc
+        from google.auth.credentials import AnonymousCredentials
+        from google.cloud.speech_v1p1beta1.services.speech.transports import SpeechGrpcTransport
+        logger.info(f"Используется эмулятор Speech API: {host}")
+        transport = SpeechGrpcTransport(channel=grpc.insecure_channel(host),
+                                        credentials=AnonymousCredentials())
+        return speech_v1p1beta1.SpeechClient(transport=transport)
+
+    def get_stats(self):
+        """Счетчики захвата: переполнения, опустошения и глубина очереди на отправку"""
+        stats = {}
+        if self.source:
+            stats.update(self.source.stats())
+        if self.capture:
+            stats.update(self.capture.stats())
+            stats["preroll_sent_bytes"] = self.preroll_bytes
+        if self.sessions:
+            stats.update(self.sessions[-1].reader.stats())
+            stats["queue_depth_ms"] = stats["queue_depth"] * 1000 // BYTES_PER_SECOND
+            sent = sum(session.sent_bytes for session in self.sessions)
+            read = sum(session.read_bytes for session in self.sessions)
+            stats["sent_seconds"] = round(sent / BYTES_PER_SECOND, 1)
+            stats["sent_ratio"] = round(sent / read, 3) if read else 0.0
+            # Потери считаем по всем сессиям, а не только по текущей
+            readers = [session.reader for session in self.sessions]
+            stats["overruns"] = sum(reader.overruns for reader in readers)
+            stats["overrun_bytes"] = sum(reader.overrun_bytes for reader in readers)
+            stats["underruns"] = sum(reader.underruns for reader in readers)
+            stats["sessions"] = len(self.sessions)
+        if self.vad:
+            stats.update(self.vad.stats())
+        if self.archiver:
+            stats.update(self.archiver.stats())
+        stats.update(self.latency)
+        return stats
+
+    def start_recording(self, archive_path=None):
+        """
+        Начало записи аудио
+
+        Распознавание идет последовательными сессиями: незадолго до лимита длительности
+        потока открывается следующая, которая заново отправляет последние overlap секунд
+        из буфера. Повторы на стыке отбрасываются по времени слов, поэтому
+        on_final_result получает один непрерывный поток фраз.
+
+        Args:
+            archive_path (str): Путь к WAV-файлу для сохранения исходного аудио (по умолчанию audio_records/<время>.wav)
+        """
+        # Под блокировкой: enable_persistent_capture() либо успел запустить захват (тогда он
+        # подключается ниже), либо увидит запись и не станет запускать источник второй раз
+        with self._resources_lock:
+            self.is_recording = True
+        self._record_started = time.monotonic()
+        self.latency = {}
+        # Захват начинается сразу: пока создается клиент (если прогрев не успел), аудио копится в буфере
+        self.buffer = RingBuffer(BYTES_PER_SECOND * self.buffer_seconds, frame_bytes=SAMPLE_WIDTH)
+        self.sessions = []
+        self._last_final_end = 0.0
+        self.vad = None
+        if self.vad_enabled:
+            from services.vad import VoiceActivityDetector
+            self.vad = VoiceActivityDetector(SAMPLE_RATE)
+        position = self.buffer.write_position
+        if archive_path is None:
+            archive_path = f"audio_records/{datetime.now().strftime('%Y%m%d_%H%M%S')}.wav"
+        self.archiver = WavArchiver(self.buffer, archive_path, sample_rate=SAMPLE_RATE,
+                                    sample_width=SAMPLE_WIDTH, start=position).start()
+        if self.capture is not None:
+            # Устройство уже открыто: запись начинается с pre-roll, сессии и архив читают его с позиции 0
+            self.preroll_bytes = self.capture.attach(self.buffer)
+        else:
+            self.preroll_bytes = 0
+            self._get_source().start(self.buffer.write)
+        self._mark_latency("capture_started_ms")
+        self.get_client()
+
+        speech_v1p1beta1 = speech_api()
         config = speech_v1p1beta1.RecognitionConfig(
             encoding=speech_v1p1beta1.RecognitionConfig.AudioEncoding.LINEAR16,
-            sample_rate_hertz=16000,
+            sample_rate_hertz=SAMPLE_RATE,
             language_code="ru-RU",
             enable_speaker_diarization=True,
             diarization_speaker_count=2,
             enable_automatic_punctuation=True,
+            enable_word_time_offsets=True,
         )
 
         streaming_config = speech_v1p1beta1.StreamingRecognitionConfig(
-            config=config, 
+            config=config,
             interim_results=True
         )
 
-        def audio_generator():
-            self.audio_input = pyaudio.PyAudio()
-            self.stream = self.audio_input.open(
-                format=pyaudio.paInt16,
-                channels=1,
-                rate=16000,
-                input=True,
-                frames_per_buffer=1024
-            )
-            
-            logger.info("Начало записи аудио...")
-            while self.is_recording:
-                try:
-                    data = self.stream.read(1024, exception_on_overflow=False)
-                    yield speech_v1p1beta1.StreamingRecognizeRequest(audio_content=data)
-                except Exception as e:
-                    logger.error(f"Ошибка при чтении аудио: {str(e)}")
+        # Захват пишет в кольцевой буфер в своем потоке, отправка читает из него независимо
+        previous = None
+        failures = 0
+        while True:
+            session = RecognitionSession(self, len(self.sessions) + 1, streaming_config,
+                                         position, self.session_bytes, previous)
+            with self._emit_lock:
+                if previous:
+                    previous.next = session
+                self.sessions.append(session)
+            session.start()
+            session.rotate.wait()
+
+            if session.error:
+                # Ошибка после существенной части аудио (например, превышен лимит потока) лечится
+                # повтором с конца последней выданной фразы, а повторные ошибки без продвижения
+                # означают, что сервис недоступен
+                session.done.wait()
+                stalled = session.read_bytes <= self.overlap_bytes
+                failures = failures + 1 if stalled else 0
+                if failures >= MAX_SESSION_FAILURES:
                     break
+                confirmed = int(self._last_final_end * BYTES_PER_SECOND)
+                position = min(session.end_position - self.overlap_bytes, confirmed)
+            elif session.exhausted:
+                break
+            else:
+                # Следующая сессия повторяет хвост предыдущей, чтобы не потерять слово на стыке
+                position = session.end_position - self.overlap_bytes
+            position = max(position, 0)
+            previous = session
 
-        requests = audio_generator()
-        responses = self.client.streaming_recognize(streaming_config, requests)
+        # После остановки дочитываем ответы всех сессий, чтобы не потерять последние фразы
+        for session in self.sessions:
+            session.join()
+        logger.info(f"Статистика захвата аудио: {self.get_stats()}")
 
-        try:
-            for response in responses:
-                if not self.is_recording:
-                    break
+        if failures >= MAX_SESSION_FAILURES:
+            raise session.error
 
-                if not response.results:
-                    continue
+    def _handle_result(self, session, result):
+        """Результат сессии: промежуточный показываем сразу, финальный - по порядку сессий"""
+        if not result.is_final:
+            # Пока предыдущая сессия не выдала все фразы, черновик новой только путает
+            if session.previous and not session.previous.done.is_set():
+                return
+            if self.on_interim_result:
+                self.on_interim_result(result.alternatives[0].transcript)
+            return
 
-                result = response.results[0]
-                if not result.alternatives:
-                    continue
+        with self._emit_lock:
+            if session.previous and not session.previous.done.is_set():
+                session.pending.append(result)
+                return
+            self._emit_final(session, result)
+
+    def _finish_session(self, session):
+        """Отмечает завершение сессии и выдает накопленные финальные результаты следующей"""
+        with self._emit_lock:
+            session.done.set()
+            following = session.next
+            while following is not None:
+                pending, following.pending = following.pending, []
+                for result in pending:
+                    self._emit_final(following, result)
+                if not following.done.is_set():
+                    break
+                following = following.next
 
-                transcript = result.alternatives[0].transcript
+    def _emit_final(self, session, result):
+        """
+        Передает финальный результат, отбрасывая слова, уже выданные предыдущей сессией.
+        Вызывается под _emit_lock.
+        """
+        alternative = result.alternatives[0]
+        words = alternative.words
+        if not words:
+            start, end = self._last_final_end, session.timeline.to_captured(duration_seconds(result.result_end_time))
+            if end <= self._last_final_end:
+                return
+            self._last_final_end = end
+            self._deliver(alternative.transcript, None, start, end, alternative.confidence)
+            return
 
-                if result.is_final:
-                    if hasattr(result, 'speaker_tags') and result.speaker_tags:
-                        self._process_diarization(result, transcript)
-                    else:
-                        if self.on_final_result:
-                            self.on_final_result(transcript)
-                else:
-                    if self.on_interim_result:
-                        self.on_interim_result(transcript)
+        # Трекер разбирает только слова, которых еще не было: в этой сессии или до стыка с предыдущей
+        timeline = session.timeline
+        turns = session.tracker.new_turns(alternative.words, timeline.to_sent(self._last_final_end))
+        if not turns:
+            return
+        self._last_final_end = timeline.to_captured(turns[-1].end)
 
-        except Exception as e:
-            logger.error(f"Ошибка при транскрибации: {str(e)}")
-            raise
-    
-    def _process_diarization(self, result, transcript):
-        """Обработка результатов с диаризацией"""
-        words_info = result.speaker_tags
-        current_speaker = None
-        speaker_text = ""
-
-        for word_info in words_info:
-            if current_speaker != word_info.speaker_tag:
-                if current_speaker is not None:
-                    speaker_num = (current_speaker % 2) + 1
-                    if self.on_final_result:
-                        self.on_final_result(speaker_text.strip(), speaker=speaker_num)
-                current_speaker = word_info.speaker_tag
-                speaker_text = word_info.word
+        for turn in turns:
+            if turn.speaker_tag:
+                speaker = (turn.speaker_tag % 2) + 1
+                text = turn.text
             else:
-                speaker_text += " " + word_info.word
+                speaker = None
+                text = alternative.transcript if session.tracker.new_words == len(words) else turn.text
+            self._deliver(text.strip(), speaker, timeline.to_captured(turn.start),
+                          timeline.to_captured(turn.end), alternative.confidence)
+
+    def _deliver(self, text, speaker, start, end, confidence):
+        """Отдает финальную фразу подписчикам: текст - в on_final_result, сегмент целиком - в on_segment"""
+        if not text:
+            return
+        if self.on_final_result:
+            if speaker is None:
+                self.on_final_result(text)
+            else:
+                self.on_final_result(text, speaker=speaker)
+        if self.on_segment:
+            self.on_segment({
+                "speaker": speaker,
+                "text": text,
+                "start": round(start, 3),
+                "end": round(end, 3),
+                "confidence": round(confidence, 3),
+            })
 
-        if speaker_text:
-            speaker_num = (current_speaker % 2) + 1
-            if self.on_final_result:
-                self.on_final_result(speaker_text.strip(), speaker=speaker_num)
-    
     def stop_recording(self):
         """Остановка записи"""
-        self.is_recording = False
-        if self.stream:
-            self.stream.stop_stream()
-            self.stream.close()
-        if self.audio_input:
-            self.audio_input.terminate()
-        logger.info("Запись остановлена") 
\ No newline at end of file
+        with self._resources_lock:
+            self.is_recording = False
+            if self.capture is not None:
+                self.capture.detach()
+            elif self.source:
+                self.source.stop()
+            deferred = self._capture_deferred
+        # Отправитель дочитает накопленное и завершит поток запросов
+        if self.buffer:
+            self.buffer.close()
+        if self.archiver:
+            self.archiver.join(timeout=5)
+        logger.info("Запись остановлена")
+        if deferred:
+            # Постоянный захват включили во время записи - устройство освободилось
+            try:
+                self.enable_persistent_capture()
+            except Exception as e:
+                logger.error(f"Не удалось включить постоянный захват: {str(e)}")
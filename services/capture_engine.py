@@ -0,0 +1,91 @@
+import time
+import logging
+import threading
+
+from services.audio_buffer import RingBuffer
+
+logger = logging.getLogger(__name__)
+
+
+class CaptureEngine:
+    """
+    Постоянно открытый захват аудио с кольцевым буфером pre-roll.
+
+    Устройство открывается один раз, и каждый блок всегда пишется в небольшой заранее
+    выделенный буфер последних preroll_seconds секунд. attach() копирует этот хвост
+    в буфер записи и переключает поток захвата на него под одной блокировкой, поэтому
+    запись начинается с аудио до нажатия кнопки, без пропусков и повторов на стыке.
+    detach() возвращает захват в режим ожидания, не закрывая устройство.
+    """
+    def __init__(self, source, preroll_seconds, bytes_per_second, frame_bytes=2):
+        self.source = source
+        self.preroll_seconds = preroll_seconds
+        self.preroll = RingBuffer(int(bytes_per_second * preroll_seconds), frame_bytes=frame_bytes)
+        self._target = None
+        self._lock = threading.Lock()
+        self.running = False
+        self.blocks = 0
+        self._started = None
+        self._cpu_started = None
+
+    def _on_audio(self, data):
+        with self._lock:
+            self.blocks += 1
+            self.preroll.write(data)
+            if self._target is not None:
+                self._target.write(data)
+
+    def start(self):
+        """Открывает устройство и начинает заполнять pre-roll"""
+        if self.running:
+            return self
+        self._started = time.monotonic()
+        self._cpu_started = time.process_time()
+        self.source.start(self._on_audio)
+        self.running = True
+        logger.info(f"Постоянный захват включен, pre-roll {self.preroll_seconds:g} с "
+                    f"({self.preroll.capacity // 1024} КБ)")
+        return self
+
+    def attach(self, buffer):
+        """Начало записи: в buffer попадает накопленный pre-roll, затем живой звук. Возвращает размер pre-roll в байтах"""
+        with self._lock:
+            reader = self.preroll.reader(self.preroll.write_position - self.preroll.capacity)
+            preroll = reader.read(reader.available(), timeout=0)
+            buffer.write(preroll)
+            self._target = buffer
+        return len(preroll)
+
+    def detach(self):
+        """Конец записи: захват продолжает заполнять только pre-roll"""
+        with self._lock:
+            self._target = None
+
+    def stop(self):
+        if self.running:
+            self.detach()
+            self.source.stop()
+            self.running = False
+            logger.info(f"Постоянный захват выключен: {self.stats()}")
+
+    def close(self):
+        self.stop()
+        if hasattr(self.source, "close"):
+            self.source.close()
+
+    def stats(self):
+        """
+        Цена режима ожидания: память буфера pre-roll и доля процессорного времени процесса
+        с момента включения (включает и остальные потоки приложения, поэтому это верхняя оценка)
+        """
+        stats = {
+            "preroll_seconds": self.preroll_seconds,
+            "preroll_bytes": self.preroll.capacity,
+            "capture_blocks": self.blocks,
+        }
+        if self._started is not None:
+            wall = time.monotonic() - self._started
+            stats["capture_uptime_s"] = round(wall, 1)
+            if wall > 0:
+                stats["process_cpu_percent"] = round((time.process_time() - self._cpu_started) * 100 / wall, 2)
+        return stats
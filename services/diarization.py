@@ -0,0 +1,87 @@
+def duration_seconds(value):
+    """Длительность из ответа Speech API (timedelta или Duration) в секундах"""
+    if value is None:
+        return 0.0
+    if hasattr(value, "total_seconds"):
+        return value.total_seconds()
+    return value.seconds + value.nanos / 1e9
+
+
+class SpeakerTurn:
+    """Непрерывная реплика одного спикера; время - в секундах от начала сессии распознавания"""
+    __slots__ = ("speaker_tag", "text", "start", "end")
+
+    def __init__(self, speaker_tag, text, start, end):
+        self.speaker_tag = speaker_tag
+        self.text = text
+        self.start = start
+        self.end = end
+
+
+class DiarizationTracker:
+    """
+    Разбор слов финальных результатов одной сессии распознавания на реплики спикеров.
+
+    С диаризацией Google возвращает в каждом финальном результате все слова с начала
+    сессии, поэтому трекер запоминает, сколько слов уже обработано, и в следующем результате
+    начинает с этого места. Если список слов начался заново (обычный режим без накопления),
+    уже выданные слова отбрасываются по времени. Текст реплики собирается из списка слов
+    одним join, поэтому работа на результат пропорциональна числу новых слов.
+    """
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Начинает новую сессию"""
+        self.consumed = 0
+        self.last_end = None
+        self.new_words = 0
+
+    def _first_new_index(self, words, min_time):
+        count = len(words)
+        start = 0
+        # Накопительный список: на месте последнего обработанного слова то же слово
+        if 0 < self.consumed <= count and duration_seconds(words[self.consumed - 1].end_time) == self.last_end:
+            start = self.consumed
+        # Пропускаем слова, уже выданные этой или предыдущей сессией (середина слова не позже min_time)
+        threshold = min_time if self.last_end is None else max(min_time, self.last_end)
+        while start < count:
+            word = words[start]
+            if (duration_seconds(word.start_time) + duration_seconds(word.end_time)) / 2 > threshold:
+                break
+            start += 1
+        return start
+
+    def new_turns(self, words, min_time=float("-inf")):
+        """
+        Возвращает новые реплики (SpeakerTurn) из списка слов финального результата.
+
+        Args:
+            words: слова результата (alternatives[0].words)
+            min_time (float): слова с серединой не позже этого времени уже выданы
+        """
+        start = self._first_new_index(words, min_time)
+        count = len(words)
+        if start >= count:
+            return []
+
+        turns = []
+        current_speaker = None
+        run_words = []
+        run_start = run_end = 0.0
+        for index in range(start, count):
+            word = words[index]
+            if word.speaker_tag != current_speaker and run_words:
+                turns.append(SpeakerTurn(current_speaker, " ".join(run_words), run_start, run_end))
+                run_words = []
+            if not run_words:
+                current_speaker = word.speaker_tag
+                run_start = duration_seconds(word.start_time)
+            run_words.append(word.word)
+            run_end = duration_seconds(word.end_time)
+        turns.append(SpeakerTurn(current_speaker, " ".join(run_words), run_start, run_end))
+
+        self.consumed = count
+        self.last_end = run_end
+        self.new_words = count - start
+        return turns
@@ -0,0 +1,31 @@
+import os
+import tempfile
+
+
+def atomic_write_bytes(path, data):
+    """
+    Атомарная запись файла: данные пишутся во временный файл в том же каталоге,
+    сбрасываются на диск и подменяют целевой файл через os.replace.
+    Читатели видят либо старую, либо новую версию целиком.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(prefix=".tmp_", suffix=os.path.splitext(path)[1], dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+    return path
+
+
+def atomic_write_text(path, text, encoding="utf-8"):
+    """То же, что atomic_write_bytes, для текста"""
+    return atomic_write_bytes(path, text.encode(encoding))
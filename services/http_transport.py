@@ -0,0 +1,143 @@
+import os
+import time
+import random
+import logging
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASE_URL = "https://api.openai.com/v1"
+
+# Коды ответа, при которых запрос имеет смысл повторить
+RETRY_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+def parse_retry_after(headers):
+    """Возвращает задержку из заголовков Retry-After / retry-after-ms в секундах или None"""
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return max(0.0, float(retry_after_ms) / 1000.0)
+        except ValueError:
+            pass
+
+    retry_after = headers.get("Retry-After")
+    if not retry_after:
+        return None
+    try:
+        return max(0.0, float(retry_after))
+    except ValueError:
+        pass
+    try:
+        retry_date = parsedate_to_datetime(retry_after)
+        return max(0.0, (retry_date - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def compute_backoff(attempt, base=0.5, cap=30.0, retry_after=None):
+    """
+    Экспоненциальная задержка с полным джиттером.
+    Если сервер прислал Retry-After, ждем не меньше указанного времени.
+    """
+    delay = random.uniform(0, min(cap, base * (2 ** attempt)))
+    if retry_after is not None:
+        delay = max(delay, retry_after + random.uniform(0, base))
+    return delay
+
+
+class HttpTransport:
+    """
+    Долгоживущий HTTP-транспорт для OpenAI-совместимого API:
+    пул keep-alive соединений, таймауты и повторы при 429/5xx
+    """
+    def __init__(self, api_key=None, base_url=None, connect_timeout=5.0, read_timeout=120.0,
+                 max_retries=4, backoff_base=0.5, backoff_max=30.0, pool_size=10):
+        self.base_url = (base_url or DEFAULT_BASE_URL).rstrip("/")
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"Content-Type": "application/json"})
+        if api_key:
+            self.session.headers["Authorization"] = f"Bearer {api_key}"
+
+    @property
+    def timeout(self):
+        return (self.connect_timeout, self.read_timeout)
+
+    def post_json(self, path, payload, stream=False):
+        """
+        Отправляет POST-запрос с JSON-телом и возвращает requests.Response.
+        Повторяет запрос при сетевых ошибках и кодах из RETRY_STATUS_CODES.
+        """
+        url = f"{self.base_url}/{path.lstrip('/')}"
+        attempt = 0
+        while True:
+            retry_after = None
+            try:
+                response = self.session.post(url, json=payload, timeout=self.timeout, stream=stream)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= self.max_retries:
+                    raise
+                reason = str(e)
+            else:
+                if response.status_code not in RETRY_STATUS_CODES or attempt >= self.max_retries:
+                    response.raise_for_status()
+                    return response
+                reason = f"HTTP {response.status_code}"
+                retry_after = parse_retry_after(response.headers)
+                response.close()
+
+            delay = compute_backoff(attempt, self.backoff_base, self.backoff_max, retry_after)
+            attempt += 1
+            logger.warning(f"Запрос к {url} не удался ({reason}), повтор {attempt}/{self.max_retries} через {delay:.2f} с")
+            time.sleep(delay)
+
+    def warm_up(self):
+        """
+        Открывает соединение (TCP и TLS) заранее: оно остается в пуле keep-alive,
+        и первый запрос к модели не тратит время на подключение
+        """
+        try:
+            self.session.head(self.base_url, timeout=(self.connect_timeout, self.connect_timeout)).close()
+            return True
+        except requests.RequestException as e:
+            logger.warning(f"Не удалось заранее подключиться к {self.base_url}: {str(e)}")
+            return False
+
+    def close(self):
+        self.session.close()
+
+
+_shared_transport = None
+_shared_transport_lock = threading.Lock()
+
+
+def get_shared_transport(api_key=None):
+    """
+    Возвращает единый транспорт для всего процесса.
+    Параметры берутся из переменных окружения OPENAI_BASE_URL, OPENAI_TIMEOUT и OPENAI_MAX_RETRIES.
+    """
+    global _shared_transport
+    with _shared_transport_lock:
+        if _shared_transport is None:
+            _shared_transport = HttpTransport(
+                api_key=api_key or os.getenv("OPENAI_API_KEY"),
+                base_url=os.getenv("OPENAI_BASE_URL"),
+                read_timeout=float(os.getenv("OPENAI_TIMEOUT", "120")),
+                max_retries=int(os.getenv("OPENAI_MAX_RETRIES", "4")),
+            )
+            logger.info(f"Создан HTTP-транспорт для {_shared_transport.base_url}")
+        return _shared_transport
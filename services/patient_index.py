@@ -0,0 +1,202 @@
+import re
+import heapq
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict
+
+SEPARATORS = re.compile(r"[^\w]+")
+# Сходство слов по триграммам (коэффициент Дайса), при котором слово считается опечаткой запроса
+SIMILARITY_THRESHOLD = 0.6
+# Нечеткий поиск имеет смысл только для слов не короче этого
+FUZZY_MIN_LENGTH = 4
+# Множество пациентов слова строится для отсева, только если оно не больше стольких длин просматриваемого
+# списка: сборка множества на порядки дешевле проверки порядка слов, но на коротком списке не окупается
+FILTER_RATIO = 16
+
+
+def normalize(text):
+    """Токены ФИО без учета регистра и различия е/ё; точки и дефисы - разделители ("Иванов И.И." -> иванов, и, и)"""
+    return SEPARATORS.sub(" ", text.casefold().replace("ё", "е")).split()
+
+
+def trigrams(token):
+    """Триграммы слова с отступами по краям, как в pg_trgm"""
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def matches_in_order(query_tokens, name_tokens, accepts):
+    """Каждый токен запроса подходит к своему токену имени, в том же порядке (фамилия + инициалы)"""
+    position = 0
+    for token in query_tokens:
+        while position < len(name_tokens) and not accepts(token, name_tokens[position]):
+            position += 1
+        if position == len(name_tokens):
+            return False
+        position += 1
+    return True
+
+
+def prefix_range(items, prefix):
+    """Границы элементов отсортированного списка, начинающихся с prefix"""
+    start = bisect_left(items, prefix)
+    return start, bisect_left(items, prefix + "\uffff", start)
+
+
+class PatientIndex:
+    """
+    Индекс ФИО пациентов для подсказок при вводе.
+
+    Обычный случай - ФИО набирается с начала - решается одним bisect по отсортированным
+    нормализованным ФИО. Запросы вида «Иванов И.И.» или «Иван» ищутся по словарю различных слов:
+    у каждого слова список пациентов, отсортированный по ФИО. Списки самого избирательного слова
+    запроса сливаются в алфавитном порядке, остальные слова проверяются как начала следующих слов
+    имени, и просмотр останавливается на limit-м совпадении - частые имена и отчества не требуют
+    перебора половины картотеки. Если совпадений мало, слова запроса длиной от FUZZY_MIN_LENGTH
+    сравниваются со словарем по триграммам, так находятся ФИО с опечатками. Фамилии и имена
+    в картотеке повторяются, поэтому словарь и триграммный индекс по нему намного меньше самой
+    картотеки. Новые пациенты добавляются по одному, без перестроения.
+    """
+    def __init__(self, names=()):
+        self.names = []
+        self._tokens = []
+        self._keys = []
+        self._ids = set()
+        self._token_ids = defaultdict(list)
+        self._token_keys = defaultdict(list)
+        self._trigram_tokens = defaultdict(list)
+        for name in names:
+            self._append(name)
+        self._keys.sort()
+        for keys in self._token_keys.values():
+            keys.sort()
+        self._vocabulary = sorted(self._token_keys)
+
+    def __len__(self):
+        return len(self.names)
+
+    def _append(self, name):
+        """Добавляет имя во все структуры, не соблюдая порядок сортировки; возвращает (ключ, новые слова)"""
+        if name in self._ids:
+            return None
+        patient_id = len(self.names)
+        tokens = normalize(name)
+        self._ids.add(name)
+        self.names.append(name)
+        self._tokens.append(tokens)
+        key = (" ".join(tokens), patient_id)
+        self._keys.append(key)
+        new_tokens = []
+        for token in dict.fromkeys(tokens):
+            if token not in self._token_keys:
+                new_tokens.append(token)
+                for trigram in trigrams(token):
+                    self._trigram_tokens[trigram].append(token)
+            self._token_ids[token].append(patient_id)
+            self._token_keys[token].append(key)
+        return key, new_tokens
+
+    def add(self, name):
+        """Добавляет пациента; возвращает False, если он уже есть в индексе"""
+        added = self._append(name)
+        if added is None:
+            return False
+        key, new_tokens = added
+        # _append дописал ключ в конец списков - переносим его на место по алфавиту
+        del self._keys[-1]
+        insort(self._keys, key)
+        for token in dict.fromkeys(self._tokens[key[1]]):
+            keys = self._token_keys[token]
+            del keys[-1]
+            insort(keys, key)
+        for token in new_tokens:
+            insort(self._vocabulary, token)
+        return True
+
+    def _similar_tokens(self, token):
+        """Слова словаря, похожие на token по триграммам"""
+        query = trigrams(token)
+        counts = Counter()
+        for trigram in query:
+            counts.update(self._trigram_tokens.get(trigram, ()))
+        return {candidate for candidate, shared in counts.items()
+                if 2 * shared / (len(query) + len(candidate) + 1) >= SIMILARITY_THRESHOLD}
+
+    def _words(self, token, similar=()):
+        """Слова словаря, начинающиеся с token, и похожие на него слова similar"""
+        start, end = prefix_range(self._vocabulary, token)
+        return self._vocabulary[start:end] + list(similar)
+
+    def _patient_ids(self, words):
+        ids = set()
+        for word in words:
+            ids.update(self._token_ids[word])
+        return ids
+
+    def _scan(self, tokens, accepts, limit, exclude, similar={}, score=None, best=0):
+        """
+        До limit пациентов, подходящих к запросу (matches_in_order с accepts), по (score, ФИО).
+
+        Просматриваются списки самого избирательного слова запроса, слитые по алфавиту; пациенты без
+        остальных слов отсекаются пересечением множеств до более дорогой проверки порядка. Как только
+        набралось limit совпадений с лучшей возможной оценкой best, более поздние по алфавиту
+        их уже не обойдут. Инициалы используются, только если других слов нет - под одну букву
+        подходит слишком большая часть картотеки.
+        """
+        words = [token for token in dict.fromkeys(tokens) if len(token) > 1] or tokens
+        groups = sorted((sum(len(self._token_ids[word]) for word in group), group)
+                        for group in (self._words(token, similar.get(token, ())) for token in words))
+        size, group = groups[0]
+        lists = [self._token_keys[word] for word in group]
+        others = [self._patient_ids(group) for other_size, group in groups[1:] if other_size <= size * FILTER_RATIO]
+        allowed = others[0].intersection(*others[1:]) - exclude if others else None
+        keys = lists[0] if len(lists) == 1 else heapq.merge(*lists)
+        matched = []
+        best_found = 0
+        previous = None
+        for key in keys:
+            # Пациент с несколькими словами на один префикс встречается в слиянии подряд
+            if key == previous:
+                continue
+            previous = key
+            patient_id = key[1]
+            if (patient_id not in allowed if allowed is not None else patient_id in exclude) or \
+                    not matches_in_order(tokens, self._tokens[patient_id], accepts):
+                continue
+            value = score(patient_id) if score else 0
+            matched.append((value, key))
+            if value <= best:
+                best_found += 1
+                if best_found == limit:
+                    break
+        return [key[1] for _, key in heapq.nsmallest(limit, matched)]
+
+    def search(self, query, limit=20):
+        """
+        До limit подходящих ФИО. Пустой запрос возвращает последних добавленных пациентов.
+        """
+        tokens = normalize(query)
+        if not tokens:
+            return self.names[:-limit - 1:-1]
+
+        # ФИО, начинающиеся с запроса целиком, - уже в алфавитном порядке
+        query_key = " ".join(tokens)
+        start = bisect_left(self._keys, (query_key,))
+        end = bisect_left(self._keys, (query_key + "\uffff",), start, min(len(self._keys), start + limit))
+        found = [patient_id for _, patient_id in self._keys[start:end]]
+        if len(found) == limit:
+            return [self.names[i] for i in found]
+
+        by_prefix = lambda token, name_token: name_token.startswith(token)
+        found += self._scan(tokens, by_prefix, limit - len(found), set(found))
+        similar = {token: self._similar_tokens(token) for token in tokens if len(token) >= FUZZY_MIN_LENGTH}
+        if len(found) == limit or not similar:
+            return [self.names[i] for i in found]
+
+        # Точный просмотр не дошел до limit, то есть нашел все точные совпадения - они уже в found
+        fuzzy = lambda token, name_token: name_token.startswith(token) or name_token in similar.get(token, ())
+        # Выше те, в которых больше слов совпало без опечаток. Лучшая возможная оценка - число слов запроса,
+        # с которых начинается хоть одно слово словаря
+        exact = lambda i: -sum(any(name_token.startswith(token) for name_token in self._tokens[i]) for token in tokens)
+        best = -sum(start < end for start, end in (prefix_range(self._vocabulary, token) for token in tokens))
+        found += self._scan(tokens, fuzzy, limit - len(found), set(found), similar, exact, best)
+        return [self.names[i] for i in found]
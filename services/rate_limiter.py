@@ -0,0 +1,81 @@
+import time
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncRateLimiter:
+    """
+    Token bucket для asyncio: ограничивает число запросов и оценочное число токенов в минуту.
+    Запросы ждут своей очереди в порядке поступления.
+    """
+    def __init__(self, requests_per_minute=500, tokens_per_minute=30000):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._available_requests = float(requests_per_minute)
+        self._available_tokens = float(tokens_per_minute)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = asyncio.Lock()
+        self._refunded = asyncio.Event()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        self._available_requests = min(
+            self.requests_per_minute,
+            self._available_requests + elapsed * self.requests_per_minute / 60.0
+        )
+        self._available_tokens = min(
+            self.tokens_per_minute,
+            self._available_tokens + elapsed * self.tokens_per_minute / 60.0
+        )
+
+    async def acquire(self, tokens):
+        """
+        Ожидает, пока в корзинах не появятся запрос и нужное число токенов.
+        Возвращает фактически зарезервированное число токенов.
+        """
+        tokens = min(tokens, self.tokens_per_minute)
+        async with self._lock:
+            while True:
+                self._refill()
+                wait = self._blocked_until - time.monotonic()
+                if wait <= 0 and self._available_requests >= 1 and self._available_tokens >= tokens:
+                    self._available_requests -= 1
+                    self._available_tokens -= tokens
+                    return tokens
+                wait = max(
+                    wait,
+                    (1 - self._available_requests) * 60.0 / self.requests_per_minute,
+                    (tokens - self._available_tokens) * 60.0 / self.tokens_per_minute,
+                )
+                # Просыпаемся раньше, если другой запрос вернул неизрасходованные токены
+                self._refunded.clear()
+                try:
+                    await asyncio.wait_for(self._refunded.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+
+    def reconcile(self, reserved, actual):
+        """Возвращает в корзину разницу между оценкой и фактическим расходом токенов"""
+        if actual is None:
+            return
+        self._refill()
+        self._available_tokens = min(self.tokens_per_minute, self._available_tokens + reserved - actual)
+        if reserved > actual:
+            self._refunded.set()
+
+    def pause(self, seconds):
+        """Приостанавливает выдачу после ответа 429"""
+        self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+        logger.warning(f"Лимит запросов исчерпан, пауза {seconds:.2f} с")
+
+    def stats(self):
+        self._refill()
+        return {
+            "available_requests": round(self._available_requests, 2),
+            "available_tokens": int(self._available_tokens),
+        }
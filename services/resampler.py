@@ -0,0 +1,161 @@
+from math import gcd
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Полуширина фильтра в отсчетах повышенной частоты на единицу max(up, down) и окно Кайзера -
+# те же параметры, что у scipy.signal.resample_poly
+HALF_LENGTH_FACTOR = 10
+KAISER_BETA = 5.0
+# Нормализация усиления: целевой уровень речи и предел усиления тихого микрофона
+TARGET_DB = -20.0
+MAX_GAIN_DB = 20.0
+# Постоянная составляющая: доля, на которую оценка сдвигается к среднему блока
+DC_ADAPT = 0.1
+
+
+def design_filter(up, down, half_length_factor=HALF_LENGTH_FACTOR, beta=KAISER_BETA):
+    """ФНЧ с окном Кайзера для передискретизации up/down; длина кратна up"""
+    rate = max(up, down)
+    half_length = half_length_factor * rate
+    taps = np.arange(-half_length, half_length + 1, dtype=np.float64)
+    h = np.sinc(taps / rate) * np.kaiser(len(taps), beta)
+    h *= up / h.sum()
+    return np.concatenate([h, np.zeros(-len(h) % up)])
+
+
+class PolyphaseResampler:
+    """
+    Потоковая полифазная передискретизация float32 in_rate -> out_rate (соотношение up/down).
+
+    Фильтр раскладывается на up фаз по taps_per_phase коэффициентов. Выходы идут периодами:
+    каждые down входных отсчетов дают up выходных, и номера фаз и сдвиги окон внутри периода
+    всегда одинаковы. Поэтому фазы один раз раскладываются в матрицу (span x up), а окна
+    периодов - это страйдовое представление буфера без копирования: весь блок считается
+    одним матричным умножением. Неполный период и хвост длиной в фильтр переносятся
+    в следующий блок, поэтому стыки не слышны. Рабочие массивы выделяются в конструкторе
+    под max_input отсчетов, process() не выделяет память под данные.
+    """
+    def __init__(self, in_rate, out_rate, max_input):
+        divisor = gcd(int(in_rate), int(out_rate))
+        self.up = int(out_rate) // divisor
+        self.down = int(in_rate) // divisor
+        h = design_filter(self.up, self.down).astype(np.float32)
+        self.taps_per_phase = len(h) // self.up
+        # Коэффициенты фазы r в порядке окна входа (от старых отсчетов к новым)
+        phases = h.reshape(self.taps_per_phase, self.up).T[:, ::-1]
+        # Выход k периода использует фазу (k * down) % up и окно со сдвигом (k * down) // up
+        self.span = (self.up - 1) * self.down // self.up + self.taps_per_phase
+        self.matrix = np.zeros((self.span, self.up), dtype=np.float32)
+        for k in range(self.up):
+            shift = k * self.down // self.up
+            self.matrix[shift:shift + self.taps_per_phase, k] = phases[k * self.down % self.up]
+        self.vector = np.ascontiguousarray(self.matrix[:, 0])
+        self.max_input = max_input
+        self.max_periods = (max_input - 1) // self.down + 1
+        self.max_output = self.max_periods * self.up
+        self._buffer = np.zeros(self.span - 1 + max_input, dtype=np.float32)
+        self._scratch = np.empty(self.span, dtype=np.float32)
+        # Первый выход центрирован на первом входном отсчете: перед ним taps_per_phase - 1 нулей
+        self._filled = self.taps_per_phase - 1
+        self._frames = sliding_window_view(self._buffer, self.span)[::self.down]
+        self._output = np.empty((self.max_periods, self.up), dtype=np.float32)
+
+    @property
+    def delay(self):
+        """Задержка фильтра в отсчетах входа"""
+        return (self.taps_per_phase * self.up - 1) / 2 / self.up
+
+    def process(self, samples):
+        """Принимает до max_input отсчетов float32 и возвращает представление готовых выходных отсчетов"""
+        count = len(samples)
+        if count > self.max_input:
+            raise ValueError(f"Блок {count} отсчетов больше max_input={self.max_input}")
+        buffer = self._buffer
+        buffer[self._filled:self._filled + count] = samples
+        available = self._filled + count
+        periods = (available - self.span) // self.down + 1 if available >= self.span else 0
+
+        frames = self._frames[:periods]
+        output = self._output[:periods]
+        if self.up == 1:
+            # Окна перекрываются (шаг down меньше длины окна), и для BLAS их пришлось бы копировать
+            np.einsum("ij,j->i", frames, self.vector, out=output[:, 0])
+        else:
+            np.matmul(frames, self.matrix, out=output)
+
+        # Переносим неполный период и хвост фильтра в начало буфера
+        consumed = periods * self.down
+        keep = available - consumed
+        self._scratch[:keep] = buffer[consumed:available]
+        buffer[:keep] = self._scratch[:keep]
+        self._filled = keep
+        return output.reshape(-1)
+
+
+class InputConditioner:
+    """
+    Приведение блоков PCM16 с устройства к формату распознавания: 16 бит, моно, out_rate.
+
+    Каналы усредняются, постоянная составляющая вычитается (оценка по средним блоков),
+    частота понижается PolyphaseResampler, затем при normalize уровень приводится к
+    TARGET_DB с плавным изменением усиления внутри блока. Результат - memoryview на
+    внутренний буфер, действительный до следующего вызова (RingBuffer копирует его сразу).
+    """
+    def __init__(self, in_rate, channels, max_frames, out_rate=16000, remove_dc=True, normalize=False,
+                 target_db=TARGET_DB, max_gain_db=MAX_GAIN_DB):
+        self.in_rate = in_rate
+        self.channels = channels
+        self.max_frames = max_frames
+        self.remove_dc = remove_dc
+        self.normalize = normalize
+        self.resampler = PolyphaseResampler(in_rate, out_rate, max_frames) if in_rate != out_rate else None
+        self.target = 10 ** (target_db / 20) * 32768
+        self.min_level = self.target / 10 ** (max_gain_db / 20)
+        self.level = self.target
+        self.gain = 1.0
+        self.dc = 0.0
+        self._mono = np.empty(max_frames, dtype=np.float32)
+        max_output = self.resampler.max_output if self.resampler else max_frames
+        self._steps = np.arange(1, max_output + 1, dtype=np.float32)
+        self._ramp = np.empty(max_output, dtype=np.float32)
+        self._scaled = np.empty(max_output, dtype=np.float32)
+        self._pcm = np.empty(max_output, dtype=np.int16)
+
+    def process(self, data):
+        samples = np.frombuffer(data, dtype=np.int16)
+        frames = len(samples) // self.channels
+        mono = self._mono[:frames]
+        # Каналы - страйдовые представления чередующихся отсчетов; сумма по оси у int16 заметно медленнее
+        np.copyto(mono, samples[0:frames * self.channels:self.channels], casting="unsafe")
+        for channel in range(1, self.channels):
+            np.add(mono, samples[channel:frames * self.channels:self.channels], out=mono, casting="unsafe")
+        if self.channels > 1:
+            mono *= 1.0 / self.channels
+
+        if self.remove_dc and frames:
+            self.dc += (float(mono.mean()) - self.dc) * DC_ADAPT
+            mono -= self.dc
+
+        output = self.resampler.process(mono) if self.resampler else mono
+        count = len(output)
+        if self.normalize and count:
+            self._apply_gain(output)
+        pcm = self._pcm[:count]
+        scaled = self._scaled[:count]
+        np.clip(output, -32768, 32767, out=scaled)
+        np.copyto(pcm, scaled, casting="unsafe")
+        return memoryview(pcm).cast("B")
+
+    def _apply_gain(self, output):
+        """Медленная АРУ: уровень догоняет громкие блоки быстро, тихие - медленно; тишину не усиливает сверх max_gain_db"""
+        count = len(output)
+        rms = float(np.sqrt(np.dot(output, output) / count))
+        rate = 0.5 if rms > self.level else 0.02
+        self.level = max(self.min_level, self.level + (rms - self.level) * rate)
+        gain = self.target / self.level
+        ramp = self._ramp[:count]
+        np.multiply(self._steps[:count], (gain - self.gain) / count, out=ramp)
+        ramp += self.gain
+        output *= ramp
+        self.gain = gain
@@ -0,0 +1,158 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+
+from services.file_utils import atomic_write_bytes
+
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(model, temperature, instructions, content):
+    """Ключ кэша: SHA-256 от модели, температуры, инструкций шаблона и текста транскрипта"""
+    material = json.dumps([model, temperature, instructions, content], ensure_ascii=False)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Дисковый кэш ответов LLM с вытеснением по LRU.
+    Каждая запись хранится отдельным JSON-файлом, время последнего обращения - mtime файла.
+    """
+    def __init__(self, directory="cache/llm", max_entries=5000, max_bytes=200 * 1024 * 1024,
+                 max_age=30 * 24 * 3600, bypass=False):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.bypass = bypass
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._index = None  # key -> (size, atime)
+        self._total_bytes = 0
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def _load_index(self):
+        """Однократно сканирует каталог кэша"""
+        if self._index is not None:
+            return
+        self._index = {}
+        self._total_bytes = 0
+        if not os.path.isdir(self.directory):
+            return
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                # Временные файлы atomic_write_bytes (.tmp_*) остаются только после сбоя записи
+                if not name.endswith(".json") or name.startswith("."):
+                    continue
+                stat = os.stat(os.path.join(root, name))
+                self._index[name[:-5]] = (stat.st_size, stat.st_mtime)
+                self._total_bytes += stat.st_size
+
+    def get(self, key):
+        """Возвращает сохраненный ответ или None"""
+        with self._lock:
+            self._load_index()
+            if self.bypass or key not in self._index:
+                self.misses += 1
+                return None
+
+            path = self._path(key)
+            size, atime = self._index[key]
+            now = time.time()
+            if self.max_age and now - atime > self.max_age:
+                self._remove(key)
+                self.misses += 1
+                return None
+
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    value = json.load(f)
+                os.utime(path, (now, now))
+            except (OSError, ValueError) as e:
+                logger.warning(f"Поврежденная запись кэша {key}: {str(e)}")
+                self._remove(key)
+                self.misses += 1
+                return None
+
+            self._index[key] = (size, now)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Сохраняет ответ и вытесняет старые записи при превышении лимитов"""
+        path = self._path(key)
+        data = json.dumps(value, ensure_ascii=False).encode("utf-8")
+        with self._lock:
+            self._load_index()
+            try:
+                atomic_write_bytes(path, data)
+            except OSError as e:
+                logger.error(f"Ошибка при записи в кэш: {str(e)}")
+                return
+
+            if key in self._index:
+                self._total_bytes -= self._index[key][0]
+            self._index[key] = (len(data), time.time())
+            self._total_bytes += len(data)
+            self._evict()
+
+    def _remove(self, key):
+        size, _ = self._index.pop(key)
+        self._total_bytes -= size
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+        self.evictions += 1
+
+    def _evict(self):
+        now = time.time()
+        if self.max_age:
+            for key in [k for k, (_, atime) in self._index.items() if now - atime > self.max_age]:
+                self._remove(key)
+
+        if len(self._index) <= self.max_entries and self._total_bytes <= self.max_bytes:
+            return
+        for key in sorted(self._index, key=lambda k: self._index[k][1]):
+            if len(self._index) <= self.max_entries and self._total_bytes <= self.max_bytes:
+                break
+            self._remove(key)
+
+    def stats(self):
+        """Счетчики попаданий, промахов и вытеснений"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._index or {}),
+                "bytes": self._total_bytes,
+            }
+
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_shared_cache():
+    """
+    Возвращает общий кэш ответов или None, если кэш отключен.
+    Управляется переменными окружения LLM_CACHE_DIR, LLM_CACHE_DISABLED и LLM_CACHE_BYPASS.
+    """
+    global _shared_cache
+    if os.getenv("LLM_CACHE_DISABLED") == "1":
+        return None
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = ResponseCache(
+                directory=os.getenv("LLM_CACHE_DIR", "cache/llm"),
+                bypass=os.getenv("LLM_CACHE_BYPASS") == "1",
+            )
+        return _shared_cache
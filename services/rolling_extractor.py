@@ -0,0 +1,113 @@
+import os
+import logging
+import threading
+
+from chatgpt import estimate_tokens
+from process_utils import (
+    chunk_instructions, merge_results, parse_response, process_chunks, get_chunk_settings
+)
+from services.transcript_store import format_segment
+
+logger = logging.getLogger(__name__)
+
+
+def get_rolling_interval(default=60.0):
+    """Период отправки новых фраз во время приема, с (переменная окружения LLM_ROLLING_INTERVAL)"""
+    return float(os.getenv("LLM_ROLLING_INTERVAL", default))
+
+
+class RollingExtractor:
+    """
+    Извлечение данных заключения по ходу приема.
+
+    Финальные фразы копятся по мере распознавания; раз в interval секунд накопленный
+    фрагмент (если в нем не меньше min_tokens) отправляется в ChatGPT с инструкциями для части
+    разговора, а частичные результаты объединяются merge_results. К моменту остановки
+    остается обработать только последний фрагмент, поэтому заключение готово через
+    время одного короткого запроса, а не полного транскрипта.
+    """
+    def __init__(self, chatgpt_api, ai_instructions, interval=60.0, min_tokens=200, on_update=None):
+        self.chatgpt_api = chatgpt_api
+        self.ai_instructions = ai_instructions
+        self.interval = interval
+        self.min_tokens = min_tokens
+        self.on_update = on_update
+        self.partials = []
+        self._lines = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def add_segment(self, segment):
+        """Добавляет финальную фразу (вызывается из потока распознавания)"""
+        with self._lock:
+            self._lines.append(format_segment(segment))
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="rolling-extractor", daemon=True)
+        self._thread.start()
+        return self
+
+    def _take_delta(self, min_tokens):
+        with self._lock:
+            if not self._lines:
+                return None
+            text = "\n".join(self._lines)
+            if estimate_tokens(text) < min_tokens:
+                return None
+            self._lines = []
+            return text
+
+    def _extract(self, text):
+        index = len(self.partials) + 1
+        response = self.chatgpt_api.process(chunk_instructions(self.ai_instructions, index), text)
+        return parse_response(response)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            delta = self._take_delta(self.min_tokens)
+            if delta is None:
+                continue
+            try:
+                partial = self._extract(delta)
+            except Exception as e:
+                # Фрагмент не потерян: он уйдет вместе со следующим или при остановке
+                logger.error(f"Ошибка при промежуточном извлечении: {str(e)}")
+                with self._lock:
+                    self._lines[:0] = delta.splitlines()
+                continue
+            self.partials.append(partial)
+            logger.info(f"Промежуточное извлечение {len(self.partials)}: {estimate_tokens(delta)} токенов")
+            # После cancel() черновик уже не нужен: прием завершен или отменен
+            if self.on_update and not self._stop.is_set():
+                self.on_update(self.result())
+
+    def result(self):
+        """Текущее объединенное заключение"""
+        return merge_results(self.partials)
+
+    def cancel(self):
+        """Останавливает фоновую отправку без обработки оставшегося фрагмента"""
+        self._stop.set()
+
+    def finish(self):
+        """
+        Останавливает фоновую отправку, обрабатывает последний фрагмент и возвращает
+        итоговое заключение. Если во время приема ничего не отправлялось, обрабатывается
+        весь транскрипт (по частям, если он длинный).
+        """
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+        delta = self._take_delta(0)
+        if delta:
+            chunk_tokens, max_workers = get_chunk_settings()
+            if estimate_tokens(delta) > chunk_tokens:
+                self.partials.append(process_chunks(delta, self.chatgpt_api, self.ai_instructions,
+                                                    chunk_tokens, max_workers))
+            elif self.partials:
+                self.partials.append(self._extract(delta))
+            else:
+                self.partials.append(parse_response(self.chatgpt_api.process(self.ai_instructions, delta)))
+        return self.result()
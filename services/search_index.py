@@ -0,0 +1,205 @@
+import os
+import re
+import glob
+import json
+import time
+import sqlite3
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Поля результата, попадающие в индекс, и колонки для них
+RESULT_FIELDS = {
+    "complaints": "complaints",
+    "provisional diagnosis": "diagnosis",
+    "recommendations": "recommendations",
+}
+COLUMNS = ("timestamp", "transcript_path", "patient", "doctor", "transcript") + tuple(RESULT_FIELDS.values())
+# Веса колонок для bm25 в порядке COLUMNS: совпадение в диагнозе важнее, чем в тексте разговора
+WEIGHTS = (0, 0, 2.0, 1.0, 1.0, 2.0, 3.0, 1.5)
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS consultations USING fts5(
+    timestamp UNINDEXED, transcript_path UNINDEXED, {", ".join(COLUMNS[2:])},
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+TIMESTAMP_PATTERN = re.compile(r"_(\d{8}_\d{6})\.")
+WORD_PATTERN = re.compile(r"\w+")
+# Окончания русских слов, от длинных к коротким; отбрасываются, чтобы «болями» находило «боль»
+RUSSIAN_ENDINGS = sorted((
+    "иями", "ями", "ами", "ого", "его", "ому", "ему", "ыми", "ими", "иях", "ях", "ах", "ов", "ев",
+    "ей", "ий", "ый", "ой", "ая", "яя", "ое", "ее", "ие", "ые", "ом", "ем", "ам", "ям", "ую", "юю",
+    "ию", "ия", "ья", "ье", "ью", "ть", "ешь", "ет", "ут", "ют", "ит", "ат", "ят", "ил", "ыл",
+    "ла", "ло", "ли", "а", "я", "о", "е", "и", "ы", "у", "ю", "ь", "й",
+), key=len, reverse=True)
+MIN_STEM = 3
+# Предлоги и союзы не ищутся: как префиксы они совпадали бы почти с каждым словом
+STOP_WORDS = {"в", "во", "на", "с", "со", "к", "ко", "у", "о", "об", "по", "из", "за", "от", "до", "и", "или",
+              "не", "но", "а", "при", "для", "без", "над", "под"}
+
+
+def stem(word):
+    """Грубая основа русского слова: отбрасывается самое длинное подходящее окончание"""
+    word = word.casefold().replace("ё", "е")
+    for ending in RUSSIAN_ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM:
+            return word[:-len(ending)]
+    return word
+
+
+def build_query(text):
+    """Запрос FTS5: все слова обязательны, каждое ищется по основе как префикс (короткие слова - целиком)"""
+    terms = []
+    for word in WORD_PATTERN.findall(text.casefold()):
+        if word in STOP_WORDS:
+            continue
+        terms.append(f'"{stem(word)}"*' if len(word) > MIN_STEM else f'"{word}"')
+    return " ".join(terms)
+
+
+def phrase(text):
+    """Строка как фраза FTS5"""
+    return '"' + text.replace('"', '""') + '"'
+
+
+def timestamp_of(path):
+    """Метка времени из имени файла приема (transcript_*.txt, result_*.json) или None"""
+    match = TIMESTAMP_PATTERN.search(os.path.basename(path)) if path else None
+    return match.group(1) if match else None
+
+
+def rowid_for(timestamp):
+    """Метка времени ГГГГММДД_ЧЧММСС как целый rowid - одна строка индекса на прием"""
+    return int(timestamp[:15].replace("_", ""))
+
+
+class SearchIndex:
+    """
+    Полнотекстовый индекс приемов (SQLite FTS5): транскрипт, жалобы, диагноз и рекомендации.
+
+    Одна строка на прием, rowid - метка времени транскрипта, поэтому повторное сохранение результата
+    заменяет строку, а не добавляет новую. Результат, сохраненный под другой меткой (время
+    обработки), попадает в строку своего транскрипта. Слова запроса сводятся к основе и ищутся как
+    префиксы, результаты ранжируются по bm25. При первом открытии в индекс загружается
+    существующий архив Results/ и audio_records/.
+    """
+    def __init__(self, path="search_index.db", results_dir="Results", transcripts_dir="audio_records"):
+        self.path = path
+        self.results_dir = results_dir
+        self.transcripts_dir = transcripts_dir
+        self._local = threading.local()
+        with self.connection() as conn:
+            conn.executescript(SCHEMA)
+        if not self.connection().execute("SELECT value FROM meta WHERE key = 'archive_indexed'").fetchone():
+            self.rebuild()
+
+    def connection(self):
+        """Соединение текущего потока"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def __len__(self):
+        return self.connection().execute("SELECT count(*) FROM consultations").fetchone()[0]
+
+    def _upsert(self, conn, timestamp, values):
+        """Обновляет переданные колонки строки приема, сохраняя остальные"""
+        rowid = rowid_for(timestamp)
+        row = conn.execute(f"SELECT {', '.join(COLUMNS)} FROM consultations WHERE rowid = ?", (rowid,)).fetchone()
+        merged = dict(zip(COLUMNS, row)) if row else {}
+        merged.update({key: value for key, value in values.items() if value is not None})
+        merged["timestamp"] = timestamp
+        conn.execute("DELETE FROM consultations WHERE rowid = ?", (rowid,))
+        conn.execute(f"INSERT INTO consultations(rowid, {', '.join(COLUMNS)}) VALUES (?{', ?' * len(COLUMNS)})",
+                     (rowid, *(merged.get(column) for column in COLUMNS)))
+
+    def _values(self, result=None, transcript_path=None):
+        values = {}
+        if result:
+            # Новый результат заменяет все свои колонки: пустая строка стирает раздел прошлой версии
+            values["patient"] = (result.get("patient") or {}).get("name") or ""
+            values["doctor"] = (result.get("doctor") or {}).get("name") or ""
+            for field, column in RESULT_FIELDS.items():
+                items = result.get(field) or ""
+                values[column] = "\n".join(items) if isinstance(items, list) else str(items)
+        if transcript_path and os.path.exists(transcript_path):
+            with open(transcript_path, "r", encoding="utf-8") as f:
+                values["transcript"] = f.read()
+            values["transcript_path"] = transcript_path
+        return values
+
+    def index_consultation(self, timestamp, result=None, transcript_path=None):
+        """Добавляет или обновляет прием: результат (dict) и/или текст транскрипта из файла"""
+        with self.connection() as conn:
+            self._upsert(conn, timestamp_of(transcript_path) or timestamp, self._values(result, transcript_path))
+
+    def rebuild(self):
+        """Индексирует заново весь архив результатов и транскриптов"""
+        started = time.monotonic()
+        rows = {}
+        for filename in sorted(glob.glob(os.path.join(self.transcripts_dir, "transcript_*.txt"))):
+            timestamp = timestamp_of(filename)
+            if timestamp:
+                rows[timestamp] = self._values(transcript_path=filename)
+        for filename in sorted(glob.glob(os.path.join(self.results_dir, "result_*.json"))):
+            timestamp = timestamp_of(filename)
+            if not timestamp:
+                continue
+            try:
+                with open(filename, "r", encoding="utf-8") as f:
+                    result = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Пропущен {filename}: {str(e)}")
+                continue
+            # Результат присоединяется к строке своего транскрипта (его метка может отличаться)
+            transcript_file = result.get("transcript_file") if isinstance(result, dict) else None
+            rows.setdefault(timestamp_of(transcript_file) or timestamp, {}).update(self._values(result))
+
+        conn = self.connection()
+        with conn:
+            conn.execute("DELETE FROM consultations")
+            conn.executemany(
+                f"INSERT INTO consultations(rowid, {', '.join(COLUMNS)}) VALUES (?{', ?' * len(COLUMNS)})",
+                ((rowid_for(timestamp), timestamp, *(values.get(column) for column in COLUMNS[1:]))
+                 for timestamp, values in rows.items())
+            )
+            conn.execute("INSERT OR REPLACE INTO meta(key, value) VALUES ('archive_indexed', '1')")
+            conn.execute("INSERT INTO consultations(consultations) VALUES ('optimize')")
+        logger.info(f"Поисковый индекс построен: {len(rows)} приемов за {time.monotonic() - started:.1f} с")
+
+    def search(self, text, limit=20, patient=None):
+        """
+        Приемы, содержащие все слова запроса, от наиболее подходящих.
+
+        Returns:
+            list[dict]: timestamp, patient, doctor, transcript_path, score и snippet -
+            фрагмент текста с найденными словами в [квадратных скобках]
+        """
+        query = build_query(text)
+        if not query:
+            return []
+        weights = ", ".join(str(weight) for weight in WEIGHTS)
+        sql = (f"SELECT timestamp, patient, doctor, transcript_path, bm25(consultations, {weights}) AS score, "
+               f"snippet(consultations, -1, '[', ']', '…', 12) "
+               f"FROM consultations WHERE consultations MATCH ?")
+        if patient:
+            # Фраза по колонке сужает поиск через индекс, равенство отсекает однофамильцев с отчеством и т.п.
+            query = f"({query}) AND patient : {phrase(patient)}"
+            sql += " AND patient = ?"
+        params = [query, patient] if patient else [query]
+        sql += " ORDER BY score LIMIT ?"
+        params.append(limit)
+        rows = self.connection().execute(sql, params).fetchall()
+        keys = ("timestamp", "patient", "doctor", "transcript_path", "score", "snippet")
+        return [dict(zip(keys, row)) for row in rows]
@@ -0,0 +1,53 @@
+import logging
+
+from services.file_utils import atomic_write_text
+from services.write_behind import get_write_behind
+
+logger = logging.getLogger(__name__)
+
+
+class SettingsService:
+    """
+    Настройки приложения (settings.txt, строки key=value).
+
+    Файл читается один раз, дальше настройки живут в памяти: set() меняет словарь
+    и ставит атомарную запись файла в фоновую очередь, так что смена врача в списке
+    не пишет на диск в потоке интерфейса, а несколько изменений подряд дают одну запись.
+    """
+    def __init__(self, path="settings.txt", write_behind=None):
+        self.path = path
+        self.write_behind = write_behind or get_write_behind()
+        self._settings = self._load()
+
+    def _load(self):
+        settings = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if '=' in line:
+                        key, value = line.strip().split('=', 1)
+                        settings[key] = value
+        except FileNotFoundError:
+            pass
+        return settings
+
+    def get(self, key, default=None):
+        return self._settings.get(key, default)
+
+    def set(self, key, value):
+        """Изменение настройки; файл будет перезаписан в фоне"""
+        if self._settings.get(key) == value:
+            return
+        self._settings[key] = value
+        snapshot = dict(self._settings)
+        self.write_behind.submit(self.path, lambda: self._write(snapshot))
+
+    def _write(self, settings):
+        try:
+            atomic_write_text(self.path, "".join(f"{k}={v}\n" for k, v in settings.items()))
+        except Exception as e:
+            logger.error(f"Ошибка при сохранении настроек: {str(e)}")
+
+    def flush(self):
+        """Немедленная запись отложенных изменений"""
+        self.write_behind.flush()
@@ -0,0 +1,80 @@
+from bisect import bisect_right
+from collections import deque
+
+
+class StreamTimeline:
+    """
+    Соответствие между временем в отправленном потоке и временем записи.
+
+    Speech API отсчитывает время слов от начала отправленного аудио; когда тишина
+    не отправляется, это время отстает от времени записи на длину пропусков. Каждый
+    непрерывный отрезок отправки запоминается парой (позиция в потоке, позиция в записи).
+    """
+    def __init__(self, start_position, bytes_per_second):
+        self.start_position = start_position
+        self.bytes_per_second = bytes_per_second
+        self.sent_bytes = 0
+        self._sent = []
+        self._captured = []
+
+    def append(self, position, size):
+        """Отмечает отправку size байт, взятых с позиции position записи"""
+        if not self._captured or position != self._captured[-1] + self.sent_bytes - self._sent[-1]:
+            self._sent.append(self.sent_bytes)
+            self._captured.append(position)
+        self.sent_bytes += size
+
+    def to_captured(self, seconds):
+        """Время в потоке (с от начала сессии) -> абсолютное время записи"""
+        sent = seconds * self.bytes_per_second
+        index = bisect_right(self._sent, sent) - 1
+        if index < 0:
+            return (self.start_position + sent) / self.bytes_per_second
+        return (self._captured[index] + sent - self._sent[index]) / self.bytes_per_second
+
+    def to_sent(self, seconds):
+        """Абсолютное время записи -> время в потоке; момент внутри пропуска - начало следующего отрезка"""
+        captured = seconds * self.bytes_per_second
+        index = bisect_right(self._captured, captured) - 1
+        if index < 0:
+            return (captured - self.start_position) / self.bytes_per_second
+        run_end = self._sent[index + 1] if index + 1 < len(self._sent) else self.sent_bytes
+        sent = min(self._sent[index] + captured - self._captured[index], run_end)
+        return sent / self.bytes_per_second
+
+
+class SpeechGate:
+    """
+    Отбор блоков для отправки в потоковое распознавание.
+
+    Речь отправляется вместе с padding_ms предшествующей тишины (чтобы не срезать начало
+    слова), остальная тишина отбрасывается. Во время долгой тишины раз в keepalive_seconds
+    отправляется один блок: без аудио Speech API закрывает поток по тайм-ауту.
+    """
+    def __init__(self, detector, bytes_per_second, padding_ms=200, keepalive_seconds=5.0):
+        self.detector = detector
+        self.padding_bytes = bytes_per_second * padding_ms // 1000
+        self.keepalive_bytes = int(bytes_per_second * keepalive_seconds)
+        self._held = deque()
+        self._held_bytes = 0
+        self._sent_end = None
+
+    def process(self, position, data):
+        """Возвращает список (позиция, данные) для отправки, по порядку"""
+        if self._sent_end is None:
+            self._sent_end = position
+        if self.detector.is_speech(data):
+            chunks = list(self._held)
+            self._held.clear()
+            self._held_bytes = 0
+            chunks.append((position, data))
+        elif position + len(data) - self._sent_end >= self.keepalive_bytes:
+            chunks = [(position, data)]
+        else:
+            self._held.append((position, data))
+            self._held_bytes += len(data)
+            while self._held and self._held_bytes - len(self._held[0][1]) >= self.padding_bytes:
+                self._held_bytes -= len(self._held.popleft()[1])
+            return []
+        self._sent_end = position + len(data)
+        return chunks
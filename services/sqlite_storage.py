@@ -0,0 +1,293 @@
+import os
+import re
+import glob
+import json
+import sqlite3
+import logging
+import threading
+
+from services.storage_service import StorageService
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS doctors (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    specialization TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS patients (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS consultations (
+    id INTEGER PRIMARY KEY,
+    timestamp TEXT NOT NULL UNIQUE,
+    patient_id INTEGER REFERENCES patients(id),
+    doctor_id INTEGER REFERENCES doctors(id),
+    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS consultations_patient ON consultations(patient_id, timestamp);
+CREATE INDEX IF NOT EXISTS consultations_doctor ON consultations(doctor_id, timestamp);
+CREATE TABLE IF NOT EXISTS transcripts (
+    consultation_id INTEGER PRIMARY KEY REFERENCES consultations(id),
+    path TEXT,
+    content TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS results (
+    consultation_id INTEGER PRIMARY KEY REFERENCES consultations(id),
+    path TEXT,
+    data TEXT NOT NULL
+);
+"""
+
+TIMESTAMP_PATTERN = re.compile(r"_(\d{8}_\d{6})\.")
+
+
+class SQLiteStorageService(StorageService):
+    """
+    Хранилище врачей, пациентов и приемов в SQLite (режим WAL) с тем же интерфейсом, что StorageService.
+
+    Добавление пациента или врача - одна вставка по уникальному индексу вместо перезаписи
+    JSON-файла целиком (выполняется в фоновом потоке WriteBehind), поиск приема - по индексу
+    метки времени или пациента.
+    JSON результатов и тексты транскриптов по-прежнему пишутся в Results/ и audio_records/,
+    чтобы пакетная обработка и пересоздание отчетов работали с файлами как раньше.
+    """
+    def __init__(self, path="medical_report.db", search_index=None, write_behind=None):
+        super().__init__(search_index, write_behind)
+        self.path = path
+        self._local = threading.local()
+        # Врачи и пациенты, еще не записанные фоновым потоком: чтение объединяет их с базой,
+        # чтобы не ждать записи (flush) в потоке интерфейса
+        self._pending_lock = threading.Lock()
+        self._pending_doctors = {}
+        self._pending_patients = {}
+        with self.connection() as conn:
+            conn.executescript(SCHEMA)
+        self.migrate_from_json()
+
+    def connection(self):
+        """Соединение текущего потока (sqlite3 не разрешает делить соединение между потоками)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    def _doctor_id(self, conn, name):
+        row = conn.execute("SELECT id FROM doctors WHERE name = ?", (name,)).fetchone()
+        if row:
+            return row[0]
+        with self._pending_lock:
+            specialization = self._pending_doctors.get(name)
+        if specialization is None:
+            return None
+        # Врач добавлен, но фоновая запись еще не дошла до базы
+        conn.execute("INSERT OR IGNORE INTO doctors(name, specialization) VALUES (?, ?)", (name, specialization))
+        return conn.execute("SELECT id FROM doctors WHERE name = ?", (name,)).fetchone()[0]
+
+    def _patient_id(self, conn, name):
+        conn.execute("INSERT OR IGNORE INTO patients(name) VALUES (?)", (name,))
+        return conn.execute("SELECT id FROM patients WHERE name = ?", (name,)).fetchone()[0]
+
+    def _consultation_id(self, conn, timestamp, patient_name=None, doctor_name=None):
+        patient_id = self._patient_id(conn, patient_name) if patient_name else None
+        doctor_id = self._doctor_id(conn, doctor_name) if doctor_name else None
+        conn.execute(
+            "INSERT INTO consultations(timestamp, patient_id, doctor_id) VALUES (?, ?, ?) "
+            "ON CONFLICT(timestamp) DO UPDATE SET "
+            "patient_id = COALESCE(excluded.patient_id, patient_id), "
+            "doctor_id = COALESCE(excluded.doctor_id, doctor_id)",
+            (timestamp, patient_id, doctor_id)
+        )
+        return conn.execute("SELECT id FROM consultations WHERE timestamp = ?", (timestamp,)).fetchone()[0]
+
+    def load_doctors(self):
+        """Загрузка списка врачей вместе с еще не записанными изменениями"""
+        # Снимок отложенных изменений берется до чтения базы: запись, завершившаяся после
+        # снимка, уже видна в базе, а до снимка - еще есть в снимке
+        with self._pending_lock:
+            pending = dict(self._pending_doctors)
+        rows = self.connection().execute("SELECT name, specialization FROM doctors ORDER BY id").fetchall()
+        doctors = dict(rows)
+        doctors.update(pending)
+        return doctors
+
+    def _upsert_doctors(self, doctors):
+        try:
+            with self.connection() as conn:
+                conn.executemany(
+                    "INSERT INTO doctors(name, specialization) VALUES (?, ?) "
+                    "ON CONFLICT(name) DO UPDATE SET specialization = excluded.specialization",
+                    doctors
+                )
+        except sqlite3.Error as e:
+            logger.error(f"Ошибка при сохранении списка врачей: {str(e)}")
+        finally:
+            with self._pending_lock:
+                for name, specialization in doctors:
+                    # Более новое изменение того же врача еще ждет своей записи
+                    if self._pending_doctors.get(name) == specialization:
+                        del self._pending_doctors[name]
+
+    def save_doctors(self, doctors):
+        """Сохранение списка врачей (добавляет новых и обновляет специализацию существующих) в фоне"""
+        items = list(doctors.items())
+        with self._pending_lock:
+            self._pending_doctors.update(items)
+        self.write_behind.submit(None, lambda: self._upsert_doctors(items))
+
+    def add_doctor(self, name, specialization):
+        """Добавление или изменение одного врача"""
+        self.save_doctors({name: specialization})
+
+    def load_patient_history(self):
+        """Загрузка истории пациентов в порядке добавления, включая еще не записанных"""
+        with self._pending_lock:
+            pending = list(self._pending_patients)
+        history = [row[0] for row in self.connection().execute("SELECT name FROM patients ORDER BY id")]
+        names = set(history)
+        history.extend(name for name in pending if name not in names)
+        self._patient_names = set(history)
+        return history
+
+    def _insert_patients(self, names):
+        try:
+            with self.connection() as conn:
+                conn.executemany("INSERT OR IGNORE INTO patients(name) VALUES (?)", [(name,) for name in names])
+        except sqlite3.Error as e:
+            logger.error(f"Ошибка при сохранении истории пациентов: {str(e)}")
+        finally:
+            with self._pending_lock:
+                for name in names:
+                    self._pending_patients.pop(name, None)
+
+    def _submit_patients(self, names):
+        with self._pending_lock:
+            self._pending_patients.update(dict.fromkeys(names))
+        self.write_behind.submit(None, lambda: self._insert_patients(names))
+
+    def save_patient_history(self, history):
+        """Сохранение истории пациентов (добавляет отсутствующих) в фоне"""
+        names = list(history)
+        if self._patient_names is not None:
+            self._patient_names.update(names)
+        self._submit_patients(names)
+
+    def add_patient(self, patient_name):
+        """Добавление пациента; возвращает False, если он уже есть. Вставка в базу выполняется в фоне"""
+        if self._patient_names is None:
+            self.load_patient_history()
+        if patient_name in self._patient_names:
+            return False
+        self._patient_names.add(patient_name)
+        self._submit_patients([patient_name])
+        return True
+
+    def save_transcript(self, transcript, timestamp, patient_name=None, doctor_name=None):
+        """Сохранение транскрипта в файл и в базу; прием появляется в базе сразу, еще до обработки ChatGPT"""
+        filename = super().save_transcript(transcript, timestamp, patient_name, doctor_name)
+        if filename is None:
+            return None
+        try:
+            with self.connection() as conn:
+                consultation_id = self._consultation_id(conn, timestamp, patient_name, doctor_name)
+                conn.execute("INSERT OR REPLACE INTO transcripts(consultation_id, path, content) VALUES (?, ?, ?)",
+                             (consultation_id, filename, transcript))
+        except sqlite3.Error as e:
+            logger.error(f"Ошибка при сохранении транскрипта в базу: {str(e)}")
+        return filename
+
+    def save_result(self, result, timestamp, transcript_file=None):
+        """Сохранение результата в JSON-файл и в базу вместе с пациентом и врачом приема"""
+        filename = super().save_result(result, timestamp, transcript_file)
+        try:
+            with self.connection() as conn:
+                self._store_result(conn, result, timestamp, filename)
+        except sqlite3.Error as e:
+            logger.error(f"Ошибка при сохранении результата в базу: {str(e)}")
+        return filename
+
+    def _store_result(self, conn, result, timestamp, filename):
+        patient_name = ((result.get('patient') or {}).get('name') if isinstance(result, dict) else None) or None
+        doctor = (result.get('doctor') or {}) if isinstance(result, dict) else {}
+        if doctor.get('name') and self._doctor_id(conn, doctor['name']) is None:
+            # Врач мог быть удален из списка - сохраняем с указанной в результате специализацией
+            conn.execute("INSERT OR IGNORE INTO doctors(name, specialization) VALUES (?, ?)",
+                         (doctor['name'], doctor.get('specialization', '')))
+        consultation_id = self._consultation_id(conn, timestamp, patient_name, doctor.get('name'))
+        conn.execute("INSERT OR REPLACE INTO results(consultation_id, path, data) VALUES (?, ?, ?)",
+                     (consultation_id, filename, json.dumps(result, ensure_ascii=False)))
+
+    def get_consultation(self, timestamp):
+        """Результат приема по метке времени или None"""
+        row = self.connection().execute(
+            "SELECT r.data FROM consultations c JOIN results r ON r.consultation_id = c.id WHERE c.timestamp = ?",
+            (timestamp,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def find_consultations(self, patient_name):
+        """Приемы пациента (метка времени, врач) от новых к старым"""
+        return self.connection().execute(
+            "SELECT c.timestamp, d.name FROM consultations c "
+            "JOIN patients p ON p.id = c.patient_id LEFT JOIN doctors d ON d.id = c.doctor_id "
+            "WHERE p.name = ? ORDER BY c.timestamp DESC",
+            (patient_name,)
+        ).fetchall()
+
+    def migrate_from_json(self):
+        """
+        Однократный перенос данных из doctors.json, patient_history.json,
+        Results/result_*.json и audio_records/transcript_*.txt. Исходные файлы не удаляются.
+        """
+        conn = self.connection()
+        if conn.execute("SELECT value FROM meta WHERE key = 'json_migrated'").fetchone():
+            return
+
+        counts = {"doctors": 0, "patients": 0, "results": 0, "transcripts": 0}
+        with conn:
+            # Без doctors.json StorageService возвращает список врачей по умолчанию - переносим и его
+            doctors = self._read_doctors()
+            conn.executemany("INSERT OR IGNORE INTO doctors(name, specialization) VALUES (?, ?)",
+                             list(doctors.items()))
+            counts["doctors"] = len(doctors)
+            history = self._read_patient_history()
+            conn.executemany("INSERT OR IGNORE INTO patients(name) VALUES (?)", [(name,) for name in history])
+            counts["patients"] = len(history)
+
+            for filename in sorted(glob.glob("Results/result_*.json")):
+                match = TIMESTAMP_PATTERN.search(os.path.basename(filename))
+                if not match:
+                    continue
+                try:
+                    with open(filename, "r", encoding="utf-8") as f:
+                        result = json.load(f)
+                except (OSError, ValueError) as e:
+                    logger.warning(f"Пропущен {filename}: {str(e)}")
+                    continue
+                self._store_result(conn, result, match.group(1), filename)
+                counts["results"] += 1
+
+            for filename in sorted(glob.glob("audio_records/transcript_*.txt")):
+                match = TIMESTAMP_PATTERN.search(os.path.basename(filename))
+                if not match:
+                    continue
+                with open(filename, "r", encoding="utf-8") as f:
+                    content = f.read()
+                consultation_id = self._consultation_id(conn, match.group(1))
+                conn.execute("INSERT OR IGNORE INTO transcripts(consultation_id, path, content) VALUES (?, ?, ?)",
+                             (consultation_id, filename, content))
+                counts["transcripts"] += 1
+
+            conn.execute("INSERT INTO meta(key, value) VALUES ('json_migrated', '1')")
+        logger.info(f"Данные перенесены из JSON в {self.path}: {counts}")
@@ -2,14 +2,29 @@ import os
 import json
 import logging
 from models.doctor import Doctor
+from services.file_utils import atomic_write_text
+from services.search_index import SearchIndex
+from services.write_behind import get_write_behind
 
 logger = logging.getLogger(__name__)
 
 class StorageService:
-    def __init__(self):
+    """
+    Хранение врачей, истории пациентов, транскриптов и результатов в файлах.
+
+    Списки врачей и пациентов держатся в памяти: изменения видны сразу, а файлы
+    перезаписываются атомарно в фоновом потоке (WriteBehind), несколько изменений
+    подряд - одной записью. flush() дописывает отложенные изменения немедленно.
+    """
+    def __init__(self, search_index=None, write_behind=None):
         # Создаем необходимые директории
         self.required_dirs = ["audio_records", "Results"]
         self.create_directories()
+        self.search_index = search_index
+        self.write_behind = write_behind or get_write_behind()
+        self._doctors = None
+        self._patients = None
+        self._patient_names = None
     
     def create_directories(self):
         """Создание необходимых директорий"""
@@ -18,8 +33,21 @@ class StorageService:
                 os.makedirs(directory)
                 logger.info(f"Создана директория {directory}")
     
-    def load_doctors(self):
-        """Загрузка списка врачей из файла"""
+    def _write_json(self, path, data, what):
+        try:
+            atomic_write_text(path, json.dumps(data, ensure_ascii=False, indent=2))
+        except Exception as e:
+            logger.error(f"Ошибка при сохранении {what}: {str(e)}")
+    
+    def _write_json_later(self, path, data, what):
+        """Атомарная запись JSON в фоне; более поздняя запись того же файла заменяет эту"""
+        self.write_behind.submit(path, lambda: self._write_json(path, data, what))
+    
+    def flush(self):
+        """Немедленная запись отложенных изменений"""
+        self.write_behind.flush()
+    
+    def _read_doctors(self):
         try:
             if os.path.exists("doctors.json"):
                 with open("doctors.json", "r", encoding="utf-8") as f:
@@ -32,16 +60,7 @@ class StorageService:
             "Амичба Амина": "general_physician"
         }
     
-    def save_doctors(self, doctors):
-        """Сохранение списка врачей в файл"""
-        try:
-            with open("doctors.json", "w", encoding="utf-8") as f:
-                json.dump(doctors, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            logger.error(f"Ошибка при сохранении списка врачей: {str(e)}")
-    
-    def load_patient_history(self):
-        """Загрузка истории пациентов из файла"""
+    def _read_patient_history(self):
         try:
             if os.path.exists("patient_history.json"):
                 with open("patient_history.json", "r", encoding="utf-8") as f:
@@ -50,32 +69,111 @@ class StorageService:
             logger.error(f"Ошибка при загрузке истории пациентов: {str(e)}")
         return []
     
+    def load_doctors(self):
+        """Загрузка списка врачей из файла"""
+        if self._doctors is None:
+            self._doctors = self._read_doctors()
+        return dict(self._doctors)
+    
+    def save_doctors(self, doctors):
+        """Сохранение списка врачей в файл"""
+        self._doctors = dict(doctors)
+        self._write_json_later("doctors.json", dict(doctors), "списка врачей")
+    
+    def load_patient_history(self):
+        """Загрузка истории пациентов из файла"""
+        if self._patients is None:
+            self._patients = self._read_patient_history()
+            self._patient_names = set(self._patients)
+        return list(self._patients)
+    
     def save_patient_history(self, history):
         """Сохранение истории пациентов в файл"""
-        try:
-            with open("patient_history.json", "w", encoding="utf-8") as f:
-                json.dump(history, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            logger.error(f"Ошибка при сохранении истории пациентов: {str(e)}")
+        self._patients = list(history)
+        self._patient_names = set(self._patients)
+        self._write_json_later("patient_history.json", list(history), "истории пациентов")
+    
+    def add_doctor(self, name, specialization):
+        """Добавление или изменение одного врача"""
+        doctors = self.load_doctors()
+        doctors[name] = specialization
+        self.save_doctors(doctors)
+    
+    def add_patient(self, patient_name):
+        """Добавление пациента в историю; возвращает False, если он уже есть"""
+        self.load_patient_history()
+        if patient_name in self._patient_names:
+            return False
+        self._patients.append(patient_name)
+        self._patient_names.add(patient_name)
+        self._write_json_later("patient_history.json", list(self._patients), "истории пациентов")
+        return True
     
-    def save_transcript(self, transcript, timestamp):
-        """Сохранение транскрипта в файл"""
+    def save_transcript(self, transcript, timestamp, patient_name=None, doctor_name=None):
+        """
+        Сохранение транскрипта в файл
+
+        Args:
+            patient_name, doctor_name (str): Пациент и врач приема (используются хранилищами с базой приемов)
+        """
         filename = f"audio_records/transcript_{timestamp}.txt"
         try:
-            with open(filename, "w", encoding="utf-8") as f:
-                f.write(transcript)
-            return filename
+            atomic_write_text(filename, transcript)
         except Exception as e:
             logger.error(f"Ошибка при сохранении транскрипта: {str(e)}")
             return None
+        self.update_search_index(timestamp, transcript_path=filename)
+        return filename
     
-    def save_result(self, result, timestamp):
-        """Сохранение результата в JSON"""
+    def save_result(self, result, timestamp, transcript_file=None):
+        """
+        Сохранение результата в JSON
+
+        Args:
+            transcript_file (str): Транскрипт приема для поискового индекса
+                (по умолчанию - audio_records/transcript_<timestamp>.txt, если он есть).
+                Записывается в JSON, чтобы при перестроении индекса результат нашел свой транскрипт
+        """
         filename = f"Results/result_{timestamp}.json"
+        data = dict(result, transcript_file=transcript_file) if transcript_file and isinstance(result, dict) else result
         try:
-            with open(filename, "w", encoding="utf-8") as f:
-                json.dump(result, f, ensure_ascii=False, indent=2)
-            return filename
+            atomic_write_text(filename, json.dumps(data, ensure_ascii=False, indent=2))
         except Exception as e:
             logger.error(f"Ошибка при сохранении результата: {str(e)}")
-            return None 
\ No newline at end of file
+            return None
+        self.update_search_index(timestamp, result, transcript_file or f"audio_records/transcript_{timestamp}.txt")
+        return filename
+    
+    def update_search_index(self, timestamp, result=None, transcript_path=None):
+        """Добавление приема в полнотекстовый индекс; ошибка индекса не мешает сохранению"""
+        if self.search_index is None:
+            return
+        try:
+            self.search_index.index_consultation(timestamp, result, transcript_path)
+        except Exception as e:
+            logger.error(f"Ошибка при обновлении поискового индекса: {str(e)}")
+    
+    def get_consultation(self, timestamp):
+        """Результат приема по метке времени или None"""
+        filename = f"Results/result_{timestamp}.json"
+        try:
+            with open(filename, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+
+def create_storage_service():
+    """
+    Создает хранилище в зависимости от STORAGE_BACKEND: sqlite (по умолчанию) или json.
+    При первом запуске SQLite-хранилища данные из JSON-файлов переносятся в базу.
+    Сохраненные приемы в обоих случаях попадают в поисковый индекс SEARCH_DB (по умолчанию search_index.db).
+    """
+    backend = os.getenv("STORAGE_BACKEND", "sqlite").lower()
+    if backend not in ("sqlite", "json"):
+        raise ValueError(f"Неизвестный тип хранилища: {backend}")
+    search_index = SearchIndex(os.getenv("SEARCH_DB", "search_index.db"))
+    if backend == "json":
+        return StorageService(search_index)
+    from services.sqlite_storage import SQLiteStorageService
+    return SQLiteStorageService(os.getenv("STORAGE_DB", "medical_report.db"), search_index)
@@ -0,0 +1,118 @@
+import os
+import glob
+import json
+import time
+import logging
+import threading
+
+from services.file_utils import atomic_write_text
+
+logger = logging.getLogger(__name__)
+
+SPEAKER_LABELS = {1: "Врач", 2: "Пациент"}
+
+
+def format_segment(segment):
+    """Строка транскрипта в том же виде, что и в окне расшифровки"""
+    label = SPEAKER_LABELS.get(segment.get("speaker"))
+    return f"{label}: {segment['text']}" if label else segment["text"]
+
+
+def render_transcript(segments):
+    """Текст для ChatGPT: по строке на финальную фразу"""
+    return "\n".join(format_segment(segment) for segment in segments)
+
+
+def load_segments(path):
+    """
+    Читает сегменты из JSONL. Недописанная последняя строка (сбой во время записи)
+    пропускается, остальные сегменты сохраняются.
+    """
+    segments = []
+    with open(path, "r", encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                segments.append(json.loads(line))
+            except ValueError:
+                logger.warning(f"{path}: пропущена поврежденная строка {number}")
+    return segments
+
+
+class TranscriptStore:
+    """
+    Журнал финальных фраз приема в формате JSONL (одна строка - один сегмент).
+
+    Каждый сегмент дописывается в конец файла сразу при получении и сбрасывается из буфера
+    Python; fsync выполняется не чаще раза в fsync_interval секунд. После сбоя на диске
+    остаются все фразы до последнего fsync, а текст транскрипта восстанавливается из журнала.
+    """
+    def __init__(self, path, fsync_interval=2.0):
+        self.path = path
+        self.fsync_interval = fsync_interval
+        self.segments = []
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+        self._last_sync = time.monotonic()
+
+    def append(self, segment):
+        line = json.dumps(segment, ensure_ascii=False) + "\n"
+        with self._lock:
+            if self._file is None:
+                logger.warning(f"Сегмент получен после закрытия {self.path}: {segment.get('text')}")
+                return
+            self.segments.append(segment)
+            self._file.write(line)
+            self._file.flush()
+            if time.monotonic() - self._last_sync >= self.fsync_interval:
+                os.fsync(self._file.fileno())
+                self._last_sync = time.monotonic()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._file.close()
+                self._file = None
+
+    def render(self):
+        with self._lock:
+            return render_transcript(self.segments)
+
+    def write_text(self, path):
+        """Сохраняет транскрипт в текстовый файл; возвращает путь или None, если фраз не было"""
+        text = self.render()
+        if not text:
+            return None
+        # Атомарно: недописанный .txt помешал бы recover_sessions восстановить транскрипт из журнала
+        return atomic_write_text(path, text)
+
+
+def text_path(jsonl_path):
+    return os.path.splitext(jsonl_path)[0] + ".txt"
+
+
+def recover_sessions(directory="audio_records"):
+    """
+    Восстанавливает транскрипты приемов, прерванных сбоем: для каждого журнала
+    transcript_*.jsonl без соседнего .txt создает .txt. Возвращает список созданных файлов.
+    """
+    recovered = []
+    for jsonl_path in sorted(glob.glob(os.path.join(directory, "transcript_*.jsonl"))):
+        txt_path = text_path(jsonl_path)
+        if os.path.exists(txt_path):
+            continue
+        try:
+            segments = load_segments(jsonl_path)
+            if not segments:
+                continue
+            atomic_write_text(txt_path, render_transcript(segments))
+            recovered.append(txt_path)
+            logger.info(f"Восстановлен транскрипт {txt_path}: {len(segments)} фраз")
+        except Exception as e:
+            logger.error(f"Ошибка при восстановлении {jsonl_path}: {str(e)}")
+    return recovered
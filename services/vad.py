@@ -0,0 +1,115 @@
+import numpy as np
+
+# Кадр анализа и пороги по умолчанию (энергия в дБ относительно полной шкалы 16 бит)
+FRAME_MS = 20
+THRESHOLD_DB = 6.0
+MIN_ENERGY_DB = -60.0
+# Доля смен знака: ниже MIN_ZCR - гул и наводка, выше FRICATIVE_ZCR - глухие согласные (с, ш, ф)
+MIN_ZCR = 0.02
+FRICATIVE_ZCR = 0.25
+HANGOVER_MS = 600
+# Скорость подъема оценки шума за кадр: в паузах - за пару секунд, во время речи - в десять раз медленнее,
+# чтобы длинная фраза не поднимала порог, а постоянный шум с первых секунд записи все же был усвоен
+NOISE_RISE = 0.01
+SPEECH_NOISE_RISE = 0.001
+
+
+class VoiceActivityDetector:
+    """
+    Детектор речи по энергии и числу переходов через ноль, векторизованный по кадрам.
+
+    Блок аудио (обычно 100 мс) делится на кадры по FRAME_MS, и для всех кадров сразу
+    считаются энергия (без постоянной составляющей) и доля смен знака. Кадр - речь, если
+    его энергия выше оценки шума на threshold_db и это не низкочастотный гул, или если
+    энергия выше на половину порога при высокой доле смен знака (тихие глухие согласные).
+    Оценка шума следит за минимумом энергии блока: опускается сразу, поднимается медленно.
+    После последнего речевого кадра блоки еще hangover_ms считаются речью, чтобы не
+    обрывать концы слов. Рабочие массивы выделяются один раз и переиспользуются.
+    """
+    def __init__(self, sample_rate=16000, frame_ms=FRAME_MS, threshold_db=THRESHOLD_DB,
+                 min_energy_db=MIN_ENERGY_DB, min_zcr=MIN_ZCR, fricative_zcr=FRICATIVE_ZCR,
+                 hangover_ms=HANGOVER_MS, noise_rise=NOISE_RISE, speech_noise_rise=SPEECH_NOISE_RISE):
+        self.frame_ms = frame_ms
+        self.frame_samples = sample_rate * frame_ms // 1000
+        self.threshold_db = threshold_db
+        self.min_energy_db = min_energy_db
+        self.min_zcr = min_zcr
+        self.fricative_zcr = fricative_zcr
+        self.hangover_ms = hangover_ms
+        self.noise_rise = noise_rise
+        self.speech_noise_rise = speech_noise_rise
+        self.noise_db = min_energy_db
+        self.silence_ms = float("inf")
+        self.frames = 0
+        self.speech_frames = 0
+        self._allocate(1)
+
+    def _allocate(self, frame_count):
+        self._capacity = frame_count
+        self._samples = np.empty((frame_count, self.frame_samples), dtype=np.float32)
+        self._signs = np.empty((frame_count, self.frame_samples), dtype=bool)
+        self._changes = np.empty((frame_count, self.frame_samples - 1), dtype=bool)
+        self._means = np.empty((frame_count, 1), dtype=np.float32)
+        self._energy = np.empty(frame_count, dtype=np.float32)
+        self._zcr = np.empty(frame_count, dtype=np.float32)
+
+    def frame_flags(self, data):
+        """Признак речи для каждого целого кадра блока PCM16 (остаток короче кадра не анализируется)"""
+        samples = np.frombuffer(data, dtype=np.int16)
+        count = len(samples) // self.frame_samples
+        if count > self._capacity:
+            self._allocate(count)
+        frames = self._samples[:count]
+        np.copyto(frames, samples[:count * self.frame_samples].reshape(count, self.frame_samples), casting="unsafe")
+
+        means = self._means[:count]
+        np.mean(frames, axis=1, keepdims=True, out=means)
+        frames -= means
+        energy = self._energy[:count]
+        np.einsum("ij,ij->i", frames, frames, out=energy)
+        energy *= 1.0 / (self.frame_samples * 32768.0 * 32768.0)
+        energy += 1e-12
+        np.log10(energy, out=energy)
+        energy *= 10.0
+
+        signs = self._signs[:count]
+        np.signbit(frames, out=signs)
+        changes = self._changes[:count]
+        np.not_equal(signs[:, 1:], signs[:, :-1], out=changes)
+        zcr = self._zcr[:count]
+        np.sum(changes, axis=1, dtype=np.float32, out=zcr)
+        zcr *= 1.0 / (self.frame_samples - 1)
+
+        threshold = max(self.noise_db + self.threshold_db, self.min_energy_db)
+        voiced = (energy > threshold) & (zcr >= self.min_zcr)
+        unvoiced = (energy > threshold - self.threshold_db / 2) & (zcr >= self.fricative_zcr)
+        flags = voiced | unvoiced
+
+        if count:
+            quietest = float(energy.min())
+            if quietest < self.noise_db:
+                self.noise_db = max(quietest, self.min_energy_db)
+            else:
+                rise = self.speech_noise_rise if flags.any() else self.noise_rise
+                self.noise_db += (quietest - self.noise_db) * min(1.0, rise * count)
+        return flags
+
+    def is_speech(self, data):
+        """Решение для блока целиком: есть речевые кадры или не истекло удержание после последнего"""
+        flags = self.frame_flags(data)
+        count = len(flags)
+        self.frames += count
+        speech = np.flatnonzero(flags)
+        self.speech_frames += len(speech)
+        if len(speech):
+            self.silence_ms = (count - 1 - speech[-1]) * self.frame_ms
+            return True
+        self.silence_ms += count * self.frame_ms
+        return self.silence_ms <= self.hangover_ms
+
+    def stats(self):
+        return {
+            "vad_frames": self.frames,
+            "vad_speech_ratio": round(self.speech_frames / self.frames, 3) if self.frames else 0.0,
+            "vad_noise_db": round(self.noise_db, 1),
+        }
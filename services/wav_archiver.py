@@ -0,0 +1,86 @@
+import os
+import time
+import wave
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class WavArchiver:
+    """
+    Фоновая запись исходного аудио в WAV из того же кольцевого буфера, что читает распознавание.
+
+    Данные берутся из буфера без промежуточного копирования (RingReader.peek).
+    Заголовок WAV обновляется при каждой записи блока, а файл периодически
+    сбрасывается на диск, поэтому после сбоя остается корректный файл
+    со всем аудио до последнего fsync.
+    """
+    def __init__(self, buffer, path, sample_rate=16000, sample_width=2, channels=1,
+                 block_seconds=1.0, fsync_interval=5.0, start=None):
+        self.path = path
+        self.reader = buffer.reader(start)
+        self.buffer = buffer
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+        self.channels = channels
+        self.block_bytes = int(sample_rate * sample_width * channels * block_seconds)
+        self.fsync_interval = fsync_interval
+        self.written_bytes = 0
+        self._thread = None
+        self._file = None
+
+    def start(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._file = open(self.path, "wb")
+        self._thread = threading.Thread(target=self._run, name="wav-archiver", daemon=True)
+        self._thread.start()
+        logger.info(f"Запись аудио в {self.path}")
+        return self
+
+    def _run(self):
+        last_sync = time.monotonic()
+        try:
+            with wave.open(self._file, "wb") as wav:
+                wav.setnchannels(self.channels)
+                wav.setsampwidth(self.sample_width)
+                wav.setframerate(self.sample_rate)
+                while True:
+                    views = self.reader.peek(self.block_bytes, timeout=1.0)
+                    size = sum(len(view) for view in views)
+                    if not size:
+                        if self.buffer.closed:
+                            break
+                        continue
+                    # writeframes дописывает данные и сразу исправляет размеры в заголовке
+                    for view in views:
+                        wav.writeframes(view)
+                    self.reader.advance(size)
+                    self.written_bytes += size
+
+                    if time.monotonic() - last_sync >= self.fsync_interval:
+                        self._sync()
+                        last_sync = time.monotonic()
+                self._sync()
+        except Exception as e:
+            logger.error(f"Ошибка при записи аудио в {self.path}: {str(e)}")
+        finally:
+            self._file.close()
+            logger.info(f"Аудио сохранено в {self.path}: {self.written_bytes} байт, {self.reader.stats()}")
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def join(self, timeout=None):
+        """Ожидает, пока архиватор допишет оставшиеся данные после закрытия буфера"""
+        if self._thread:
+            self._thread.join(timeout)
+
+    def stats(self):
+        stats = self.reader.stats()
+        return {
+            "archived_bytes": self.written_bytes,
+            "archive_overruns": stats["overruns"],
+            "archive_overrun_bytes": stats["overrun_bytes"],
+        }
@@ -0,0 +1,105 @@
+import time
+import atexit
+import logging
+import itertools
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Пауза после последнего изменения перед записью и предельная задержка при непрерывных изменениях
+DEFAULT_DELAY = 0.5
+DEFAULT_MAX_DELAY = 3.0
+
+
+class WriteBehind:
+    """
+    Отложенная запись в фоновом потоке.
+
+    submit(key, write) ставит функцию записи в очередь; повторная постановка с тем же ключом
+    заменяет предыдущую, поэтому серия изменений одного файла превращается в одну запись.
+    Запись выполняется через delay секунд после последнего изменения, но не позже max_delay
+    после первого. flush() выполняет все отложенные записи сразу и дожидается их
+    (вызывается при закрытии окна и при выходе из программы).
+    """
+    def __init__(self, delay=DEFAULT_DELAY, max_delay=DEFAULT_MAX_DELAY):
+        self.delay = delay
+        self.max_delay = max_delay
+        self._pending = {}
+        self._deadline = None
+        self._first_change = None
+        self._closed = False
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        # Не дает flush() вернуться, пока фоновый поток еще пишет взятые им изменения
+        self._write_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, key, write):
+        """
+        Ставит запись в очередь. key=None - запись без объединения с другими
+        (например, вставка отдельной строки в базу).
+        """
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("WriteBehind уже закрыт")
+            if key is None:
+                key = ("unique", next(self._counter))
+            self._pending.pop(key, None)
+            self._pending[key] = write
+            now = time.monotonic()
+            if self._first_change is None:
+                self._first_change = now
+            self._deadline = min(now + self.delay, self._first_change + self.max_delay)
+            self._changed.notify()
+
+    def _take(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._deadline = self._first_change = None
+            return pending
+
+    def _write(self, pending):
+        for write in pending.values():
+            try:
+                write()
+            except Exception as e:
+                logger.error(f"Ошибка отложенной записи: {str(e)}")
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while not self._closed and (self._deadline is None or time.monotonic() < self._deadline):
+                    timeout = None if self._deadline is None else self._deadline - time.monotonic()
+                    self._changed.wait(timeout)
+                if self._closed:
+                    return
+            with self._write_lock:
+                self._write(self._take())
+
+    def flush(self):
+        """Выполняет все отложенные записи в текущем потоке"""
+        with self._write_lock:
+            self._write(self._take())
+
+    def close(self):
+        """Дописывает изменения и останавливает фоновый поток"""
+        self.flush()
+        with self._lock:
+            self._closed = True
+            self._changed.notify()
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def get_write_behind():
+    """Общий для приложения поток отложенной записи"""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = WriteBehind()
+        return _default
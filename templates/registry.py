@@ -0,0 +1,144 @@
+import os
+import json
+import logging
+import threading
+
+from templates.tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "specializations.json")
+
+
+class SpecializationTemplate:
+    """Шаблон специализации: инструкции для ChatGPT и список разделов заключения"""
+    def __init__(self, code, name, instructions, sections, prompt):
+        self.code = code
+        self.name = name
+        self.instructions = instructions
+        self.sections = sections
+        self.prompt = prompt
+
+    @property
+    def section_keys(self):
+        return [section['key'] for section in self.sections]
+
+    @property
+    def token_count(self):
+        """Оценка числа токенов в инструкциях шаблона"""
+        return estimate_tokens(self.prompt)
+
+
+class TemplateRegistry:
+    """
+    Реестр специализаций, загружаемый один раз из specializations.json.
+
+    Инструкции собираются так, чтобы общий статический префикс (описание задачи и пример JSON)
+    всегда шел первым и совпадал побайтно для всех специализаций - это позволяет
+    кэшированию префиксов на стороне OpenAI срабатывать для любого врача.
+    """
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        self._validate(data)
+
+        self.sections = data['sections']
+        self.shared_prefix = self._build_prefix(data['prefix'], self.sections)
+        self.templates = {}
+        for spec in data['specializations']:
+            extra_sections = spec.get('extra_sections', [])
+            self.templates[spec['code']] = SpecializationTemplate(
+                code=spec['code'],
+                name=spec['name'],
+                instructions=spec['instructions'],
+                sections=self.sections + extra_sections,
+                prompt=self.shared_prefix + self._build_suffix(spec, extra_sections),
+            )
+        logger.info(f"Загружено шаблонов специализаций: {len(self.templates)}")
+
+    @staticmethod
+    def _validate(data):
+        """Проверяет структуру файла специализаций"""
+        for field in ('prefix', 'sections', 'specializations'):
+            if field not in data:
+                raise ValueError(f"В описании шаблонов нет поля '{field}'")
+
+        def check_sections(sections, owner):
+            keys = set()
+            for section in sections:
+                if 'key' not in section or 'example' not in section:
+                    raise ValueError(f"{owner}: у раздела должны быть поля 'key' и 'example'")
+                if section['key'] in keys:
+                    raise ValueError(f"{owner}: раздел '{section['key']}' указан дважды")
+                keys.add(section['key'])
+            return keys
+
+        shared_keys = check_sections(data['sections'], "Общие разделы")
+        codes = set()
+        names = set()
+        for spec in data['specializations']:
+            for field in ('code', 'name', 'instructions'):
+                if not spec.get(field):
+                    raise ValueError(f"У специализации {spec.get('code', '?')} не заполнено поле '{field}'")
+            if spec['code'] in codes or spec['name'] in names:
+                raise ValueError(f"Специализация {spec['code']} ({spec['name']}) указана дважды")
+            codes.add(spec['code'])
+            names.add(spec['name'])
+            extra_keys = check_sections(spec.get('extra_sections', []), spec['code'])
+            if extra_keys & shared_keys:
+                raise ValueError(f"{spec['code']}: дополнительные разделы совпадают с общими")
+
+    @staticmethod
+    def _build_prefix(prefix, sections):
+        """Общая часть инструкций: одинакова для всех специализаций"""
+        example = {section['key']: section['example'] for section in sections}
+        return f"{prefix}\n\n{json.dumps(example, ensure_ascii=False, indent=2)}\n"
+
+    @staticmethod
+    def _build_suffix(spec, extra_sections):
+        """Часть инструкций, зависящая от специализации; всегда идет после общего префикса"""
+        parts = [f"\nСпециальность врача: {spec['name'].lower()}."]
+        if extra_sections:
+            example = {section['key']: section['example'] for section in extra_sections}
+            parts.append("Дополнительно заполни разделы:")
+            parts.append(json.dumps(example, ensure_ascii=False, indent=2))
+        parts.append(spec['instructions'])
+        return "\n".join(parts) + "\n"
+
+    def get(self, code):
+        """Возвращает шаблон по коду специализации"""
+        try:
+            return self.templates[code]
+        except KeyError:
+            raise ValueError(f"Шаблон для специализации {code} не найден")
+
+    def specializations(self):
+        """Словарь {русское название: код} в порядке из файла"""
+        return {template.name: code for code, template in self.templates.items()}
+
+    def section_titles(self):
+        """Заголовки разделов заключения (общих и дополнительных) в порядке вывода"""
+        titles = {}
+        for template in self.templates.values():
+            for section in template.sections:
+                if 'title' in section:
+                    titles.setdefault(section['key'], section['title'])
+        return list(titles.items())
+
+    def token_counts(self):
+        """Оценка числа токенов инструкций для каждой специализации"""
+        return {code: template.token_count for code, template in self.templates.items()}
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """Возвращает реестр шаблонов, загружая его при первом обращении"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = TemplateRegistry()
+        return _registry
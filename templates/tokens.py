@@ -0,0 +1,6 @@
+def estimate_tokens(text):
+    """
+    Грубая оценка числа токенов без токенизатора.
+    Для русского текста один токен в среднем приходится на 3 символа.
+    """
+    return max(1, len(text or "") // 3)
@@ -0,0 +1,101 @@
+import asyncio
+
+import httpx
+import pytest
+
+from chatgpt import AsyncChatGPTAPI, ChatGPTAPI
+from services.rate_limiter import AsyncRateLimiter
+from services.response_cache import ResponseCache
+from tools.openai_stub import OpenAIStubServer, DEFAULT_CONTENT
+
+INSTRUCTIONS = "Верни JSON с разделами отчета"
+
+
+class RecordingLimiter(AsyncRateLimiter):
+    def __init__(self):
+        super().__init__(requests_per_minute=6000, tokens_per_minute=30000)
+        self.acquired = []
+        self.pauses = []
+
+    async def acquire(self, tokens):
+        self.acquired.append(tokens)
+        return await super().acquire(tokens)
+
+    def pause(self, seconds):
+        self.pauses.append(seconds)
+        super().pause(seconds)
+
+
+@pytest.fixture
+def stub():
+    servers = []
+
+    def start(**options):
+        server = OpenAIStubServer(**options).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+def process(server, limiter, content, cache=None, max_retries=4):
+    async def scenario():
+        async with AsyncChatGPTAPI("test-key", base_url=server.base_url, cache=cache, use_cache=cache is not None,
+                                   rate_limiter=limiter, max_retries=max_retries) as api:
+            return await api.process(INSTRUCTIONS, content=content)
+
+    return asyncio.run(scenario())
+
+
+def test_async_client_does_not_expose_sync_methods():
+    for name in ("get_response", "process_stream", "client"):
+        assert hasattr(ChatGPTAPI, name)
+        assert not hasattr(AsyncChatGPTAPI, name)
+
+
+def test_reservation_uses_completion_estimate_not_max_tokens():
+    api = AsyncChatGPTAPI("test-key", use_cache=False, max_tokens=8000, completion_estimate=1000)
+    messages = api.build_messages(INSTRUCTIONS, content="Жалобы на головную боль")
+    assert 1000 < api.estimate_request_tokens(messages) < 1100
+
+
+def test_retry_after_pauses_limiter_and_takes_request_slot_per_attempt(stub):
+    server = stub(fail_first=1, fail_status=429, retry_after=0.1)
+    limiter = RecordingLimiter()
+
+    result = process(server, limiter, "Жалобы на головную боль")
+
+    assert result["choices"][0]["finish_reason"] == "stop"
+    assert server.request_count == 2
+    assert limiter.acquired[0] > 0 and limiter.acquired[1:] == [0]
+    assert len(limiter.pauses) == 1 and limiter.pauses[0] >= 0.1
+    # Заглушка сообщает total_tokens=0 - весь резерв вернулся в лимит
+    assert limiter.stats()["available_tokens"] == 30000
+
+
+def test_failed_request_returns_whole_reservation(stub):
+    server = stub(fail_first=10, fail_status=503, retry_after=0)
+    limiter = RecordingLimiter()
+
+    with pytest.raises(httpx.HTTPStatusError):
+        process(server, limiter, "Жалобы на головную боль", max_retries=1)
+
+    assert server.request_count == 2
+    assert limiter.stats()["available_tokens"] == 30000
+
+
+def test_cache_hit_skips_limiter(stub, tmp_path):
+    server = stub()
+    limiter = RecordingLimiter()
+    cache = ResponseCache(directory=str(tmp_path / "cache"))
+
+    first = process(server, limiter, "Жалобы на головную боль", cache=cache)
+    second = process(server, limiter, "Жалобы на головную боль", cache=cache)
+
+    assert first == second
+    assert server.request_count == 1
+    assert len(limiter.acquired) == 1
+    assert cache.hits == 1
+    assert DEFAULT_CONTENT["complaints"][0] in second["choices"][0]["message"]["content"]
@@ -0,0 +1,122 @@
+import threading
+
+from services.audio_buffer import RingBuffer
+
+
+def pattern(start, size):
+    return bytes((start + offset) % 251 for offset in range(size))
+
+
+def test_reads_follow_writes_across_wrap_around():
+    buffer = RingBuffer(100)
+    reader = buffer.reader()
+    written = 0
+    for size in (60, 30, 50, 80, 2):
+        buffer.write(pattern(written, size))
+        assert reader.read(size, timeout=0) == pattern(written, size)
+        written += size
+    assert reader.position == buffer.write_position == written
+    assert reader.stats()["overruns"] == 0
+
+
+def test_readers_keep_independent_positions():
+    buffer = RingBuffer(100)
+    first = buffer.reader()
+    buffer.write(pattern(0, 40))
+    second = buffer.reader(start=20)
+    assert first.read(10, timeout=0) == pattern(0, 10)
+    assert second.read(40, timeout=0) == pattern(20, 20)
+    assert first.available() == 30 and second.available() == 0
+
+
+def test_slow_reader_loses_oldest_data_and_counts_overrun():
+    buffer = RingBuffer(100)
+    reader = buffer.reader()
+    for start in range(0, 250, 50):
+        buffer.write(pattern(start, 50))
+
+    assert reader.read(100, timeout=0) == pattern(150, 100)
+    stats = reader.stats()
+    assert stats["overruns"] == 1 and stats["overrun_bytes"] == 150
+    # Читатель, созданный с позиции, которой уже нет в буфере, начинает с самых старых данных
+    assert buffer.reader(start=0).position == 150
+
+
+def test_write_larger_than_capacity_keeps_tail():
+    buffer = RingBuffer(100)
+    reader = buffer.reader()
+    buffer.write(pattern(0, 130))
+    assert buffer.write_position == 130
+    assert reader.read(200, timeout=0) == pattern(30, 100)
+    assert reader.overrun_bytes == 30
+
+
+def test_reads_are_whole_frames():
+    buffer = RingBuffer(101, frame_bytes=2)
+    assert buffer.capacity == 100
+    reader = buffer.reader()
+    buffer.write(pattern(0, 7))
+    assert reader.read(7, timeout=0) == pattern(0, 6)
+    assert buffer.reader(start=3).position == 2
+
+
+def test_timeout_counts_underrun_and_close_releases_waiting_reader():
+    buffer = RingBuffer(100)
+    reader = buffer.reader()
+    buffer.write(pattern(0, 10))
+    assert reader.read(50, timeout=0.01) == pattern(0, 10)
+    assert reader.underruns == 1
+
+    result = []
+    waiting = threading.Thread(target=lambda: result.append(reader.read(50)))
+    waiting.start()
+    buffer.write(pattern(10, 4))
+    buffer.close()
+    waiting.join(2)
+    assert result == [pattern(10, 4)]
+    assert reader.read(50) == b""
+
+
+def test_peek_and_advance_without_copy():
+    buffer = RingBuffer(100)
+    reader = buffer.reader()
+    buffer.write(pattern(0, 80))
+    reader.read(70, timeout=0)
+    buffer.write(pattern(80, 40))
+
+    views = reader.peek(50, timeout=0)
+    assert [len(view) for view in views] == [30, 20]
+    assert b"".join(bytes(view) for view in views) == pattern(70, 50)
+    reader.advance(50)
+    assert reader.position == 120 and reader.overruns == 0
+
+    # Писатель перезаписал просмотренную область до advance - потеря учитывается
+    buffer.write(pattern(120, 30))
+    reader.peek(30, timeout=0)
+    buffer.write(pattern(150, 90))
+    reader.advance(30)
+    assert reader.overruns == 1 and reader.overrun_bytes == 20
+
+
+def test_concurrent_writer_and_reader_lose_nothing_when_buffer_is_large_enough():
+    total = 200 * 1000
+    buffer = RingBuffer(256 * 1024)
+    reader = buffer.reader()
+
+    def produce():
+        for start in range(0, total, 1000):
+            buffer.write(pattern(start, 1000))
+        buffer.close()
+
+    producer = threading.Thread(target=produce)
+    producer.start()
+    received = bytearray()
+    while True:
+        data = reader.read(3200, timeout=1)
+        if not data and buffer.closed:
+            break
+        received += data
+    producer.join()
+
+    assert bytes(received) == pattern(0, total)
+    assert reader.overruns == 0
@@ -0,0 +1,55 @@
+from services.audio_service import AudioService
+
+
+class FakeSource:
+    reusable = True
+
+    def __init__(self):
+        self.started = []
+        self.stopped = 0
+
+    def start(self, on_audio):
+        self.started.append(on_audio)
+
+    def stop(self):
+        self.stopped += 1
+
+    def stats(self):
+        return {}
+
+
+def test_persistent_capture_starts_source_once():
+    source = FakeSource()
+    service = AudioService(source_factory=lambda: source, vad=False)
+    capture = service.enable_persistent_capture()
+    assert service.enable_persistent_capture() is capture
+    assert source.started == [capture._on_audio]
+    service.shutdown()
+
+
+def test_persistent_capture_enabled_during_recording_waits_for_stop():
+    source = FakeSource()
+    service = AudioService(source_factory=lambda: source, vad=False)
+    service.is_recording = True
+
+    assert service.enable_persistent_capture() is None
+    assert service.capture is None
+    assert source.started == []
+
+    service.stop_recording()
+    assert service.capture is not None
+    assert source.started == [service.capture._on_audio]
+    service.shutdown()
+
+
+def test_disabling_cancels_deferred_capture():
+    source = FakeSource()
+    service = AudioService(source_factory=lambda: source, vad=False)
+    service.is_recording = True
+    service.enable_persistent_capture()
+    service.is_recording = False
+    service.disable_persistent_capture()
+
+    service.stop_recording()
+    assert service.capture is None
+    assert source.started == []
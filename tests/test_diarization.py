@@ -0,0 +1,46 @@
+from datetime import timedelta
+
+from services.diarization import DiarizationTracker
+
+
+class Word:
+    def __init__(self, word, start, end, speaker_tag=1):
+        self.word = word
+        self.start_time = timedelta(seconds=start)
+        self.end_time = timedelta(seconds=end)
+        self.speaker_tag = speaker_tag
+
+
+def words(count, speakers=(1,), step=0.5):
+    return [Word(f"w{index}", index * step, (index + 1) * step, speakers[index // 3 % len(speakers)])
+            for index in range(count)]
+
+
+def emitted(turns):
+    return [word for turn in turns for word in turn.text.split()]
+
+
+def test_cumulative_lists_emit_each_word_once():
+    stream = words(10, speakers=(1, 2))
+    tracker = DiarizationTracker()
+    result = []
+    for end in (3, 5, 9, 10):
+        result += emitted(tracker.new_turns(stream[:end]))
+    assert result == [word.word for word in stream]
+    assert tracker.new_turns(stream) == []
+
+
+def test_restarted_list_skips_words_already_emitted_by_time():
+    stream = words(8)
+    tracker = DiarizationTracker()
+    assert emitted(tracker.new_turns(stream[:4])) == ["w0", "w1", "w2", "w3"]
+    # Новый, более короткий список: повтор последнего слова и два новых
+    assert emitted(tracker.new_turns(stream[3:6])) == ["w4", "w5"]
+
+
+def test_min_time_cuts_words_emitted_by_previous_session():
+    stream = words(6)
+    turns = DiarizationTracker().new_turns(stream, min_time=1.5)
+    # Слова с серединой не позже 1,5 с (w0..w2) уже выданы предыдущей сессией
+    assert emitted(turns) == ["w3", "w4", "w5"]
+    assert turns[0].start == 1.5
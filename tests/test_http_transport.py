@@ -0,0 +1,119 @@
+import socket
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from services.http_transport import HttpTransport, compute_backoff, parse_retry_after
+from tools.openai_stub import OpenAIStubServer
+
+PAYLOAD = {"model": "stub", "messages": [{"role": "user", "content": "Жалобы"}]}
+
+
+@pytest.fixture
+def stub():
+    servers = []
+
+    def start(**options):
+        server = OpenAIStubServer(**options).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+def headers(**values):
+    return CaseInsensitiveDict({name.replace("_", "-"): value for name, value in values.items()})
+
+
+def test_retry_after_in_seconds_and_milliseconds():
+    assert parse_retry_after(headers(Retry_After="3")) == 3.0
+    assert parse_retry_after(headers(retry_after="0.25")) == 0.25
+    assert parse_retry_after(headers(Retry_After="-5")) == 0.0
+    # retry-after-ms точнее и важнее Retry-After
+    assert parse_retry_after(headers(Retry_After="3", retry_after_ms="1500")) == 1.5
+    assert parse_retry_after(headers()) is None
+    assert parse_retry_after(headers(Retry_After="скоро")) is None
+
+
+def test_retry_after_as_http_date():
+    future = datetime.now(timezone.utc) + timedelta(seconds=30)
+    assert parse_retry_after(headers(Retry_After=format_datetime(future, usegmt=True))) == pytest.approx(30, abs=2)
+    past = datetime.now(timezone.utc) - timedelta(minutes=5)
+    assert parse_retry_after(headers(Retry_After=format_datetime(past, usegmt=True))) == 0.0
+
+
+@pytest.mark.parametrize("attempt", [0, 1, 3, 10])
+def test_backoff_is_full_jitter_within_capped_exponent(attempt):
+    bound = min(4.0, 0.5 * 2 ** attempt)
+    delays = [compute_backoff(attempt, base=0.5, cap=4.0) for _ in range(500)]
+    assert all(0 <= delay <= bound for delay in delays)
+    # Полный джиттер: задержки разбросаны по всему интервалу, а не прижаты к верхней границе
+    assert min(delays) < bound * 0.1 and max(delays) > bound * 0.9
+
+
+def test_backoff_waits_at_least_retry_after():
+    delays = [compute_backoff(0, base=0.5, retry_after=2.0) for _ in range(200)]
+    assert all(2.0 <= delay <= 2.5 for delay in delays)
+
+
+@pytest.mark.parametrize("status", [429, 500, 503])
+def test_retries_on_rate_limit_and_server_errors(stub, status):
+    server = stub(fail_first=2, fail_status=status, retry_after=0 if status == 429 else None)
+    transport = HttpTransport("test-key", server.base_url, max_retries=3, backoff_base=0.01)
+
+    response = transport.post_json("/chat/completions", PAYLOAD)
+
+    assert response.status_code == 200
+    assert response.json()["choices"][0]["finish_reason"] == "stop"
+    assert server.request_count == 3
+    transport.close()
+
+
+def test_gives_up_after_max_retries(stub):
+    server = stub(fail_first=10, fail_status=503)
+    transport = HttpTransport("test-key", server.base_url, max_retries=2, backoff_base=0.01)
+
+    with pytest.raises(requests.HTTPError) as error:
+        transport.post_json("/chat/completions", PAYLOAD)
+
+    assert error.value.response.status_code == 503
+    assert server.request_count == 3
+    transport.close()
+
+
+def test_client_errors_are_not_retried(stub):
+    server = stub(fail_first=1, fail_status=400)
+    transport = HttpTransport("test-key", server.base_url, max_retries=3, backoff_base=0.01)
+
+    with pytest.raises(requests.HTTPError):
+        transport.post_json("/chat/completions", PAYLOAD)
+    assert server.request_count == 1
+    transport.close()
+
+
+def test_connection_error_is_retried_then_raised():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    transport = HttpTransport("test-key", f"http://127.0.0.1:{port}/v1", max_retries=2, backoff_base=0.01)
+    with pytest.raises(requests.ConnectionError):
+        transport.post_json("/chat/completions", PAYLOAD)
+    transport.close()
+
+
+def test_requests_reuse_one_keep_alive_connection(stub):
+    server = stub(fail_first=1, fail_status=429, retry_after=0)
+    transport = HttpTransport("test-key", server.base_url, backoff_base=0.01)
+
+    assert transport.warm_up()
+    for _ in range(5):
+        transport.post_json("/chat/completions", PAYLOAD).json()
+
+    assert server.request_count == 6
+    assert server.connection_count == 1
+    transport.close()
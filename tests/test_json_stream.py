@@ -0,0 +1,69 @@
+import json
+import time
+
+import pytest
+
+from json_stream import IncrementalJSONParser
+
+RESPONSE = {
+    "patient": {"name": "Иванов \"Иван\"", "age": 42, "notes": {"allergies": ["пенициллин"], "flags": [[1, 2], []]}},
+    "complaints": ["боль в груди}", "одышка]", "кашель \\ \"сухой\""],
+    "empty": {},
+    "temperature": 37.5,
+    "smoker": False,
+    "allergy": None,
+    "diagnosis": "ОРВИ, {неуточненная} [J06.9]",
+    "count": -3,
+}
+
+
+def feed_in_pieces(text, size):
+    sections = []
+    parser = IncrementalJSONParser(lambda key, value: sections.append((key, value)))
+    for start in range(0, len(text), size):
+        parser.feed(text[start:start + size])
+    return parser, sections
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, 10000])
+def test_sections_arrive_in_order_whatever_the_chunking(size):
+    text = json.dumps(RESPONSE, ensure_ascii=False, indent=1)
+    parser, sections = feed_in_pieces(text, size)
+    assert sections == list(RESPONSE.items())
+    assert parser.result == RESPONSE
+    assert parser.done
+    assert parser.text == text
+
+
+def test_section_is_delivered_before_the_response_ends():
+    sections = []
+    parser = IncrementalJSONParser(lambda key, value: sections.append(key))
+    parser.feed('{"complaints": ["кашель"], "recommen')
+    assert sections == ["complaints"]
+    parser.feed('dations": ["покой"]')
+    assert sections == ["complaints", "recommendations"]
+    assert not parser.done
+    parser.feed("}")
+    assert parser.done
+
+
+def test_scalar_values_split_across_chunks():
+    parser, sections = feed_in_pieces('{"a": 12345, "b": tr' 'ue, "c": nu' 'll, "d": 1.5e3}', 5)
+    assert sections == [("a", 12345), ("b", True), ("c", None), ("d", 1500.0)]
+
+
+def test_broken_section_is_skipped():
+    parser, sections = feed_in_pieces('{"a": [1, 2,], "b": "ok"}', 4)
+    assert sections == [("b", "ok")]
+
+
+def test_long_response_is_parsed_in_linear_time():
+    sections = {f"section{number}": ["пункт " * 20] * 5 for number in range(2000)}
+    text = json.dumps(sections, ensure_ascii=False)
+    started = time.perf_counter()
+    parser, delivered = feed_in_pieces(text, 4)
+    elapsed = time.perf_counter() - started
+    assert len(delivered) == len(sections)
+    assert parser.text == text
+    # ~2.5 млн символов по 4: при склейке всего текста на каждом фрагменте это минуты
+    assert elapsed < 20
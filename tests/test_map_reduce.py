@@ -0,0 +1,87 @@
+import json
+import threading
+
+from process_utils import split_transcript, merge_results, process_chunks, process_file
+from templates.tokens import estimate_tokens
+
+
+class FakeChatGPT:
+    """Возвращает жалобы из каждой строки части; записывает инструкции запросов"""
+    def __init__(self):
+        self.instructions = []
+        self._lock = threading.Lock()
+
+    def process(self, ai_instructions, content=None, file_path=None):
+        with self._lock:
+            self.instructions.append(ai_instructions)
+        complaints = [line.split(": ", 1)[1] for line in content.splitlines()]
+        body = {"patient": {"name": "Иванов" if "Иванов" in content else ""}, "complaints": complaints}
+        return {"choices": [{"message": {"content": json.dumps(body, ensure_ascii=False)}}]}
+
+
+def lines(count):
+    return [f"Пациент: жалоба номер {number:03d}" for number in range(count)]
+
+
+def test_split_keeps_lines_whole_and_within_budget():
+    content = "\n".join(lines(50))
+    budget = estimate_tokens(lines(1)[0]) * 7
+    chunks = split_transcript(content, budget)
+
+    assert len(chunks) == 8
+    assert "\n".join(chunks).splitlines() == lines(50)
+    assert all(sum(estimate_tokens(line) for line in chunk.splitlines()) <= budget for chunk in chunks)
+
+
+def test_split_drops_blank_lines_and_keeps_long_line_alone():
+    long_line = "Врач: " + "очень длинная реплика " * 50
+    chunks = split_transcript(f"Пациент: коротко\n\n{long_line}\nПациент: еще", 20)
+    assert chunks == ["Пациент: коротко", long_line, "Пациент: еще"]
+    assert split_transcript("", 20) == []
+
+
+def test_merge_dedupes_list_items_and_keeps_first_values():
+    merged = merge_results([
+        {"complaints": ["Головная боль", "Кашель"], "patient": {"name": "", "age": "42"}, "note": ""},
+        {"complaints": ["головная  боль.", "Ёжится от холода"], "patient": {"name": "Иванов"}, "note": "А"},
+        {"complaints": ["Ежится от холода", {"symptom": "жар"}, {"symptom": "жар"}], "note": "Б"},
+        "не словарь",
+    ])
+    assert merged == {
+        "complaints": ["Головная боль", "Кашель", "Ёжится от холода", {"symptom": "жар"}],
+        "patient": {"age": "42", "name": "Иванов"},
+        "note": "А",
+    }
+
+
+def test_chunks_are_numbered_and_merged_in_transcript_order():
+    api = FakeChatGPT()
+    content = "\n".join(lines(30) + ["Пациент: Иванов"])
+    budget = estimate_tokens(lines(1)[0]) * 4
+
+    result = process_chunks(content, api, "Инструкции", budget, max_workers=4)
+
+    assert result["complaints"] == [line.split(": ", 1)[1] for line in lines(30)] + ["Иванов"]
+    assert result["patient"] == {"name": "Иванов"}
+    assert len(api.instructions) == 8
+    assert all(text.startswith("Инструкции\n") for text in api.instructions)
+    assert sorted(api.instructions) == sorted(f"Инструкции\nЭто часть {index} из 8 длинного разговора. "
+                                              "Извлеки данные только из этой части. Если раздел в ней "
+                                              "не упоминается, оставь его пустым.\n" for index in range(1, 9))
+
+
+def test_process_file_splits_only_long_transcripts(tmp_path):
+    path = tmp_path / "transcript.txt"
+    path.write_text("\n".join(lines(10)), encoding="utf-8")
+
+    api = FakeChatGPT()
+    short = process_file(str(path), api, None, "Инструкции", chunk_tokens=10000)
+    assert api.instructions == ["Инструкции"]
+
+    api = FakeChatGPT()
+    sections = []
+    chunked = process_file(str(path), api, None, "Инструкции", chunk_tokens=estimate_tokens(lines(1)[0]) * 3,
+                           on_section=lambda key, value: sections.append(key))
+    assert len(api.instructions) == 4
+    assert chunked["complaints"] == short["complaints"]
+    assert sections == ["patient", "complaints"]
@@ -0,0 +1,52 @@
+from services.patient_index import PatientIndex
+
+NAMES = [
+    "Иванов Иван Иванович",
+    "Иванова Мария Петровна",
+    "Петров Иван Сергеевич",
+    "Сидоров Пётр Иванович",
+    "Алексеев Артём Петрович",
+    "Фёдорова Анна Ивановна",
+]
+
+
+def test_names_starting_with_query_come_first_then_other_words_alphabetically():
+    index = PatientIndex(NAMES)
+    assert index.search("Иван") == ["Иванов Иван Иванович", "Иванова Мария Петровна",
+                                    "Петров Иван Сергеевич", "Сидоров Пётр Иванович", "Фёдорова Анна Ивановна"]
+    assert index.search("Иванов И.И.") == ["Иванов Иван Иванович"]
+
+
+def test_first_name_or_patronymic_alone():
+    index = PatientIndex(NAMES)
+    assert index.search("Артем") == ["Алексеев Артём Петрович"]
+    assert index.search("сергеевич") == ["Петров Иван Сергеевич"]
+
+
+def test_limit_stops_at_first_matches_alphabetically():
+    names = [f"Пациент{number:03d} Иван Иванович" for number in range(300)]
+    index = PatientIndex(reversed(names))
+    assert index.search("иванович", limit=5) == names[:5]
+    assert index.search("Иван Иванович", limit=3) == names[:3]
+
+
+def test_words_must_follow_name_order():
+    index = PatientIndex(NAMES)
+    assert index.search("Сергеевич Петров") == []
+    assert index.search("Петров Сергеевич") == ["Петров Иван Сергеевич"]
+
+
+def test_typo_falls_back_to_similar_words():
+    index = PatientIndex(NAMES)
+    assert index.search("Сидороф") == ["Сидоров Пётр Иванович"]
+    assert index.search("Фдорова") == ["Фёдорова Анна Ивановна"]
+
+
+def test_added_patient_is_found():
+    index = PatientIndex(NAMES)
+    assert index.add("Абрамов Иван Олегович")
+    assert not index.add("Абрамов Иван Олегович")
+    assert index.search("иван", limit=3) == ["Иванов Иван Иванович", "Иванова Мария Петровна",
+                                             "Абрамов Иван Олегович"]
+    assert index.search("олегович") == ["Абрамов Иван Олегович"]
+    assert index.search("")[0] == "Абрамов Иван Олегович"
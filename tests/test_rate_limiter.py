@@ -0,0 +1,62 @@
+import time
+import asyncio
+
+import pytest
+
+from services import rate_limiter
+from services.rate_limiter import AsyncRateLimiter
+
+
+def test_waiting_requests_are_served_in_arrival_order():
+    async def scenario():
+        limiter = AsyncRateLimiter(requests_per_minute=6000, tokens_per_minute=6000)
+        await limiter.acquire(6000)
+        served = []
+
+        async def request(name, tokens):
+            await limiter.acquire(tokens)
+            served.append(name)
+
+        # Маленький запрос не обгоняет большой, пришедший раньше
+        await asyncio.gather(request("large", 20), request("small", 1))
+        return served
+
+    assert asyncio.run(scenario()) == ["large", "small"]
+
+
+def test_buckets_refill_with_time(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(rate_limiter.time, "monotonic", lambda: now[0])
+    limiter = AsyncRateLimiter(requests_per_minute=60, tokens_per_minute=600)
+    asyncio.run(limiter.acquire(600))
+    assert limiter.stats() == {"available_requests": 59, "available_tokens": 0}
+
+    now[0] += 3
+    assert limiter.stats() == {"available_requests": 60, "available_tokens": 30}
+    now[0] += 600
+    assert limiter.stats() == {"available_requests": 60, "available_tokens": 600}
+
+
+def test_refund_wakes_waiting_request():
+    async def scenario():
+        limiter = AsyncRateLimiter(requests_per_minute=600, tokens_per_minute=60)
+        reserved = await limiter.acquire(60)
+        # Без возврата пришлось бы ждать пополнения 30 токенов - полминуты
+        waiter = asyncio.create_task(limiter.acquire(30))
+        await asyncio.sleep(0.05)
+        assert not waiter.done()
+        limiter.reconcile(reserved, 10)
+        return await asyncio.wait_for(waiter, 1)
+
+    assert asyncio.run(scenario()) == 30
+
+
+def test_pause_delays_next_acquire():
+    async def scenario():
+        limiter = AsyncRateLimiter()
+        limiter.pause(0.2)
+        started = time.monotonic()
+        await limiter.acquire(10)
+        return time.monotonic() - started
+
+    assert asyncio.run(scenario()) == pytest.approx(0.2, abs=0.1)
@@ -0,0 +1,51 @@
+import os
+from datetime import datetime
+
+import pytest
+
+docx = pytest.importorskip("docx")
+
+import report_ooxml
+
+RESULT = {
+    "doctor": {"name": "Петров П.П.", "specialization": "терапевт"},
+    "complaints": ["Головная боль <по утрам> & слабость", "Кашель"],
+    "provisional diagnosis": "ОРВИ",
+    "recommendations": ["Покой", "Обильное питье"],
+}
+
+
+def paragraphs(path):
+    return [(paragraph.style.name, paragraph.text) for paragraph in docx.Document(str(path)).paragraphs]
+
+
+def test_written_report_opens_with_headings_and_bullets(tmp_path):
+    path = tmp_path / "report.docx"
+    assert report_ooxml.write_report(str(path), "Иванов И.И.", RESULT, datetime(2024, 3, 5)) == str(path)
+
+    content = paragraphs(path)
+    assert content[0] == ("Title", "Медицинское заключение")
+    assert ("Normal", "Пациент: Иванов И.И.") in content
+    assert ("Normal", "Дата: 05.03.2024") in content
+    assert ("Normal", "Врач: Петров П.П.") in content
+    sections = [(style, text) for style, text in content if style in ("Heading 2", "List Bullet")]
+    assert sections == [
+        ("Heading 2", "Жалобы"),
+        ("List Bullet", "Головная боль <по утрам> & слабость"),
+        ("List Bullet", "Кашель"),
+        ("Heading 2", "Предварительный диагноз"),
+        ("List Bullet", "ОРВИ"),
+        ("Heading 2", "Рекомендации"),
+        ("List Bullet", "Покой"),
+        ("List Bullet", "Обильное питье"),
+    ]
+
+
+def test_rewrite_replaces_report_without_leaving_temp_files(tmp_path):
+    path = tmp_path / "report.docx"
+    report_ooxml.write_report(str(path), "Иванов И.И.", RESULT)
+    report_ooxml.write_report(str(path), "Иванов И.И.", {"complaints": ["Насморк"]})
+
+    assert os.listdir(tmp_path) == ["report.docx"]
+    assert ("List Bullet", "Насморк") in paragraphs(path)
+    assert ("List Bullet", "Кашель") not in paragraphs(path)
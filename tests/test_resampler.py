@@ -0,0 +1,86 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from services.resampler import InputConditioner, PolyphaseResampler, design_filter
+
+RATES = [(48000, 16000), (44100, 16000), (32000, 16000), (16000, 48000)]
+ODD_BLOCKS = [1, 7, 13, 101, 333, 2, 256]
+
+
+def signal(count, seed=1):
+    return np.random.default_rng(seed).uniform(-1, 1, count).astype(np.float32)
+
+
+def in_blocks(resampler, samples, sizes):
+    output = []
+    position = 0
+    for size in itertools.cycle(sizes):
+        if position >= len(samples):
+            break
+        # process() возвращает представление внутреннего буфера - копируем до следующего вызова
+        output.append(resampler.process(samples[position:position + size]).copy())
+        position += size
+    return np.concatenate(output)
+
+
+def reference(resampler, samples, count):
+    """Прямая свертка сигнала, дополненного нулями в up раз, с тем же фильтром"""
+    up, down = resampler.up, resampler.down
+    upsampled = np.zeros((resampler.taps_per_phase - 1 + len(samples)) * up)
+    upsampled[(resampler.taps_per_phase - 1) * up::up] = samples
+    h = design_filter(up, down)
+    full = np.convolve(upsampled, h)
+    return full[(resampler.taps_per_phase - 1) * up + np.arange(count) * down]
+
+
+@pytest.mark.parametrize("in_rate, out_rate", RATES)
+def test_odd_blocks_give_same_output_as_one_block(in_rate, out_rate):
+    samples = signal(5000)
+    whole = PolyphaseResampler(in_rate, out_rate, len(samples)).process(samples).copy()
+    chunked = in_blocks(PolyphaseResampler(in_rate, out_rate, 400), samples, ODD_BLOCKS)
+    assert len(chunked) == len(whole)
+    np.testing.assert_allclose(chunked, whole, atol=1e-5)
+
+
+@pytest.mark.parametrize("in_rate, out_rate", RATES)
+def test_output_length_follows_ratio_and_filter_delay(in_rate, out_rate):
+    resampler = PolyphaseResampler(in_rate, out_rate, 400)
+    samples = signal(20000)
+    output = in_blocks(resampler, samples, ODD_BLOCKS)
+    expected = len(samples) * out_rate / in_rate
+    # Недостает только хвоста, который ждет следующих отсчетов: не больше окна фильтра и одного периода
+    assert expected - (resampler.span / resampler.down + 1) * resampler.up <= len(output) <= expected + resampler.up
+
+
+@pytest.mark.parametrize("in_rate, out_rate", RATES)
+def test_matches_direct_convolution(in_rate, out_rate):
+    resampler = PolyphaseResampler(in_rate, out_rate, 400)
+    samples = signal(3000, seed=2)
+    output = in_blocks(resampler, samples, ODD_BLOCKS)
+    np.testing.assert_allclose(output, reference(resampler, samples, len(output)), atol=1e-4)
+
+
+def test_block_larger_than_max_input_is_rejected():
+    resampler = PolyphaseResampler(48000, 16000, 100)
+    with pytest.raises(ValueError):
+        resampler.process(signal(101))
+
+
+def test_conditioner_downmixes_removes_dc_and_resamples():
+    rate, frames = 48000, 3072
+    # Оценка постоянной составляющей сдвигается на DC_ADAPT за блок - нужно несколько секунд
+    total = 4 * rate
+    t = np.arange(total) / rate
+    tone = 8000 * np.sin(2 * np.pi * 1000 * t)
+    stereo = np.stack([tone + 1500, tone + 1500], axis=1).astype(np.int16)
+    conditioner = InputConditioner(rate, 2, frames)
+    output = bytearray()
+    for start in range(0, total - frames + 1, frames):
+        output += conditioner.process(stereo[start:start + frames].tobytes())
+    result = np.frombuffer(bytes(output), dtype=np.int16).astype(np.float64)
+    assert abs(len(result) - (total - total % frames) // 3) <= conditioner.resampler.span
+    settled = result[len(result) * 3 // 4:]
+    assert abs(settled.mean()) < 100
+    assert np.sqrt(np.mean(settled ** 2)) == pytest.approx(8000 / np.sqrt(2), rel=0.02)
@@ -0,0 +1,97 @@
+import os
+import json
+
+import pytest
+
+from services import response_cache
+from services.response_cache import ResponseCache, make_cache_key
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(response_cache.time, "time", lambda: now[0])
+    return now
+
+
+def entry(size):
+    return {"content": "x" * size}
+
+
+def entry_bytes(size):
+    return len(json.dumps(entry(size)).encode("utf-8"))
+
+
+def test_key_depends_on_every_input_and_is_stable():
+    key = make_cache_key("gpt-4o", 0.01, "Инструкции", "Транскрипт")
+    assert key == make_cache_key("gpt-4o", 0.01, "Инструкции", "Транскрипт")
+    assert len(key) == 64 and set(key) <= set("0123456789abcdef")
+    others = {
+        make_cache_key("gpt-4o-mini", 0.01, "Инструкции", "Транскрипт"),
+        make_cache_key("gpt-4o", 0.2, "Инструкции", "Транскрипт"),
+        make_cache_key("gpt-4o", 0.01, "Другие инструкции", "Транскрипт"),
+        make_cache_key("gpt-4o", 0.01, "Инструкции", "Другой транскрипт"),
+        # Граница между инструкциями и текстом тоже входит в ключ
+        make_cache_key("gpt-4o", 0.01, "ИнструкцииТ", "ранскрипт"),
+    }
+    assert key not in others and len(others) == 5
+
+
+def test_entries_survive_restart_and_leave_no_temp_files(tmp_path):
+    key = make_cache_key("gpt-4o", 0.01, "Инструкции", "Транскрипт")
+    ResponseCache(str(tmp_path)).put(key, {"ответ": "да"})
+    # Временный файл после сбоя записи не считается записью кэша
+    (tmp_path / key[:2] / ".tmp_broken.json").write_text("{", encoding="utf-8")
+
+    restarted = ResponseCache(str(tmp_path))
+    assert restarted.get(key) == {"ответ": "да"}
+    assert restarted.stats()["entries"] == 1
+    assert sorted(os.listdir(tmp_path / key[:2])) == [".tmp_broken.json", f"{key}.json"]
+
+
+def test_size_limit_evicts_least_recently_used(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path), max_bytes=3 * entry_bytes(100))
+    for key in ("a1", "b2", "c3"):
+        cache.put(key, entry(100))
+        clock[0] += 1
+    assert cache.get("a1") is not None
+    clock[0] += 1
+
+    cache.put("d4", entry(100))
+
+    assert cache.get("b2") is None
+    assert all(cache.get(key) is not None for key in ("a1", "c3", "d4"))
+    assert not os.path.exists(tmp_path / "b2" / "b2.json")
+    assert cache.stats() == {"hits": 4, "misses": 1, "evictions": 1, "entries": 3, "bytes": 3 * entry_bytes(100)}
+
+
+def test_entry_count_limit_evicts_oldest(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path), max_entries=2)
+    for key in ("a1", "b2", "c3"):
+        cache.put(key, entry(10))
+        clock[0] += 1
+    assert cache.get("a1") is None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_expired_entry_is_a_miss_and_is_removed(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path), max_age=100)
+    cache.put("a1", entry(10))
+    clock[0] += 50
+    assert cache.get("a1") == entry(10)
+    # Обращение продлевает жизнь записи
+    clock[0] += 80
+    assert cache.get("a1") == entry(10)
+    clock[0] += 101
+    assert cache.get("a1") is None
+    assert cache.stats() == {"hits": 2, "misses": 1, "evictions": 1, "entries": 0, "bytes": 0}
+    assert not os.path.exists(tmp_path / "a1" / "a1.json")
+
+
+def test_bypass_skips_reads_but_refreshes_entries(tmp_path):
+    bypassing = ResponseCache(str(tmp_path), bypass=True)
+    bypassing.put("a1", {"version": 2})
+    assert bypassing.get("a1") is None
+    assert bypassing.stats()["misses"] == 1
+
+    assert ResponseCache(str(tmp_path)).get("a1") == {"version": 2}
@@ -0,0 +1,52 @@
+import json
+import os
+
+import pytest
+
+from services.search_index import SearchIndex, build_query, stem
+from services.storage_service import StorageService
+
+RESULT = {"complaints": ["кашель"], "provisional diagnosis": ["острый бронхит"],
+          "patient": {"name": "Иванов И.И."}, "doctor": {"name": "Петров П.П."}}
+
+
+def test_stem_drops_longest_ending_and_keeps_short_stems():
+    assert stem("Болями") == "бол"
+    assert stem("кашель") == "кашел"
+    assert stem("ёлки") == "елк"
+    assert stem("рот") == "рот"
+
+
+def test_build_query_skips_stop_words_and_searches_stems_as_prefixes():
+    assert build_query("боли в груди") == '"бол"* "груд"*'
+    assert build_query("рот и нос") == '"рот" "нос"'
+    assert build_query("и в на") == ""
+
+
+@pytest.fixture
+def archive(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("audio_records")
+    os.makedirs("Results")
+    return tmp_path
+
+
+def test_result_saved_later_joins_row_of_its_transcript(archive):
+    storage = StorageService(SearchIndex("search_index.db"))
+    transcript_file = storage.save_transcript("Пациент жалуется на кашель", "20240101_100000")
+    storage.save_result(RESULT, "20240101_101500", transcript_file)
+
+    hits = storage.search_index.search("жалуется бронхит")
+    assert [hit["timestamp"] for hit in hits] == ["20240101_100000"]
+    assert len(storage.search_index.search("кашель")) == 1
+
+
+def test_rebuild_joins_result_to_transcript_recorded_in_json(archive):
+    with open("audio_records/transcript_20240101_100000.txt", "w", encoding="utf-8") as f:
+        f.write("Пациент жалуется на кашель")
+    with open("Results/result_20240101_101500.json", "w", encoding="utf-8") as f:
+        json.dump(dict(RESULT, transcript_file="audio_records/transcript_20240101_100000.txt"), f)
+
+    index = SearchIndex("search_index.db")
+    assert len(index) == 1
+    assert [hit["patient"] for hit in index.search("жалуется бронхит")] == ["Иванов И.И."]
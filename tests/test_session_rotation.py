@@ -0,0 +1,64 @@
+import random
+import threading
+
+import pytest
+
+from services.audio_service import AudioService, BYTES_PER_SECOND
+from tools.fake_speech_server import FakeSpeechServer
+
+WORD_SECONDS = 0.5
+AUDIO_SECONDS = 10
+
+
+class RecordedSource:
+    """Источник, сразу отдающий в буфер заранее записанный звук"""
+    def __init__(self, audio):
+        self.audio = audio
+        self.written = threading.Event()
+
+    def start(self, on_audio):
+        for start in range(0, len(self.audio), 3200):
+            on_audio(self.audio[start:start + 3200])
+        self.written.set()
+
+    def stop(self):
+        pass
+
+    def stats(self):
+        return {}
+
+
+@pytest.fixture
+def audio():
+    # Шум с фиксированным зерном: каждые полсекунды дают свое «слово»
+    generator = random.Random(7)
+    return bytes(generator.getrandbits(8) for _ in range(AUDIO_SECONDS * BYTES_PER_SECOND))
+
+
+@pytest.mark.parametrize("cumulative_words", [False, True])
+def test_rotated_sessions_deliver_each_word_once_in_order(monkeypatch, tmp_path, audio, cumulative_words):
+    # Сессия 3 с при лимите сервера 4 с: 10 с звука требуют нескольких смен сессии
+    server = FakeSpeechServer(limit=4, cumulative_words=cumulative_words).start()
+    monkeypatch.setenv("SPEECH_EMULATOR_HOST", server.address)
+    word_bytes = int(WORD_SECONDS * BYTES_PER_SECOND)
+    expected = [server.word_for(audio[start:start + word_bytes]) for start in range(0, len(audio), word_bytes)]
+
+    finals = []
+    source = RecordedSource(audio)
+    service = AudioService(on_final_result=lambda text, speaker=None: finals.append(text),
+                           source_factory=lambda: source, buffer_seconds=AUDIO_SECONDS + 2,
+                           session_seconds=3, overlap_seconds=1, vad=False)
+    recording = threading.Thread(target=service.start_recording, args=(str(tmp_path / "record.wav"),))
+    try:
+        recording.start()
+        assert source.written.wait(10)
+        service.stop_recording()
+        recording.join(30)
+    finally:
+        service.shutdown()
+        server.stop()
+
+    assert not recording.is_alive()
+    assert server.stream_count >= 4
+    assert server.limit_errors == 0
+    assert " ".join(finals).split() == expected
@@ -0,0 +1,54 @@
+import pytest
+
+from services.speech_gate import SpeechGate, StreamTimeline
+
+CHUNK = 100
+
+
+class ScriptedDetector:
+    """Заранее заданные решения детектора речи по блокам"""
+    def __init__(self, decisions):
+        self.decisions = iter(decisions)
+
+    def is_speech(self, data):
+        return next(self.decisions)
+
+
+def run_gate(decisions, bytes_per_second=1000, **kwargs):
+    gate = SpeechGate(ScriptedDetector(decisions), bytes_per_second, **kwargs)
+    return [[position for position, _ in gate.process(index * CHUNK, bytes(CHUNK))]
+            for index in range(len(decisions))]
+
+
+def test_timeline_round_trip_across_gaps():
+    timeline = StreamTimeline(1000, 100)
+    timeline.append(1000, 100)
+    timeline.append(1100, 100)
+    timeline.append(1500, 100)
+
+    assert timeline.sent_bytes == 300
+    assert timeline.to_captured(1.5) == pytest.approx(11.5)
+    assert timeline.to_captured(2.5) == pytest.approx(15.5)
+    for seconds in (0.0, 1.5, 2.5):
+        assert timeline.to_sent(timeline.to_captured(seconds)) == pytest.approx(seconds)
+    # Момент внутри пропуска приходится на начало следующего отрезка
+    assert timeline.to_sent(13.0) == pytest.approx(2.0)
+
+
+def test_timeline_before_first_chunk_uses_start_position():
+    timeline = StreamTimeline(1000, 100)
+    assert timeline.to_captured(0.5) == pytest.approx(10.5)
+    assert timeline.to_sent(10.5) == pytest.approx(0.5)
+
+
+def test_gate_sends_speech_with_padding_of_preceding_silence():
+    sent = run_gate([False] * 10 + [True, False])
+    assert sent[:10] == [[]] * 10
+    assert sent[10] == [800, 900, 1000]
+    assert sent[11] == []
+
+
+def test_gate_sends_keepalive_chunk_during_long_silence():
+    sent = run_gate([True] + [False] * 120, keepalive_seconds=5.0)
+    keepalives = [chunks for chunks in sent[1:] if chunks]
+    assert keepalives == [[5000], [10000]]
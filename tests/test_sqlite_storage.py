@@ -0,0 +1,82 @@
+import pytest
+
+from services.search_index import SearchIndex
+from services.sqlite_storage import SQLiteStorageService
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    service = SQLiteStorageService("medical_report.db", SearchIndex("search_index.db"))
+    service.add_doctor("Петров П.П.", "therapist")
+    service.flush()
+    return service
+
+
+def test_transcript_of_live_consultation_reaches_database(storage):
+    storage.save_transcript("Врач: на что жалуетесь?", "20240101_100000", "Иванов И.И.", "Петров П.П.")
+
+    assert storage.find_consultations("Иванов И.И.") == [("20240101_100000", "Петров П.П.")]
+    row = storage.connection().execute("SELECT path, content FROM transcripts").fetchone()
+    assert row == ("audio_records/transcript_20240101_100000.txt", "Врач: на что жалуетесь?")
+
+
+def test_result_joins_consultation_of_its_transcript(storage):
+    storage.save_transcript("Пациент: кашель", "20240101_100000", "Иванов И.И.", "Петров П.П.")
+    result = {"complaints": ["кашель"], "patient": {"name": "Иванов И.И."},
+              "doctor": {"name": "Петров П.П.", "specialization": "therapist"}}
+    storage.save_result(result, "20240101_100000", "audio_records/transcript_20240101_100000.txt")
+
+    assert storage.get_consultation("20240101_100000") == result
+    assert storage.connection().execute("SELECT count(*) FROM consultations").fetchone()[0] == 1
+
+
+class HeldWrites:
+    """WriteBehind, который ничего не пишет до явного flush()"""
+    def __init__(self):
+        self.writes = []
+
+    def submit(self, key, write):
+        self.writes.append(write)
+
+    def flush(self):
+        writes, self.writes = self.writes, []
+        for write in writes:
+            write()
+
+
+@pytest.fixture
+def held(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    writes = HeldWrites()
+    service = SQLiteStorageService("medical_report.db", SearchIndex("search_index.db"), writes)
+    writes.flush()
+    return service, writes
+
+
+def test_pending_changes_are_read_without_flush(held):
+    storage, writes = held
+    storage.add_doctor("Петров П.П.", "therapist")
+    storage.add_doctor("Петров П.П.", "cardiologist")
+    assert storage.add_patient("Иванов И.И.")
+    assert not storage.add_patient("Иванов И.И.")
+
+    assert writes.writes
+    assert storage.load_doctors()["Петров П.П."] == "cardiologist"
+    assert storage.load_patient_history() == ["Иванов И.И."]
+    assert storage.connection().execute("SELECT count(*) FROM patients").fetchone()[0] == 0
+
+    writes.flush()
+    assert storage.load_doctors()["Петров П.П."] == "cardiologist"
+    assert storage.load_patient_history() == ["Иванов И.И."]
+    assert not storage._pending_doctors and not storage._pending_patients
+
+
+def test_consultation_links_doctor_not_yet_written(held):
+    storage, writes = held
+    storage.add_doctor("Сидоров С.С.", "neurologist")
+    storage.save_transcript("Врач: здравствуйте", "20240101_100000", "Иванов И.И.", "Сидоров С.С.")
+    assert storage.find_consultations("Иванов И.И.") == [("20240101_100000", "Сидоров С.С.")]
+
+    writes.flush()
+    assert storage.load_doctors()["Сидоров С.С."] == "neurologist"
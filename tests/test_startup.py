@@ -0,0 +1,27 @@
+import os
+import sys
+import json
+import subprocess
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Создание окна с подмененным Tk в отдельном процессе: в процессе тестов эти модули уже могут быть загружены
+CONSTRUCT_APP = """
+import sys, json
+from unittest import mock
+sys.path.insert(0, {base!r})
+import main
+with mock.patch.multiple(main, tk=mock.DEFAULT, ttk=mock.DEFAULT, messagebox=mock.DEFAULT,
+                         CollapsibleFrame=mock.DEFAULT, TranscriptUpdater=mock.DEFAULT):
+    main.AudioRecorderApp(mock.MagicMock())
+print(json.dumps(sorted(name for name in {deferred!r} if name in sys.modules)))
+"""
+
+
+def test_window_construction_does_not_load_deferred_modules(tmp_path):
+    deferred = ["chatgpt", "requests", "openai", "docx", "services.http_transport", "services.response_cache",
+                "json_stream", "report_generator", "process_utils", "numpy"]
+    completed = subprocess.run([sys.executable, "-c", CONSTRUCT_APP.format(base=BASE_DIR, deferred=deferred)],
+                               cwd=tmp_path, capture_output=True, text=True, timeout=60)
+    assert completed.returncode == 0, completed.stderr
+    assert json.loads(completed.stdout.strip().splitlines()[-1]) == []
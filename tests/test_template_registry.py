@@ -0,0 +1,89 @@
+import os
+import json
+
+import pytest
+
+from templates.registry import TemplateRegistry, get_registry
+
+SECTIONS = [
+    {"key": "patient", "example": {"name": "Имя пациента"}},
+    {"key": "complaints", "title": "Жалобы", "example": ["Описание жалоб"]},
+]
+
+
+def write_spec(tmp_path, **overrides):
+    data = {
+        "prefix": "Извлеки данные из разговора.",
+        "sections": SECTIONS,
+        "specializations": [
+            {"code": "general_physician", "name": "Терапевт", "instructions": "Инструкции терапевта."},
+            {"code": "cardiologist", "name": "Кардиолог", "instructions": "Инструкции кардиолога.",
+             "extra_sections": [{"key": "ecg", "title": "ЭКГ", "example": ["Описание ЭКГ"]}]},
+        ],
+    }
+    data.update(overrides)
+    # None - поля в описании нет
+    data = {field: value for field, value in data.items() if value is not None}
+    path = tmp_path / "specializations.json"
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+    return str(path)
+
+
+def test_prompts_share_byte_identical_prefix():
+    registry = get_registry()
+    assert registry.templates
+    for template in registry.templates.values():
+        assert template.prompt.startswith(registry.shared_prefix)
+        assert template.instructions in template.prompt[len(registry.shared_prefix):]
+        assert template.token_count > 0
+    assert registry.token_counts().keys() == registry.templates.keys()
+
+
+def test_specializations_and_section_titles_follow_file_order(tmp_path):
+    registry = TemplateRegistry(write_spec(tmp_path))
+    assert registry.specializations() == {"Терапевт": "general_physician", "Кардиолог": "cardiologist"}
+    assert registry.section_titles() == [("complaints", "Жалобы"), ("ecg", "ЭКГ")]
+    assert registry.get("general_physician").section_keys == ["patient", "complaints"]
+    assert registry.get("cardiologist").section_keys == ["patient", "complaints", "ecg"]
+    # Дополнительные разделы - только после общего префикса
+    assert "Описание ЭКГ" not in registry.shared_prefix
+    assert "Описание ЭКГ" in registry.get("cardiologist").prompt
+
+
+def test_unknown_specialization_is_an_error(tmp_path):
+    registry = TemplateRegistry(write_spec(tmp_path))
+    with pytest.raises(ValueError):
+        registry.get("dentist")
+
+
+@pytest.mark.parametrize("overrides", [
+    {"prefix": None},
+    {"sections": SECTIONS + [{"key": "complaints", "example": []}]},
+    {"sections": [{"key": "complaints"}]},
+    {"specializations": [{"code": "surgeon", "name": "Хирург", "instructions": ""}]},
+    {"specializations": [{"code": "surgeon", "name": "Хирург", "instructions": "А"},
+                         {"code": "surgeon", "name": "Хирург 2", "instructions": "Б"}]},
+    {"specializations": [{"code": "surgeon", "name": "Хирург", "instructions": "А",
+                          "extra_sections": [{"key": "complaints", "example": []}]}]},
+])
+def test_invalid_description_is_rejected(tmp_path, overrides):
+    with pytest.raises(ValueError):
+        TemplateRegistry(write_spec(tmp_path, **overrides))
+
+
+def test_report_builder_adds_each_registry_section_once(tmp_path):
+    docx = pytest.importorskip("docx")
+    from report_generator import ReportBuilder, REPORT_SECTIONS
+
+    key, title = REPORT_SECTIONS[0]
+    builder = ReportBuilder("Иванов И.И.")
+    builder.add_section(key, ["Первый пункт"])
+    builder.add_section(key, ["Повтор"])
+    builder.add_section("unknown", ["Не из реестра"])
+    path = builder.save(path=str(tmp_path / "report.docx"))
+
+    assert os.listdir(tmp_path) == ["report.docx"]
+    text = "\n".join(paragraph.text for paragraph in docx.Document(path).paragraphs)
+    assert text.count(f"{title}:") == 1
+    assert "- Первый пункт" in text
+    assert "Повтор" not in text and "Не из реестра" not in text
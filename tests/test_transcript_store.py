@@ -0,0 +1,74 @@
+import os
+import json
+
+from services.transcript_store import TranscriptStore, load_segments, recover_sessions, render_transcript
+
+SEGMENTS = [
+    {"speaker": 1, "text": "На что жалуетесь?", "start": 0.0, "end": 1.2, "confidence": 0.9},
+    {"speaker": 2, "text": "Болит голова", "start": 1.5, "end": 2.4, "confidence": 0.8},
+    {"speaker": None, "text": "(неразборчиво)", "start": 3.0, "end": 3.5, "confidence": 0.4},
+]
+
+
+def test_segments_are_on_disk_before_close(tmp_path):
+    path = tmp_path / "audio_records" / "transcript_20240101_100000.jsonl"
+    store = TranscriptStore(str(path), fsync_interval=0)
+    for segment in SEGMENTS[:2]:
+        store.append(segment)
+
+    assert load_segments(str(path)) == SEGMENTS[:2]
+    store.append(SEGMENTS[2])
+    store.close()
+    store.append({"speaker": 1, "text": "после закрытия"})
+    assert load_segments(str(path)) == SEGMENTS
+    assert store.render() == "Врач: На что жалуетесь?\nПациент: Болит голова\n(неразборчиво)"
+
+
+def test_reopened_store_appends_to_existing_journal(tmp_path):
+    path = str(tmp_path / "transcript.jsonl")
+    first = TranscriptStore(path)
+    first.append(SEGMENTS[0])
+    first.close()
+    second = TranscriptStore(path)
+    second.append(SEGMENTS[1])
+    second.close()
+    assert load_segments(path) == SEGMENTS[:2]
+
+
+def test_truncated_last_line_is_skipped(tmp_path):
+    path = tmp_path / "transcript.jsonl"
+    lines = [json.dumps(segment, ensure_ascii=False) for segment in SEGMENTS[:2]]
+    path.write_text("\n".join(lines) + "\n\n" + lines[0][:15], encoding="utf-8")
+    assert load_segments(str(path)) == SEGMENTS[:2]
+
+
+def test_write_text_skips_empty_transcript(tmp_path):
+    store = TranscriptStore(str(tmp_path / "transcript.jsonl"))
+    assert store.write_text(str(tmp_path / "transcript.txt")) is None
+    store.append(SEGMENTS[1])
+    assert store.write_text(str(tmp_path / "transcript.txt")) == str(tmp_path / "transcript.txt")
+    store.close()
+    assert (tmp_path / "transcript.txt").read_text(encoding="utf-8") == "Пациент: Болит голова"
+    assert sorted(os.listdir(tmp_path)) == ["transcript.jsonl", "transcript.txt"]
+
+
+def test_recover_sessions_restores_only_interrupted_ones(tmp_path):
+    directory = tmp_path / "audio_records"
+    directory.mkdir()
+
+    def journal(name, segments):
+        (directory / f"{name}.jsonl").write_text(
+            "".join(json.dumps(segment, ensure_ascii=False) + "\n" for segment in segments), encoding="utf-8")
+
+    journal("transcript_20240101_100000", SEGMENTS)
+    journal("transcript_20240101_110000", SEGMENTS[:1])
+    (directory / "transcript_20240101_110000.txt").write_text("уже сохранен", encoding="utf-8")
+    journal("transcript_20240101_120000", [])
+
+    recovered = recover_sessions(str(directory))
+
+    assert recovered == [str(directory / "transcript_20240101_100000.txt")]
+    assert (directory / "transcript_20240101_100000.txt").read_text(encoding="utf-8") == render_transcript(SEGMENTS)
+    assert (directory / "transcript_20240101_110000.txt").read_text(encoding="utf-8") == "уже сохранен"
+    assert not (directory / "transcript_20240101_120000.txt").exists()
+    assert recover_sessions(str(directory)) == []
@@ -0,0 +1,60 @@
+import threading
+
+import pytest
+
+from services.write_behind import WriteBehind
+
+
+@pytest.fixture
+def slow_writer():
+    # Фоновый поток не успеет записать сам: все происходит в flush()
+    writer = WriteBehind(delay=60, max_delay=60)
+    yield writer
+    writer.close()
+
+
+def test_writes_with_same_key_coalesce_to_last(slow_writer):
+    written = []
+    for version in range(5):
+        slow_writer.submit("settings", lambda version=version: written.append(("settings", version)))
+    slow_writer.submit("patients", lambda: written.append(("patients", 0)))
+    assert written == []
+
+    slow_writer.flush()
+    assert written == [("settings", 4), ("patients", 0)]
+    slow_writer.flush()
+    assert len(written) == 2
+
+
+def test_unkeyed_writes_are_all_kept_in_order(slow_writer):
+    written = []
+    for number in range(3):
+        slow_writer.submit(None, lambda number=number: written.append(number))
+    slow_writer.flush()
+    assert written == [0, 1, 2]
+
+
+def test_failed_write_does_not_block_others(slow_writer):
+    written = []
+    slow_writer.submit("broken", lambda: 1 / 0)
+    slow_writer.submit("ok", lambda: written.append("ok"))
+    slow_writer.flush()
+    assert written == ["ok"]
+
+
+def test_background_thread_writes_after_delay():
+    writer = WriteBehind(delay=0.01, max_delay=0.05)
+    done = threading.Event()
+    writer.submit("file", done.set)
+    assert done.wait(2)
+    writer.close()
+
+
+def test_close_flushes_and_rejects_new_writes():
+    writer = WriteBehind(delay=60, max_delay=60)
+    written = []
+    writer.submit("file", lambda: written.append(1))
+    writer.close()
+    assert written == [1]
+    with pytest.raises(RuntimeError):
+        writer.submit("file", lambda: None)
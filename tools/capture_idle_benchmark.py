@@ -0,0 +1,136 @@
+"""
+Цена постоянного захвата в режиме ожидания: процессор и память между приемами.
+
+Сравниваются три состояния за одинаковое время:
+    closed     - устройство закрыто (как без постоянного захвата);
+    open       - устройство открыто, блоки отбрасываются (чистая стоимость потока захвата);
+    persistent - CaptureEngine: каждый блок пишется в буфер pre-roll.
+Затем измеряется attach(): сколько байт pre-roll попадает в запись и сколько занимает переключение.
+
+По умолчанию используется синтетический источник, отдающий тишину блоками в темпе реального
+времени, поэтому замер не требует микрофона; --microphone - то же на настоящем устройстве.
+
+Пример:
+    python -m tools.capture_idle_benchmark --seconds 10 --preroll 3
+    python -m tools.capture_idle_benchmark --microphone
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.audio_buffer import RingBuffer
+from services.capture_engine import CaptureEngine
+
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2
+
+
+class SyntheticSource:
+    """Источник с интерфейсом MicrophoneSource: тишина блоками frames_per_buffer в реальном времени"""
+    reusable = True
+
+    def __init__(self, rate=SAMPLE_RATE, frames_per_buffer=1024):
+        self.rate = rate
+        self.frames_per_buffer = frames_per_buffer
+        self.captured_bytes = 0
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self, on_audio):
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, args=(on_audio,), name="synthetic-source", daemon=True)
+        self._thread.start()
+
+    def _run(self, on_audio):
+        block = bytes(self.frames_per_buffer * SAMPLE_WIDTH)
+        interval = self.frames_per_buffer / self.rate
+        due = time.monotonic()
+        while not self._stopped.is_set():
+            due += interval
+            delay = due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self.captured_bytes += len(block)
+            on_audio(block)
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def close(self):
+        self.stop()
+
+    def stats(self):
+        return {"captured_bytes": self.captured_bytes, "device_overflows": 0}
+
+
+def measure(seconds, start=None, stop=None):
+    """Процессорное время процесса и прирост памяти Python за seconds секунд ожидания"""
+    tracemalloc.start()
+    memory_before = tracemalloc.get_traced_memory()[0]
+    cpu_started, wall_started = time.process_time(), time.monotonic()
+    if start:
+        start()
+    time.sleep(seconds)
+    cpu = time.process_time() - cpu_started
+    wall = time.monotonic() - wall_started
+    memory_after, memory_peak = tracemalloc.get_traced_memory()
+    if stop:
+        stop()
+    tracemalloc.stop()
+    return {
+        "cpu_percent": round(cpu * 100 / wall, 3),
+        "memory_kb": round((memory_after - memory_before) / 1024, 1),
+        "memory_peak_kb": round((memory_peak - memory_before) / 1024, 1),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Стоимость постоянного захвата в режиме ожидания")
+    parser.add_argument("--seconds", type=float, default=10, help="Длительность каждого замера")
+    parser.add_argument("--preroll", type=float, default=3, help="Длина pre-roll, с")
+    parser.add_argument("--microphone", action="store_true", help="Настоящий микрофон вместо синтетического источника")
+    args = parser.parse_args(argv)
+
+    if args.microphone:
+        from services.audio_capture import MicrophoneSource
+        source = MicrophoneSource(rate=SAMPLE_RATE)
+        source.prewarm()
+    else:
+        source = SyntheticSource()
+
+    report = {"source": type(source).__name__, "seconds": args.seconds, "preroll_seconds": args.preroll}
+    report["closed"] = measure(args.seconds)
+    report["open"] = measure(args.seconds, lambda: source.start(lambda data: None), source.stop)
+
+    engine = CaptureEngine(source, args.preroll, SAMPLE_RATE * SAMPLE_WIDTH, SAMPLE_WIDTH)
+    report["persistent"] = measure(args.seconds, engine.start)
+    report["persistent"]["preroll_buffer_kb"] = engine.preroll.capacity // 1024
+
+    buffer = RingBuffer(SAMPLE_RATE * SAMPLE_WIDTH * 30, frame_bytes=SAMPLE_WIDTH)
+    started = time.perf_counter()
+    preroll_bytes = engine.attach(buffer)
+    report["attach"] = {
+        "attach_ms": round((time.perf_counter() - started) * 1000, 3),
+        "preroll_bytes": preroll_bytes,
+        "preroll_audio_s": round(preroll_bytes / (SAMPLE_RATE * SAMPLE_WIDTH), 2),
+    }
+    time.sleep(0.5)
+    engine.detach()
+    report["attach"]["recorded_bytes"] = buffer.write_position
+    engine.close()
+
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
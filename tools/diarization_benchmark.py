@@ -0,0 +1,125 @@
+"""
+Микробенчмарк разбора диаризации на синтетическом потоке слов.
+
+Сравнивает прежний разбор (каждый финальный результат заново склеивается строками
+по всему накопленному списку слов) с DiarizationTracker, который обрабатывает только новые слова.
+
+Пример:
+    python -m tools.diarization_benchmark --minutes 60 --words-per-result 12
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+from datetime import timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.diarization import DiarizationTracker
+
+
+class Word:
+    __slots__ = ("word", "start_time", "end_time", "speaker_tag")
+
+    def __init__(self, word, start, end, speaker_tag):
+        self.word = word
+        self.start_time = timedelta(seconds=start)
+        self.end_time = timedelta(seconds=end)
+        self.speaker_tag = speaker_tag
+
+
+def synthetic_results(minutes, words_per_minute=150, words_per_result=12, seed=1):
+    """Накопительные финальные результаты, как их возвращает Google при диаризации"""
+    rng = random.Random(seed)
+    total = int(minutes * words_per_minute)
+    step = 60.0 / words_per_minute
+    words = []
+    speaker = 1
+    for index in range(total):
+        if rng.random() < 0.08:
+            speaker = 2 if speaker == 1 else 1
+        words.append(Word(f"слово{index}", index * step, index * step + step * 0.8, speaker))
+    return [words[:end] for end in range(words_per_result, total + words_per_result, words_per_result)]
+
+
+def legacy_turns(words_info):
+    """Прежний алгоритм: проход по всем словам результата со склейкой строк"""
+    turns = []
+    current_speaker = None
+    speaker_text = ""
+    for word_info in words_info:
+        if current_speaker != word_info.speaker_tag:
+            if current_speaker is not None:
+                turns.append(speaker_text.strip())
+            current_speaker = word_info.speaker_tag
+            speaker_text = word_info.word
+        else:
+            speaker_text += " " + word_info.word
+    if speaker_text:
+        turns.append(speaker_text.strip())
+    return turns
+
+
+def run_legacy(results):
+    emitted_words = 0
+    for words in results:
+        for text in legacy_turns(words):
+            emitted_words += text.count(" ") + 1
+    return emitted_words
+
+
+def run_tracker(results):
+    tracker = DiarizationTracker()
+    emitted_words = 0
+    for words in results:
+        for turn in tracker.new_turns(words):
+            emitted_words += turn.text.count(" ") + 1
+    return emitted_words
+
+
+def measure(function, results):
+    started = time.perf_counter()
+    emitted = function(results)
+    return round(time.perf_counter() - started, 4), emitted
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Микробенчмарк разбора диаризации")
+    parser.add_argument("--minutes", type=float, nargs="+", default=[5, 15, 30, 60],
+                        help="Длительность синтетических приемов, мин")
+    parser.add_argument("--words-per-result", type=int, default=12, help="Слов в одном финальном результате")
+    parser.add_argument("--skip-legacy-over", type=float, default=60,
+                        help="Не замерять прежний алгоритм на приемах длиннее, мин")
+    args = parser.parse_args(argv)
+
+    rows = []
+    for minutes in args.minutes:
+        results = synthetic_results(minutes, words_per_result=args.words_per_result)
+        total_words = len(results[-1])
+        tracker_s, tracker_words = measure(run_tracker, results)
+        row = {
+            "minutes": minutes,
+            "results": len(results),
+            "words": total_words,
+            "tracker_s": tracker_s,
+            "tracker_emitted_words": tracker_words,
+        }
+        if minutes <= args.skip_legacy_over:
+            legacy_s, legacy_words = measure(run_legacy, results)
+            row.update({
+                "legacy_s": legacy_s,
+                "legacy_emitted_words": legacy_words,
+                "speedup": round(legacy_s / tracker_s, 1) if tracker_s else None,
+            })
+        rows.append(row)
+        print(json.dumps(row, ensure_ascii=False))
+        if tracker_words != total_words:
+            print(f"Ошибка: трекер выдал {tracker_words} слов из {total_words}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+"""
+Локальный сервер, имитирующий потоковое распознавание Google Speech API (v1p1beta1).
+
+Запуск:
+    python -m tools.fake_speech_server --port 8090 --limit 10
+
+После запуска укажите SPEECH_EMULATOR_HOST=127.0.0.1:8090
+
+Вместо настоящего распознавания сервер превращает каждые word_seconds аудио в «слово»,
+зависящее только от содержимого звука. Поэтому одинаковый фрагмент, повторно отправленный
+новой сессией, распознается одинаково, и можно проверять удаление повторов на стыке сессий.
+Поток длиннее limit секунд аудио прерывается ошибкой OUT_OF_RANGE, как у Google.
+"""
+import time
+import zlib
+import logging
+import argparse
+import threading
+from concurrent import futures
+
+import grpc
+from google.cloud import speech_v1p1beta1
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = "google.cloud.speech.v1p1beta1.Speech"
+
+
+def _duration(seconds):
+    return {"seconds": int(seconds), "nanos": int(round((seconds % 1) * 1e9))}
+
+
+class FakeSpeechServer:
+    """
+    gRPC-сервер с методом StreamingRecognize.
+
+    Промежуточный результат отправляется после каждых interim_seconds аудио, финальный -
+    после каждых final_seconds и при закрытии потока клиентом. Спикер чередуется между
+    финальными результатами. При cumulative_words финальный результат, как у Google
+    с диаризацией, содержит все слова с начала сессии.
+    """
+    def __init__(self, host="127.0.0.1", port=0, limit=305.0, latency=0.0, word_seconds=0.5,
+                 interim_seconds=0.3, final_seconds=2.0, cumulative_words=False, max_workers=8):
+        self.limit = limit
+        self.latency = latency
+        self.word_seconds = word_seconds
+        self.interim_seconds = interim_seconds
+        self.final_seconds = final_seconds
+        self.cumulative_words = cumulative_words
+        self.stream_count = 0
+        self.limit_errors = 0
+        self._lock = threading.Lock()
+        self.server = grpc.server(futures.ThreadPoolExecutor(max_workers=max_workers))
+        handler = grpc.method_handlers_generic_handler(SERVICE_NAME, {
+            "StreamingRecognize": grpc.stream_stream_rpc_method_handler(
+                self._streaming_recognize,
+                request_deserializer=speech_v1p1beta1.StreamingRecognizeRequest.deserialize,
+                response_serializer=speech_v1p1beta1.StreamingRecognizeResponse.serialize,
+            )
+        })
+        self.server.add_generic_rpc_handlers((handler,))
+        self.port = self.server.add_insecure_port(f"{host}:{port}")
+        self.host = host
+
+    @property
+    def address(self):
+        """Значение для SPEECH_EMULATOR_HOST"""
+        return f"{self.host}:{self.port}"
+
+    def start(self):
+        self.server.start()
+        return self
+
+    def stop(self, grace=None):
+        self.server.stop(grace)
+
+    def word_for(self, chunk):
+        """Детерминированное «слово» для фрагмента аудио"""
+        return f"слово{zlib.crc32(chunk) % 10000}"
+
+    def _streaming_recognize(self, request_iterator, context):
+        with self._lock:
+            self.stream_count += 1
+            number = self.stream_count
+
+        sample_rate = 16000
+        bytes_per_second = sample_rate * 2
+        audio = bytearray()
+        words = []          # (слово, начало, конец, спикер) с начала сессии
+        final_from = 0      # индекс первого слова текущего (еще не финального) результата
+        speaker = 1
+        last_interim = 0.0
+        last_final = 0.0
+
+        for request in request_iterator:
+            if "streaming_config" in request:
+                config = request.streaming_config.config
+                sample_rate = config.sample_rate_hertz or sample_rate
+                bytes_per_second = sample_rate * 2
+                continue
+
+            audio.extend(request.audio_content)
+            seconds = len(audio) / bytes_per_second
+            if seconds > self.limit:
+                with self._lock:
+                    self.limit_errors += 1
+                context.abort(grpc.StatusCode.OUT_OF_RANGE,
+                              f"Exceeded maximum allowed stream duration of {self.limit:g} seconds.")
+
+            word_bytes = int(self.word_seconds * bytes_per_second)
+            while (len(words) + 1) * word_bytes <= len(audio):
+                start = len(words) * word_bytes
+                chunk = bytes(audio[start:start + word_bytes])
+                words.append((self.word_for(chunk), start / bytes_per_second,
+                              (start + word_bytes) / bytes_per_second, speaker))
+
+            if seconds - last_final >= self.final_seconds and len(words) > final_from:
+                yield self._response(words, final_from, True, seconds)
+                final_from = len(words)
+                speaker = 2 if speaker == 1 else 1
+                last_final = last_interim = seconds
+            elif seconds - last_interim >= self.interim_seconds and len(words) > final_from:
+                yield self._response(words, final_from, False, seconds)
+                last_interim = seconds
+
+        # Клиент закрыл поток запросов: отдаем остаток как финальный результат
+        if len(words) > final_from:
+            yield self._response(words, final_from, True, len(audio) / bytes_per_second)
+        logger.info(f"Поток {number} завершен: {len(audio) / bytes_per_second:.1f} с аудио, {len(words)} слов")
+
+    def _response(self, words, final_from, is_final, seconds):
+        if self.latency:
+            time.sleep(self.latency)
+        current = words[final_from:]
+        alternative = {"transcript": " ".join(word[0] for word in current), "confidence": 0.9}
+        if is_final:
+            listed = words if self.cumulative_words else current
+            alternative["words"] = [
+                {"word": word, "start_time": _duration(start), "end_time": _duration(end), "speaker_tag": tag}
+                for word, start, end, tag in listed
+            ]
+        return speech_v1p1beta1.StreamingRecognizeResponse(results=[{
+            "alternatives": [alternative],
+            "is_final": is_final,
+            "stability": 0.0 if is_final else 0.8,
+            "result_end_time": _duration(seconds),
+        }])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Имитация потокового Google Speech API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--limit", type=float, default=305.0, help="Максимальная длительность потока, с аудио")
+    parser.add_argument("--latency", type=float, default=0.0, help="Задержка каждого ответа, с")
+    parser.add_argument("--final-seconds", type=float, default=2.0, help="Период финальных результатов, с аудио")
+    parser.add_argument("--cumulative-words", action="store_true",
+                        help="Возвращать в финальных результатах все слова с начала сессии")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    server = FakeSpeechServer(args.host, args.port, limit=args.limit, latency=args.latency,
+                              final_seconds=args.final_seconds, cumulative_words=args.cumulative_words)
+    server.start()
+    logger.info(f"Имитация Speech API запущена: {server.address}")
+    try:
+        server.server.wait_for_termination()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
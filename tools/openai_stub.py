@@ -0,0 +1,184 @@
+"""
+Локальная заглушка OpenAI-совместимого API для проверки транспорта и нагрузочных прогонов.
+
+Запуск:
+    python -m tools.openai_stub --port 8089 --latency 0.5 --fail-first 2 --fail-status 429
+
+После запуска укажите OPENAI_BASE_URL=http://127.0.0.1:8089/v1
+"""
+import json
+import time
+import argparse
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONTENT = {
+    "patient": {"name": "", "age": ""},
+    "complaints": ["Головная боль"],
+    "provisional diagnosis": ["Мигрень"],
+    "recommendations": ["Контроль давления"]
+}
+
+
+class OpenAIStubServer:
+    """
+    Минимальный сервер /v1/chat/completions с настраиваемой задержкой и ошибками.
+    Первые fail_first запросов завершаются кодом fail_status (с заголовком Retry-After).
+    """
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, fail_first=0, fail_status=429,
+                 retry_after=None, content=None, chunk_delay=0.0):
+        self.latency = latency
+        self.chunk_delay = chunk_delay
+        self.fail_first = fail_first
+        self.fail_status = fail_status
+        self.retry_after = retry_after
+        self.content = content if content is not None else DEFAULT_CONTENT
+        self.request_count = 0
+        self.connection_count = 0
+        self._lock = threading.Lock()
+        self._thread = None
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                with server._lock:
+                    server.connection_count += 1
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+            def do_HEAD(self):
+                # Прогрев соединения (HttpTransport.warm_up): ответ без тела, соединение остается открытым
+                self.send_response(200)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                with server._lock:
+                    server.request_count += 1
+                    number = server.request_count
+
+                if server.latency:
+                    time.sleep(server.latency)
+
+                if number <= server.fail_first:
+                    self._send_json(server.fail_status, {"error": {"message": "stub failure"}},
+                                    retry_after=server.retry_after)
+                    return
+
+                if body.get("stream"):
+                    self._send_stream(body)
+                else:
+                    self._send_json(200, server.build_completion(body))
+
+            def _send_stream(self, body):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for event in server.build_stream_events(body):
+                    data = f"data: {event}\n\n".encode("utf-8")
+                    self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                    self.wfile.flush()
+                    if server.chunk_delay:
+                        time.sleep(server.chunk_delay)
+                self.wfile.write(b"0\r\n\r\n")
+
+            def _send_json(self, status, data, retry_after=None):
+                payload = json.dumps(data, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                if retry_after is not None:
+                    self.send_header("Retry-After", str(retry_after))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        return Handler
+
+    def build_completion(self, request_body):
+        """Формирует ответ в формате chat.completion"""
+        content = json.dumps(self.content, ensure_ascii=False)
+        return {
+            "id": f"chatcmpl-stub-{self.request_count}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request_body.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+        }
+
+    def build_stream_events(self, request_body, piece_size=16):
+        """Формирует события chat.completion.chunk для режима stream=True"""
+        content = json.dumps(self.content, ensure_ascii=False)
+        model = request_body.get("model", "stub")
+        for start in range(0, len(content), piece_size):
+            yield json.dumps({
+                "object": "chat.completion.chunk",
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": content[start:start + piece_size]},
+                             "finish_reason": None}]
+            }, ensure_ascii=False)
+        yield json.dumps({
+            "object": "chat.completion.chunk",
+            "model": model,
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]
+        })
+        yield "[DONE]"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Заглушка OpenAI-совместимого API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.0, help="Задержка ответа, с")
+    parser.add_argument("--fail-first", type=int, default=0, help="Сколько первых запросов завершить ошибкой")
+    parser.add_argument("--fail-status", type=int, default=429)
+    parser.add_argument("--retry-after", type=float, default=None)
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="Пауза между фрагментами в режиме stream, с")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    server = OpenAIStubServer(args.host, args.port, args.latency, args.fail_first,
+                              args.fail_status, args.retry_after, chunk_delay=args.chunk_delay)
+    logger.info(f"Заглушка OpenAI запущена: {server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Микробенчмарк подсказок ФИО пациентов на синтетической картотеке.
+
+Измеряет время построения PatientIndex, задержку search() на каждое нажатие клавиши
+при посимвольном вводе ФИО (в том числе «Фамилия И.О.» и с опечаткой), при вводе только
+имени или отчества (частые слова, под которые подходит большая часть картотеки) и время add().
+
+Пример:
+    python -m tools.patient_index_benchmark --patients 50000 --limit 20
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.patient_index import PatientIndex
+
+SYLLABLES = ["ба", "во", "ги", "да", "ел", "жу", "за", "ки", "ло", "ма", "не", "ор", "пу", "ра", "си",
+             "то", "фе", "ха", "це", "ча", "ше", "ще", "ю", "ря", "лё", "ми", "ко", "ан", "ст", "гр"]
+ENDINGS = ["ов", "ев", "ин", "ский", "енко", "ук", "ян", "швили", "ёв", "ых"]
+FIRST_NAMES = ["Иван", "Пётр", "Алексей", "Сергей", "Мария", "Анна", "Елена", "Ольга", "Дмитрий", "Наталья",
+               "Артём", "Юлия", "Михаил", "Татьяна", "Андрей", "Светлана", "Никита", "Ирина", "Фёдор", "Алёна"]
+PATRONYMICS = ["Иванович", "Петрович", "Сергеевич", "Алексеевна", "Дмитриевна", "Михайлович", "Андреевна",
+               "Фёдорович", "Николаевна", "Артёмович"]
+
+
+def synthetic_names(count, seed=1):
+    rng = random.Random(seed)
+    names = {}
+    while len(names) < count:
+        surname = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 3))) + rng.choice(ENDINGS)
+        names[f"{surname.capitalize()} {rng.choice(FIRST_NAMES)} {rng.choice(PATRONYMICS)}"] = None
+    return list(names)
+
+
+def typed_queries(name, rng):
+    """Все промежуточные строки при посимвольном вводе в одном из вариантов написания"""
+    surname, first, patronymic = name.split()
+    variant = rng.choice([
+        name,
+        f"{surname} {first[0]}.{patronymic[0]}.",
+        name.lower().replace("ё", "е"),
+        surname[:2] + surname[3:] + f" {first}",  # пропущенная буква
+    ])
+    return [variant[:end] for end in range(1, len(variant) + 1)]
+
+
+def word_queries():
+    """Посимвольный ввод имен и отчеств без фамилии"""
+    return [word[:end] for word in FIRST_NAMES + PATRONYMICS for end in range(1, len(word) + 1)]
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def summary(latencies):
+    return {
+        "mean": round(sum(latencies) / len(latencies), 3),
+        "p50": round(percentile(latencies, 0.5), 3),
+        "p95": round(percentile(latencies, 0.95), 3),
+        "max": round(max(latencies), 3),
+    }
+
+
+def measure(index, query, limit):
+    started = time.perf_counter()
+    suggestions = index.search(query, limit)
+    return (time.perf_counter() - started) * 1000, suggestions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Микробенчмарк подсказок ФИО пациентов")
+    parser.add_argument("--patients", type=int, default=50000, help="Размер картотеки")
+    parser.add_argument("--typed", type=int, default=200, help="Сколько ФИО набрать посимвольно")
+    parser.add_argument("--limit", type=int, default=20, help="Число подсказок")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(2)
+    names = synthetic_names(args.patients)
+
+    started = time.perf_counter()
+    index = PatientIndex(names)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    latencies = []
+    found = 0
+    for name in rng.sample(names, min(args.typed, len(names))):
+        for query in typed_queries(name, rng):
+            latency, suggestions = measure(index, query, args.limit)
+            latencies.append(latency)
+        found += name in suggestions
+
+    word_latencies = {}
+    for query in word_queries():
+        word_latencies[query] = measure(index, query, args.limit)[0]
+    slowest_word = max(word_latencies, key=word_latencies.get)
+
+    added = synthetic_names(args.patients + 1000, seed=3)[:1000]
+    started = time.perf_counter()
+    for name in added:
+        index.add(name)
+    add_ms = (time.perf_counter() - started) * 1000 / len(added)
+
+    print(json.dumps({
+        "patients": args.patients,
+        "build_ms": round(build_ms, 1),
+        "keystrokes": len(latencies),
+        "search_ms": summary(latencies),
+        "found_after_full_input": f"{found}/{min(args.typed, len(names))}",
+        "word_queries": len(word_latencies),
+        "word_search_ms": summary(list(word_latencies.values())),
+        "slowest_word_query": slowest_word,
+        "add_ms": round(add_ms, 3),
+    }, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
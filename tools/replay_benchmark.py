@@ -0,0 +1,312 @@
+"""
+Сквозной замер задержек конвейера на записанных WAV-файлах без микрофона и облачных сервисов.
+
+Аудио подается в AudioService с реальной или ускоренной скоростью, распознавание выполняет
+tools.fake_speech_server, ChatGPT заменяет tools.openai_stub. После окончания файла запись
+останавливается, транскрипт сохраняется и обрабатывается через process_consultation так же,
+как в AudioRecorderApp (потоковый ответ, DOCX по мере поступления разделов).
+
+Пример:
+    python -m tools.replay_benchmark audio_records/*.wav --speed 10 --llm-latency 0.5 --output bench.json
+
+Результат - JSON с метриками каждого прогона и сводкой (mean/p50/p95/max).
+"""
+import os
+import sys
+import glob
+import json
+import time
+import wave
+import tempfile
+import argparse
+import logging
+import threading
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.fake_speech_server import FakeSpeechServer
+from tools.openai_stub import OpenAIStubServer
+
+logger = logging.getLogger(__name__)
+
+METRICS = (
+    "time_to_first_interim_s",
+    "time_to_first_final_s",
+    "stop_to_last_final_s",
+    "stop_to_first_section_s",
+    "stop_to_report_s",
+    "realtime_factor",
+)
+
+
+class WavFileSource:
+    """
+    Источник аудио из WAV-файла с тем же интерфейсом, что MicrophoneSource.
+    Блоки отдаются в on_audio из отдельного потока в темпе speed x реальное время
+    (speed=0 - без пауз).
+    """
+    def __init__(self, path, speed=1.0, frames_per_buffer=1024, rate=16000):
+        self.path = path
+        self.speed = speed
+        self.frames_per_buffer = frames_per_buffer
+        with wave.open(path, "rb") as wav:
+            if wav.getframerate() != rate or wav.getnchannels() != 1 or wav.getsampwidth() != 2:
+                raise ValueError(f"{path}: нужен WAV {rate} Гц, моно, 16 бит")
+            self.rate = rate
+            self.duration = wav.getnframes() / rate
+        self.captured_bytes = 0
+        self.finished = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self, on_audio):
+        self._thread = threading.Thread(target=self._run, args=(on_audio,), name="wav-source", daemon=True)
+        self._thread.start()
+
+    def _run(self, on_audio):
+        started = time.monotonic()
+        with wave.open(self.path, "rb") as wav:
+            while not self._stopped.is_set():
+                data = wav.readframes(self.frames_per_buffer)
+                if not data:
+                    break
+                if self.speed:
+                    due = started + (self.captured_bytes / (self.rate * 2)) / self.speed
+                    delay = due - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                self.captured_bytes += len(data)
+                on_audio(data)
+        self.finished.set()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread:
+            self._thread.join()
+
+    def stats(self):
+        return {
+            "captured_bytes": self.captured_bytes,
+            "device_overflows": 0,
+        }
+
+
+class ReplayRun:
+    """Один прогон файла: запись -> остановка -> транскрипт -> заключение"""
+    def __init__(self, path, args, chatgpt_api, storage_service):
+        self.path = path
+        self.args = args
+        self.chatgpt_api = chatgpt_api
+        self.storage_service = storage_service
+        self.final_count = 0
+        self.first_interim = None
+        self.first_final = None
+        self.last_final = None
+        self.first_section = None
+        self._lock = threading.Lock()
+
+    def on_interim(self, text):
+        if text and self.first_interim is None:
+            self.first_interim = time.monotonic()
+
+    def on_final(self, text, speaker=None):
+        if not text:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if self.first_final is None:
+                self.first_final = now
+            self.last_final = now
+            self.final_count += 1
+
+    def on_section(self, key, value):
+        if self.first_section is None:
+            self.first_section = time.monotonic()
+
+    def run(self):
+        from services.audio_service import AudioService
+        from process_utils import process_consultation, load_template_instructions
+        from services.transcript_store import TranscriptStore
+        from services.rolling_extractor import RollingExtractor
+
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        store = TranscriptStore(f"audio_records/transcript_{timestamp}.jsonl")
+        extractor = None
+        on_segment = store.append
+        if self.args.rolling_interval:
+            extractor = RollingExtractor(self.chatgpt_api, load_template_instructions(self.args.doctor_type),
+                                         interval=self.args.rolling_interval,
+                                         min_tokens=self.args.rolling_min_tokens).start()
+
+            def on_segment(segment):
+                store.append(segment)
+                extractor.add_segment(segment)
+        source = WavFileSource(self.path, speed=self.args.speed)
+        service = AudioService(
+            on_interim_result=self.on_interim,
+            on_final_result=self.on_final,
+            on_segment=on_segment,
+            source_factory=lambda: source,
+            session_seconds=self.args.session_seconds,
+        )
+        started = time.monotonic()
+        thread = threading.Thread(target=service.start_recording,
+                                  kwargs={"archive_path": f"audio_records/{timestamp}.wav"})
+        thread.start()
+        source.finished.wait()
+
+        stopped = time.monotonic()
+        service.stop_recording()
+        thread.join()
+        recognized = time.monotonic()
+
+        store.close()
+        transcript_file = store.write_text(f"audio_records/transcript_{timestamp}.txt")
+
+        report_file = None
+        error = None
+        if transcript_file:
+            try:
+                _, _, report_file = process_consultation(
+                    transcript_file, "Тестовый Пациент", "Тестовый Врач", self.args.doctor_type,
+                    self.chatgpt_api, self.storage_service, timestamp, on_section=self.on_section,
+                    extractor=extractor
+                )
+            except Exception as e:
+                error = str(e)
+        if extractor:
+            extractor.cancel()
+        finished = time.monotonic()
+
+        def since(start, moment):
+            return round(moment - start, 4) if moment is not None else None
+
+        audio_stats = service.get_stats()
+        return {
+            "file": self.path,
+            "audio_s": round(source.duration, 3),
+            "wall_s": round(finished - started, 4),
+            "time_to_first_interim_s": since(started, self.first_interim),
+            "time_to_first_final_s": since(started, self.first_final),
+            "stop_to_last_final_s": since(stopped, max(self.last_final or stopped, stopped)),
+            "stop_to_recognized_s": since(stopped, recognized),
+            "stop_to_first_section_s": since(stopped, self.first_section),
+            "stop_to_report_s": since(stopped, finished) if report_file else None,
+            "realtime_factor": round(source.duration / (finished - started), 3),
+            "final_results": self.final_count,
+            "rolling_requests": len(extractor.partials) if extractor else 0,
+            "speech_sessions": audio_stats.get("sessions", 0),
+            "overruns": audio_stats.get("overruns", 0),
+            "report": report_file,
+            "error": error,
+        }
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(fraction * (len(values) - 1))))
+    return values[index]
+
+
+def summarize(runs):
+    summary = {}
+    for metric in METRICS:
+        values = [run[metric] for run in runs if run.get(metric) is not None]
+        if values:
+            summary[metric] = {
+                "mean": round(sum(values) / len(values), 4),
+                "p50": percentile(values, 0.5),
+                "p95": percentile(values, 0.95),
+                "max": max(values),
+            }
+    audio = sum(run["audio_s"] for run in runs)
+    wall = sum(run["wall_s"] for run in runs)
+    summary["throughput_audio_s_per_s"] = round(audio / wall, 3) if wall else None
+    summary["failures"] = sum(1 for run in runs if run["error"] or not run["report"])
+    return summary
+
+
+def collect_files(inputs):
+    files = []
+    for item in inputs:
+        if os.path.isdir(item):
+            files.extend(glob.glob(os.path.join(item, "*.wav")))
+        else:
+            files.extend(glob.glob(item))
+    return sorted(set(os.path.abspath(path) for path in files))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замер задержек конвейера на записанных WAV-файлах")
+    parser.add_argument("inputs", nargs="+", help="WAV-файлы (16 кГц, моно, 16 бит), каталоги или glob-шаблоны")
+    parser.add_argument("--speed", type=float, default=1.0, help="Скорость подачи аудио (1 - реальное время, 0 - без пауз)")
+    parser.add_argument("--repeat", type=int, default=1, help="Сколько раз прогнать каждый файл")
+    parser.add_argument("--doctor-type", default="general_physician", help="Код специализации")
+    parser.add_argument("--session-seconds", type=float, default=280, help="Длительность сессии распознавания, с")
+    parser.add_argument("--speech-limit", type=float, default=305, help="Лимит потока имитации Speech API, с")
+    parser.add_argument("--speech-latency", type=float, default=0.0, help="Задержка ответов Speech API, с")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Задержка ответа ChatGPT, с")
+    parser.add_argument("--llm-chunk-delay", type=float, default=0.0, help="Пауза между фрагментами потока ChatGPT, с")
+    parser.add_argument("--llm-fail-first", type=int, default=0, help="Сколько первых запросов к ChatGPT завершить ошибкой")
+    parser.add_argument("--llm-fail-status", type=int, default=429)
+    parser.add_argument("--rolling-interval", type=float, default=0,
+                        help="Период промежуточного извлечения во время записи, с (0 - выключено)")
+    parser.add_argument("--rolling-min-tokens", type=int, default=200,
+                        help="Минимальный размер фрагмента для промежуточного извлечения, токенов")
+    parser.add_argument("--workdir", help="Каталог для audio_records, Results и Reports (по умолчанию временный)")
+    parser.add_argument("--output", help="Файл для JSON с результатами (по умолчанию stdout)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    files = collect_files(args.inputs)
+    if not files:
+        print("WAV-файлы не найдены", file=sys.stderr)
+        return 2
+
+    speech = FakeSpeechServer(limit=args.speech_limit, latency=args.speech_latency).start()
+    llm = OpenAIStubServer(latency=args.llm_latency, fail_first=args.llm_fail_first,
+                           fail_status=args.llm_fail_status, retry_after=0,
+                           chunk_delay=args.llm_chunk_delay).start()
+    os.environ["SPEECH_EMULATOR_HOST"] = speech.address
+    os.environ["OPENAI_BASE_URL"] = llm.base_url
+    os.environ.setdefault("OPENAI_API_KEY", "replay-benchmark")
+
+    output = os.path.abspath(args.output) if args.output else None
+    workdir = args.workdir or tempfile.mkdtemp(prefix="replay_benchmark_")
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)
+
+    from chatgpt import ChatGPTAPI
+    from services.storage_service import create_storage_service
+    chatgpt_api = ChatGPTAPI(api_key=os.environ["OPENAI_API_KEY"], use_cache=False)
+    storage_service = create_storage_service()
+
+    runs = []
+    try:
+        for path in files:
+            for _ in range(args.repeat):
+                run = ReplayRun(path, args, chatgpt_api, storage_service).run()
+                runs.append(run)
+                print(f"{os.path.basename(path)}: стоп -> заключение {run['stop_to_report_s']} с", file=sys.stderr)
+    finally:
+        speech.stop()
+        llm.stop()
+
+    report = {
+        "config": {key: value for key, value in vars(args).items() if key not in ("inputs", "output")},
+        "workdir": workdir,
+        "runs": runs,
+        "summary": summarize(runs),
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    return 1 if report["summary"]["failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
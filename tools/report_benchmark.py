@@ -0,0 +1,74 @@
+"""
+Сравнение скорости создания DOCX: python-docx (report_generator) и заготовка OOXML (report_ooxml).
+
+Пример:
+    python -m tools.report_benchmark --count 1000
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import report_ooxml
+from report_generator import ReportBuilder, format_report_text
+
+SAMPLE_RESULT = {
+    "doctor": {"name": "Иванова Мария Петровна", "specialization": "Терапевт"},
+    "patient": {"name": "Иванов Иван Иванович", "age": "45"},
+    "complaints": ["Головная боль в течение недели", "Повышение давления до 160/100", "Слабость"],
+    "provisional diagnosis": ["Гипертоническая болезнь II стадии"],
+    "recommendations": ["Контроль АД дважды в день", "Эналаприл 10 мг 2 раза в день", "ЭКГ", "Повторный прием через 2 недели"],
+}
+
+
+def python_docx_writer(path, patient_name, result):
+    builder = ReportBuilder(patient_name)
+    builder.add_text(format_report_text(result))
+    builder.doc.save(path)
+
+
+def ooxml_writer(path, patient_name, result):
+    report_ooxml.write_report(path, patient_name, result)
+
+
+def measure(writer, directory, count):
+    started = time.perf_counter()
+    for index in range(count):
+        writer(os.path.join(directory, f"report_{index}.docx"), f"Пациент {index}", SAMPLE_RESULT)
+    elapsed = time.perf_counter() - started
+    size = os.path.getsize(os.path.join(directory, "report_0.docx"))
+    return {"seconds": round(elapsed, 3), "per_report_ms": round(elapsed * 1000 / count, 3), "file_bytes": size}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Сравнение скорости создания DOCX")
+    parser.add_argument("--count", type=int, default=500, help="Сколько заключений создать каждым способом")
+    args = parser.parse_args(argv)
+
+    directory = tempfile.mkdtemp(prefix="report_benchmark_")
+    try:
+        # Заготовка строится один раз на процесс, поэтому ее время учитываем отдельно
+        started = time.perf_counter()
+        report_ooxml.get_skeleton()
+        skeleton_s = time.perf_counter() - started
+
+        results = {
+            "count": args.count,
+            "python_docx": measure(python_docx_writer, directory, args.count),
+            "ooxml": measure(ooxml_writer, directory, args.count),
+            "ooxml_skeleton_s": round(skeleton_s, 3),
+        }
+        results["speedup"] = round(results["python_docx"]["seconds"] / results["ooxml"]["seconds"], 1)
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""
+Замер приведения аудио с устройства к 16 кГц моно (InputConditioner / PolyphaseResampler).
+
+Для каждой частоты устройства синтетический сигнал подается блоками того же размера, что
+у MicrophoneSource (64 мс), и измеряются:
+    block_us_mean/p95  - время обработки блока;
+    realtime_factor    - во сколько раз быстрее реального времени (один поток);
+    alloc_bytes_per_block - память, выделенная за блок в установившемся режиме (tracemalloc);
+    passband_db        - ослабление тона 3 кГц (должно быть около 0);
+    alias_db           - уровень продукта наложения от тона выше 8 кГц (чем ниже, тем лучше).
+
+Пример:
+    python -m tools.resampler_benchmark
+    python -m tools.resampler_benchmark --rates 44100 48000 --channels 2 --normalize --seconds 60
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.resampler import InputConditioner
+
+OUT_RATE = 16000
+FRAMES_PER_BUFFER = 1024
+PASS_TONE = 3000
+ALIAS_TONE = 11000
+
+
+def test_signal(rate, channels, seconds):
+    """Тон в полосе пропускания, тон выше 8 кГц (дает наложение на 5 кГц) и постоянная составляющая"""
+    t = np.arange(int(rate * seconds)) / rate
+    alias_tone = ALIAS_TONE if ALIAS_TONE < rate / 2 else 0
+    mono = 8000 * np.sin(2 * np.pi * PASS_TONE * t) + 8000 * np.sin(2 * np.pi * alias_tone * t) + 1500
+    return np.repeat(mono[:, None], channels, axis=1).astype(np.int16).tobytes(), alias_tone
+
+
+def tone_db(signal, frequency, reference):
+    window = np.hanning(len(signal))
+    spectrum = np.abs(np.fft.rfft(signal * window))
+    frequencies = np.fft.rfftfreq(len(signal), 1 / OUT_RATE)
+    return 20 * np.log10(spectrum[np.argmin(np.abs(frequencies - frequency))] / reference + 1e-12)
+
+
+def run(rate, channels, seconds, remove_dc, normalize):
+    frames = round(FRAMES_PER_BUFFER * rate / OUT_RATE)
+    conditioner = InputConditioner(rate, channels, frames, OUT_RATE, remove_dc=remove_dc, normalize=normalize)
+    audio, alias_tone = test_signal(rate, channels, seconds)
+    block_bytes = frames * channels * 2
+    blocks = [audio[i:i + block_bytes] for i in range(0, len(audio) - block_bytes + 1, block_bytes)]
+
+    output = bytearray()
+    timings = []
+    for block in blocks:
+        started = time.perf_counter()
+        data = conditioner.process(block)
+        timings.append(time.perf_counter() - started)
+        output += data
+
+    # Выделения памяти в установившемся режиме - отдельным проходом, без накопления результата
+    tracemalloc.start()
+    allocated = tracemalloc.get_traced_memory()[0]
+    for block in blocks[:100]:
+        conditioner.process(block)
+    allocated_total = tracemalloc.get_traced_memory()[1] - allocated
+    tracemalloc.stop()
+
+    warmup = min(10, len(blocks) // 2)
+    timings = np.array(timings[warmup:])
+    block_seconds = frames / rate
+    result = np.frombuffer(bytes(output), dtype=np.int16).astype(np.float64)
+    # Спектр по середине записи, после установления оценки постоянной составляющей
+    middle = result[len(result) // 2:len(result) // 2 + OUT_RATE]
+    reference = 8000 * len(middle) / 4
+    report = {
+        "device_rate": rate,
+        "channels": channels,
+        "ratio": f"{conditioner.resampler.up}/{conditioner.resampler.down}" if conditioner.resampler else "1/1",
+        "taps_per_phase": conditioner.resampler.taps_per_phase if conditioner.resampler else 0,
+        "output_samples": len(result),
+        "expected_samples": len(blocks) * frames * OUT_RATE // rate,
+        "block_us_mean": round(timings.mean() * 1e6, 1),
+        "block_us_p95": round(float(np.percentile(timings, 95)) * 1e6, 1),
+        "realtime_factor": round(block_seconds / timings.mean()),
+        "alloc_bytes_per_block": round(allocated_total / min(100, len(blocks)), 1),
+        "passband_db": round(tone_db(middle, PASS_TONE, reference), 2),
+        "dc_residual": round(float(middle.mean()), 1),
+    }
+    if alias_tone:
+        report["alias_db"] = round(tone_db(middle, OUT_RATE - alias_tone, reference), 1)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Скорость и качество приведения аудио к 16 кГц")
+    parser.add_argument("--rates", type=int, nargs="+", default=[44100, 48000, 32000, 96000, 16000])
+    parser.add_argument("--channels", type=int, default=1, help="Каналы устройства (сводятся в моно)")
+    parser.add_argument("--seconds", type=float, default=30, help="Длительность сигнала")
+    parser.add_argument("--no-dc", action="store_true", help="Не удалять постоянную составляющую")
+    parser.add_argument("--normalize", action="store_true", help="Включить выравнивание уровня")
+    args = parser.parse_args(argv)
+
+    report = [run(rate, args.channels, args.seconds, not args.no_dc, args.normalize) for rate in args.rates]
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
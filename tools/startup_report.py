@@ -0,0 +1,78 @@
+"""
+Отчет о времени импорта при запуске приложения (по данным python -X importtime).
+
+Импортирует модуль (по умолчанию main) в отдельном процессе, выводит общее время,
+самые долгие импорты и отдельно - какие из тяжелых пакетов (Speech API, PyAudio,
+openai, requests, python-docx) загружаются до появления окна.
+
+Пример:
+    python -m tools.startup_report
+    python -m tools.startup_report --module main --top 15 --deferred
+"""
+import os
+import re
+import sys
+import json
+import argparse
+import subprocess
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+HEAVY_PACKAGES = ("google.cloud.speech_v1p1beta1", "grpc", "pyaudio", "openai", "requests", "docx", "httpx")
+
+
+def import_times(module, extra_imports=()):
+    """Запускает python -X importtime и возвращает [(модуль, собственное мкс, суммарное мкс, глубина)]"""
+    code = "; ".join(f"import {name}" for name in (module, *extra_imports))
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                               cwd=BASE_DIR, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1])
+    rows = []
+    for line in completed.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            rows.append((name, int(self_us), int(cumulative_us), len(indent) // 2))
+    return rows
+
+
+def summarize(rows, module, top):
+    by_name = {name: cumulative for name, _, cumulative, _ in rows}
+    total_us = by_name.get(module, 0)
+    slowest = sorted(rows, key=lambda row: row[1], reverse=True)[:top]
+    return {
+        "module": module,
+        "total_ms": round(total_us / 1000, 1),
+        "modules": len(rows),
+        "heavy_loaded": {name: round(by_name[name] / 1000, 1) for name in HEAVY_PACKAGES if name in by_name},
+        "slowest_self_ms": {name: round(self_us / 1000, 1) for name, self_us, _, _ in slowest},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Время импорта модулей при запуске")
+    parser.add_argument("--module", default="main", help="Импортируемый модуль")
+    parser.add_argument("--top", type=int, default=10, help="Сколько самых долгих импортов показать")
+    parser.add_argument("--deferred", action="store_true",
+                        help="Дополнительно измерить отложенные модули (то, что загружает фоновый прогрев)")
+    args = parser.parse_args(argv)
+
+    report = {"startup": summarize(import_times(args.module), args.module, args.top)}
+    if args.deferred:
+        sys.path.insert(0, BASE_DIR)
+        from main import DEFERRED_MODULES
+        rows = import_times(args.module, DEFERRED_MODULES)
+        startup = {name for name, _, _, _ in import_times(args.module)}
+        deferred = [row for row in rows if row[0] not in startup]
+        report["deferred"] = {
+            "total_ms": round(sum(self_us for _, self_us, _, _ in deferred) / 1000, 1),
+            "modules": len(deferred),
+            "heavy_loaded": summarize(rows, args.module, 0)["heavy_loaded"],
+        }
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+"""
+Замер отсева тишины: стоимость детектора речи на блок и доля аудио, уходящая в Speech API.
+
+Блоки по 100 мс (как в AudioService) проходят через SpeechGate с VoiceActivityDetector.
+По умолчанию используется синтетический прием с известной разметкой: фразы из гармонического
+«голоса» с глухими согласными, разделенные паузами разной длины, на фоне шума. Для него
+дополнительно считается, какая доля речевых блоков отправлена (recall) и сколько тишины отсеяно.
+Можно передать свои WAV-файлы (16 кГц, моно, 16 бит), например из audio_records/.
+
+Пример:
+    python -m tools.vad_benchmark --minutes 10
+    python -m tools.vad_benchmark audio_records/*.wav --output vad.json
+"""
+import os
+import sys
+import glob
+import json
+import time
+import wave
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.speech_gate import SpeechGate, StreamTimeline
+from services.vad import VoiceActivityDetector
+
+SAMPLE_RATE = 16000
+BYTES_PER_SECOND = SAMPLE_RATE * 2
+CHUNK_BYTES = BYTES_PER_SECOND // 10
+
+
+def synthetic_consultation(minutes, noise_db=-55.0, seed=1):
+    """Синтетический прием: (PCM16 bytes, разметка речи по отсчетам)"""
+    rng = np.random.default_rng(seed)
+    total = int(minutes * 60 * SAMPLE_RATE)
+    t = np.arange(total) / SAMPLE_RATE
+    audio = rng.normal(0, 32768 * 10 ** (noise_db / 20), total)
+    speech = np.zeros(total, dtype=bool)
+    position = int(rng.uniform(1, 3) * SAMPLE_RATE)
+    while position < total:
+        length = int(rng.uniform(0.8, 6) * SAMPLE_RATE)
+        end = min(position + length, total)
+        span = slice(position, end)
+        f0 = rng.uniform(100, 220)
+        voice = sum(np.sin(2 * np.pi * f0 * k * t[span]) / k for k in range(1, 12))
+        # Слоги ~4 Гц и глухие согласные - короткие вспышки широкополосного шума
+        syllables = 0.5 + 0.5 * np.sin(2 * np.pi * 4 * t[span] + rng.uniform(0, np.pi)) ** 2
+        level = 32768 * 10 ** (rng.uniform(-30, -15) / 20)
+        audio[span] += voice / 3 * syllables * level
+        hiss = rng.normal(0, level / 4, end - position) * (syllables < 0.55)
+        audio[span] += hiss
+        speech[span] = True
+        # Паузы: от коротких между фразами до долгих (осмотр, записи врача)
+        position = end + int(rng.choice([rng.uniform(0.3, 2), rng.uniform(5, 40)], p=[0.7, 0.3]) * SAMPLE_RATE)
+    return np.clip(audio, -32768, 32767).astype(np.int16).tobytes(), speech
+
+
+def read_wav(path):
+    with wave.open(path, "rb") as wav:
+        if wav.getframerate() != SAMPLE_RATE or wav.getnchannels() != 1 or wav.getsampwidth() != 2:
+            raise ValueError(f"{path}: нужен WAV {SAMPLE_RATE} Гц, моно, 16 бит")
+        return wav.readframes(wav.getnframes())
+
+
+def run(audio, speech=None):
+    """Прогоняет аудио через детектор блоками по 100 мс и возвращает метрики"""
+    detector = VoiceActivityDetector(SAMPLE_RATE)
+    gate = SpeechGate(detector, BYTES_PER_SECOND)
+    timeline = StreamTimeline(0, BYTES_PER_SECOND)
+    sent_chunks = set()
+    timings = []
+    for position in range(0, len(audio) - CHUNK_BYTES + 1, CHUNK_BYTES):
+        data = audio[position:position + CHUNK_BYTES]
+        started = time.perf_counter()
+        chunks = gate.process(position, data)
+        timings.append(time.perf_counter() - started)
+        for chunk_position, chunk in chunks:
+            timeline.append(chunk_position, len(chunk))
+            sent_chunks.add(chunk_position // CHUNK_BYTES)
+
+    timings = np.array(timings)
+    chunk_seconds = CHUNK_BYTES / BYTES_PER_SECOND
+    captured = len(timings) * CHUNK_BYTES
+    result = {
+        "audio_s": round(captured / BYTES_PER_SECOND, 1),
+        "sent_s": round(timeline.sent_bytes / BYTES_PER_SECOND, 1),
+        "sent_ratio": round(timeline.sent_bytes / captured, 3) if captured else 0.0,
+        "chunk_us_mean": round(timings.mean() * 1e6, 1),
+        "chunk_us_p95": round(float(np.percentile(timings, 95)) * 1e6, 1),
+        "realtime_factor": round(chunk_seconds / timings.mean()),
+        **detector.stats(),
+    }
+    if speech is not None:
+        samples_per_chunk = CHUNK_BYTES // 2
+        count = len(timings)
+        speech_chunks = speech[:count * samples_per_chunk].reshape(count, samples_per_chunk).any(axis=1)
+        sent = np.zeros(count, dtype=bool)
+        sent[list(sent_chunks)] = True
+        result["speech_recall"] = round(float((sent & speech_chunks).sum() / speech_chunks.sum()), 4)
+        result["silence_suppressed"] = round(float((~sent & ~speech_chunks).sum() / (~speech_chunks).sum()), 3)
+        result["speech_ratio"] = round(float(speech_chunks.mean()), 3)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Стоимость и эффект отсева тишины")
+    parser.add_argument("files", nargs="*", help="WAV-файлы (по умолчанию - синтетический прием)")
+    parser.add_argument("--minutes", type=float, default=10, help="Длительность синтетического приема")
+    parser.add_argument("--noise-db", type=float, default=-55.0, help="Уровень фонового шума синтетики, дБFS")
+    parser.add_argument("--output", help="Сохранить отчет в JSON")
+    args = parser.parse_args(argv)
+
+    files = [name for pattern in args.files for name in sorted(glob.glob(pattern))]
+    report = {}
+    if files:
+        for path in files:
+            report[os.path.basename(path)] = run(read_wav(path))
+    else:
+        audio, speech = synthetic_consultation(args.minutes, args.noise_db)
+        report["synthetic"] = run(audio, speech)
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())